@@ -0,0 +1,291 @@
+"""API 压测工具
+
+按请求比例并发访问 /transcribe(普通与流式)与 /health，统计吞吐、延迟分位数、错误率与推理队列深度。
+加 --serve-fake 时在本进程内以模拟模型启动 API 服务，无需真实模型即可验证调度与背压。
+
+    python -m benchmarks.api_load --serve-fake --fake-latency 0.05 --concurrency 16 --duration 60 \\
+        --mix transcribe=6 stream=3 health=1 --file-seconds 10 60 300
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+def percentile(values, q):
+    """最近秩分位数，values 为空时返回 None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return round(ordered[index], 4)
+
+def encode_multipart(fields, file_name, file_data):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{file_name}"\r\n'
+        f'Content-Type: application/octet-stream\r\n\r\n'.encode()
+    )
+    parts.append(file_data)
+    parts.append(f'\r\n--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+class LoadClient:
+    def __init__(self, base_url, timeout=600):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+
+    def _connection(self):
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def health(self):
+        conn = self._connection()
+        try:
+            conn.request('GET', '/health')
+            response = conn.getresponse()
+            body = response.read()
+            return response.status, json.loads(body) if response.status == 200 else None
+        finally:
+            conn.close()
+
+    def transcribe(self, file_name, file_data, stream=False, model_size='small'):
+        """返回 (状态码, 首个分段的延迟)，非流式请求的首段延迟为 None"""
+        fields = {'model_size': model_size, 'stream': 'true' if stream else 'false'}
+        body, content_type = encode_multipart(fields, file_name, file_data)
+        conn = self._connection()
+        started = time.perf_counter()
+        try:
+            conn.request('POST', '/transcribe', body=body, headers={'Content-Type': content_type})
+            response = conn.getresponse()
+            if not stream or response.status != 200:
+                response.read()
+                return response.status, None
+            first_segment = None
+            failed = False
+            for line in response:
+                if line.startswith(b'data:'):
+                    if first_segment is None:
+                        first_segment = time.perf_counter() - started
+                    if b'"error"' in line:
+                        failed = True
+            # 流式响应在出错时仍为200，错误以 data: {"error": ...} 返回
+            return (599 if failed else 200), first_segment
+        finally:
+            conn.close()
+
+class LoadTest:
+    def __init__(self, client, files, mix, concurrency, duration=None, requests=None, seed=0, model_size='small'):
+        self.client = client
+        self.files = files  # [(文件名, 数据, 时长)]
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.concurrency = concurrency
+        self.duration = duration
+        self.requests = requests
+        self.seed = seed
+        self.model_size = model_size
+        self.lock = threading.Lock()
+        self.issued = 0
+        self.records = []  # (类型, 状态码, 延迟, 首段延迟, 音频时长)
+        self.queue_samples = []
+        self.stop_event = threading.Event()
+
+    def _next_request(self):
+        with self.lock:
+            if self.requests is not None and self.issued >= self.requests:
+                return False
+            self.issued += 1
+            return True
+
+    def _worker(self, index):
+        rng = random.Random(self.seed + index)
+        while not self.stop_event.is_set() and self._next_request():
+            kind = rng.choices(self.kinds, self.weights)[0]
+            started = time.perf_counter()
+            first_segment, audio_seconds = None, 0.0
+            try:
+                if kind == 'health':
+                    status, _ = self.client.health()
+                else:
+                    file_name, data, audio_seconds = rng.choice(self.files)
+                    status, first_segment = self.client.transcribe(file_name, data, stream=kind == 'stream',
+                                                                   model_size=self.model_size)
+            except (OSError, http.client.HTTPException):
+                status = 0  # 连接失败或超时
+            latency = time.perf_counter() - started
+            with self.lock:
+                self.records.append((kind, status, latency, first_segment, audio_seconds))
+
+    def _sample_queue(self, interval):
+        while not self.stop_event.wait(interval):
+            try:
+                status, data = self.client.health()
+            except (OSError, http.client.HTTPException):
+                continue
+            if status == 200 and data and 'scheduler' in data:
+                scheduler = data['scheduler']
+                self.queue_samples.append((scheduler.get('queued', 0), scheduler.get('running', 0)))
+
+    def run(self, sample_interval=0.5):
+        threads = [threading.Thread(target=self._worker, args=(i,), daemon=True) for i in range(self.concurrency)]
+        sampler = threading.Thread(target=self._sample_queue, args=(sample_interval,), daemon=True)
+        started = time.perf_counter()
+        sampler.start()
+        for thread in threads:
+            thread.start()
+        deadline = started + self.duration if self.duration else None
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.perf_counter()) if deadline else None)
+        self.stop_event.set()
+        for thread in threads:
+            thread.join()
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed):
+        def summarize(records):
+            ok = [r for r in records if 200 <= r[1] < 300]
+            latencies = [r[2] for r in ok]
+            first_segments = [r[3] for r in ok if r[3] is not None]
+            statuses = {}
+            for r in records:
+                statuses[str(r[1])] = statuses.get(str(r[1]), 0) + 1
+            return {
+                'requests': len(records),
+                'ok': len(ok),
+                'rejected': sum(1 for r in records if r[1] == 429),
+                'errors': sum(1 for r in records if not 200 <= r[1] < 300 and r[1] != 429),
+                'error_rate': round(1 - len(ok) / len(records), 4) if records else 0.0,
+                'throughput': round(len(ok) / elapsed, 3) if elapsed else None,
+                'audio_sec_per_sec': round(sum(r[4] for r in ok) / elapsed, 3) if elapsed else None,
+                'latency_p50': percentile(latencies, 50),
+                'latency_p95': percentile(latencies, 95),
+                'latency_p99': percentile(latencies, 99),
+                'first_segment_p50': percentile(first_segments, 50),
+                'first_segment_p95': percentile(first_segments, 95),
+                'status_codes': statuses
+            }
+
+        queued = [sample[0] for sample in self.queue_samples]
+        return {
+            'elapsed': round(elapsed, 3),
+            'concurrency': self.concurrency,
+            'total': summarize(self.records),
+            'by_kind': {kind: summarize([r for r in self.records if r[0] == kind]) for kind in self.kinds},
+            'queue_depth': {
+                'samples': len(queued),
+                'max': max(queued) if queued else None,
+                'mean': round(sum(queued) / len(queued), 2) if queued else None
+            }
+        }
+
+def parse_mix(items):
+    mix = {}
+    for item in items:
+        kind, _, weight = item.partition('=')
+        if kind not in ('transcribe', 'stream', 'health'):
+            raise argparse.ArgumentTypeError(f"未知的请求类型: {kind}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+def prepare_files(seconds_list, directory):
+    from benchmarks.corpus import synthesize, write_wav
+    files = []
+    for index, seconds in enumerate(seconds_list):
+        path = os.path.join(directory, f"load_{seconds}s.wav")
+        write_wav(path, synthesize(seconds, 0.7, seed=index))
+        with open(path, 'rb') as f:
+            files.append((os.path.basename(path), f.read(), float(seconds)))
+    return files
+
+def serve_fake(args):
+    """在后台线程启动使用模拟模型的 API 服务，返回 (服务, 地址)"""
+    from services.api_server import APIServer
+    from services.transcript_cache import transcript_cache
+    # 关闭转写缓存，否则重复的压测文件会直接命中缓存
+    transcript_cache.configure(max_mb=0)
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    config = {
+        'model_backend': 'fake',
+        'fake_latency': args.fake_latency,
+        'fake_fail_rate': args.fake_fail_rate,
+        'api_workers': args.api_workers,
+        'api_queue_size': args.api_queue_size,
+    }
+    server = APIServer(config)
+    server.start_background(host='127.0.0.1', port=port)
+    url = f"http://127.0.0.1:{port}"
+    client = LoadClient(url)
+    for _ in range(50):
+        try:
+            client.health()
+            break
+        except OSError:
+            time.sleep(0.1)
+    return server, url
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.api_load', description='API 压测')
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, help='压测时长(秒)')
+    parser.add_argument('--requests', type=int, help='请求总数，与 --duration 同时指定时先到者结束')
+    parser.add_argument('--mix', nargs='+', default=['transcribe=1'], help='请求比例，如 transcribe=6 stream=3 health=1')
+    parser.add_argument('--file-seconds', nargs='+', type=int, default=[10, 60], help='合成音频的时长(秒)')
+    parser.add_argument('--model-size', default='small')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--serve-fake', action='store_true', help='在本进程内以模拟模型启动API服务')
+    parser.add_argument('--fake-latency', type=float, default=0.05, help='模拟模型每秒音频的推理耗时')
+    parser.add_argument('--fake-fail-rate', type=float, default=0.0)
+    parser.add_argument('--api-workers', type=int, default=0, help='模拟服务的推理槽位数，0为自动')
+    parser.add_argument('--api-queue-size', type=int, help='模拟服务的等待队列长度')
+    parser.add_argument('--output', help='把JSON报告写入该文件，默认输出到标准输出')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        mix = parse_mix(args.mix)
+    except argparse.ArgumentTypeError as e:
+        build_parser().error(str(e))
+    if args.duration is None and args.requests is None:
+        args.requests = args.concurrency * 10
+
+    server = None
+    url = args.url
+    if args.serve_fake:
+        server, url = serve_fake(args)
+    with tempfile.TemporaryDirectory(prefix='whisper_load_') as directory:
+        files = prepare_files(args.file_seconds, directory)
+        test = LoadTest(LoadClient(url), files, mix, args.concurrency, duration=args.duration,
+                        requests=args.requests, seed=args.seed, model_size=args.model_size)
+        print(f"正在压测 {url}，并发 {args.concurrency}...", file=sys.stderr, flush=True)
+        report = test.run()
+    if server:
+        server.stop()
+
+    report['url'] = url
+    report['mix'] = mix
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0 if report['total']['errors'] == 0 else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""生成固定的合成测试音频
+
+以随机种子生成类似语音的信号(带共振峰的谐波、按音节速率起伏的包络)与静音交替的片段，
+相同参数每次生成的文件完全一致，可在不同机器之间比较结果。
+"""
+import json
+import os
+import wave
+import numpy as np
+
+SAMPLING_RATE = 16000
+
+# (文件名, 时长秒数, 语音占比)
+DEFAULT_CORPUS = [
+    ('short_30s', 30, 0.8),
+    ('medium_120s', 120, 0.6),
+    ('long_600s', 600, 0.5),
+]
+
+def _speech_like(rng, seconds):
+    t = np.arange(int(seconds * SAMPLING_RATE)) / SAMPLING_RATE
+    pitch = rng.uniform(100, 220) * (1 + 0.05 * np.sin(2 * np.pi * rng.uniform(0.5, 2) * t))
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLING_RATE
+    signal = np.zeros_like(t)
+    for harmonic, formant in zip(range(1, 12), np.linspace(1.0, 0.1, 11)):
+        signal += formant * np.sin(harmonic * phase)
+    # 每秒4-6个音节的包络
+    syllables = np.clip(np.sin(2 * np.pi * rng.uniform(4, 6) * t), 0, None) ** 2
+    noise = rng.normal(0, 0.02, len(t))
+    return (signal / 11 * syllables + noise) * 0.5
+
+def synthesize(seconds, speech_ratio, seed):
+    """返回 float32 数组，语音段长度 2-8 秒，其间以静音分隔"""
+    rng = np.random.RandomState(seed)
+    pieces, total = [], 0
+    target = int(seconds * SAMPLING_RATE)
+    while total < target:
+        speech = rng.uniform(2, 8)
+        silence = speech * (1 - speech_ratio) / max(speech_ratio, 1e-3)
+        pieces.append(_speech_like(rng, speech))
+        pieces.append(rng.normal(0, 0.002, int(rng.uniform(0.5, 1.5) * silence * SAMPLING_RATE)))
+        total += len(pieces[-2]) + len(pieces[-1])
+    return np.concatenate(pieces)[:target].astype(np.float32)
+
+def write_wav(path, audio):
+    samples = (np.clip(audio, -1, 1) * 32767).astype('<i2')
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLING_RATE)
+        f.writeframes(samples.tobytes())
+
+def build_corpus(corpus_dir, spec=DEFAULT_CORPUS, seed=20240501):
+    """生成语料并写入 corpus.json 清单，已存在且参数相同的文件不重新生成"""
+    os.makedirs(corpus_dir, exist_ok=True)
+    manifest_path = os.path.join(corpus_dir, 'corpus.json')
+    previous = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = {item['file']: item for item in json.load(f)}
+
+    items = []
+    for index, (name, seconds, speech_ratio) in enumerate(spec):
+        path = os.path.join(corpus_dir, f"{name}.wav")
+        item = {'file': path, 'duration': seconds, 'speech_ratio': speech_ratio, 'seed': seed + index}
+        if previous.get(path) != item or not os.path.exists(path):
+            write_wav(path, synthesize(seconds, speech_ratio, seed + index))
+        items.append(item)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(items, f, ensure_ascii=False, indent=2)
+    return items
+
+def load_corpus(paths):
+    """使用本地已有音频作为语料，时长从文件头读取"""
+    from services.parallel import probe_duration
+    return [{'file': os.path.abspath(path), 'duration': probe_duration(path)} for path in paths]
@@ -0,0 +1,239 @@
+"""转写吞吐与延迟基准
+
+每组参数在独立子进程中运行，模型加载时间与内存峰值互不影响；转写结果缓存始终关闭。
+
+    python -m benchmarks.transcribe_bench --models small --compute-types int8 float32 \\
+        --beam-sizes 1 5 --vad off on --batch-sizes 0 8 --baseline benchmarks/results/last.json
+"""
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from collections import namedtuple
+from statistics import median
+
+Config = namedtuple('Config', ['model', 'compute_type', 'cpu_threads', 'beam_size', 'vad', 'batch_size'])
+
+CSV_FIELDS = ['key', 'model', 'compute_type', 'cpu_threads', 'beam_size', 'vad', 'batch_size', 'status',
+              'load_time', 'audio_seconds', 'wall_seconds', 'rtf', 'audio_sec_per_sec', 'ttfs_median',
+              'ttfs_max', 'segments', 'peak_rss_mb', 'error']
+
+def config_key(config):
+    return (f"{config.model}/{config.compute_type}/threads{config.cpu_threads}/beam{config.beam_size}"
+            f"/vad-{'on' if config.vad else 'off'}/batch{config.batch_size}")
+
+def peak_rss_mb():
+    """当前进程的内存峰值(MB)，平台不支持时返回 None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为KB，macOS 为字节
+        return round(peak / 1024 / (1024 if sys.platform == 'darwin' else 1), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+    except (ImportError, AttributeError):
+        return None
+
+def _transcribe_file(engine, path, options):
+    started = time.perf_counter()
+    first_segment = None
+    count = 0
+    for _ in engine.transcribe(path, options):
+        if first_segment is None:
+            first_segment = time.perf_counter() - started
+        count += 1
+    wall = time.perf_counter() - started
+    return wall, first_segment if first_segment is not None else wall, count
+
+def _run_config(config, corpus, settings, result_queue):
+    from services.audio import audio_cache
+    from services.decoding import vad_parameters
+    from services.engine import DecodeOptions, TranscriptionEngine
+    from services.transcript_cache import transcript_cache
+
+    transcript_cache.configure(max_mb=0)
+    if not settings['audio_cache']:
+        audio_cache.configure(max_mb=0)
+    try:
+        engine = TranscriptionEngine(config.model, settings['device'], config.compute_type,
+                                     model_path=settings['model_path'], cpu_threads=config.cpu_threads)
+        started = time.perf_counter()
+        engine.load()
+        load_time = time.perf_counter() - started
+
+        options = DecodeOptions(settings['language'], config.batch_size,
+                                vad_parameters() if config.vad else None, 1, config.beam_size)
+        if settings['warmup']:
+            shortest = min(corpus, key=lambda item: item['duration'])
+            _transcribe_file(engine, shortest['file'], options)
+
+        files = []
+        for _ in range(settings['repeat']):
+            for item in corpus:
+                wall, ttfs, count = _transcribe_file(engine, item['file'], options)
+                files.append({
+                    'file': os.path.basename(item['file']),
+                    'duration': item['duration'],
+                    'wall': round(wall, 3),
+                    'ttfs': round(ttfs, 3),
+                    'segments': count,
+                    'rtf': round(wall / item['duration'], 4) if item['duration'] else None
+                })
+        engine.release()
+        result_queue.put({'status': 'ok', 'load_time': round(load_time, 3), 'files': files,
+                          'peak_rss_mb': peak_rss_mb()})
+    except Exception as e:
+        result_queue.put({'status': 'error', 'error': str(e), 'peak_rss_mb': peak_rss_mb()})
+
+def run_config(config, corpus, settings):
+    ctx = multiprocessing.get_context('spawn')
+    result_queue = ctx.Queue()
+    process = ctx.Process(target=_run_config, args=(config, corpus, settings, result_queue))
+    process.start()
+    try:
+        result = result_queue.get(timeout=settings['timeout'])
+    except Exception:
+        result = {'status': 'error', 'error': '超时或子进程异常退出'}
+    process.join(5)
+    if process.is_alive():
+        process.terminate()
+    return summarize(config, result)
+
+def summarize(config, result):
+    row = dict(config._asdict(), key=config_key(config), status=result['status'],
+               peak_rss_mb=result.get('peak_rss_mb'), error=result.get('error'))
+    files = result.get('files') or []
+    if files:
+        audio_seconds = sum(item['duration'] for item in files)
+        wall_seconds = sum(item['wall'] for item in files)
+        ttfs = [item['ttfs'] for item in files]
+        row.update({
+            'load_time': result['load_time'],
+            'audio_seconds': round(audio_seconds, 3),
+            'wall_seconds': round(wall_seconds, 3),
+            'rtf': round(wall_seconds / audio_seconds, 4) if audio_seconds else None,
+            'audio_sec_per_sec': round(audio_seconds / wall_seconds, 3) if wall_seconds else None,
+            'ttfs_median': round(median(ttfs), 3),
+            'ttfs_max': round(max(ttfs), 3),
+            'segments': sum(item['segments'] for item in files),
+            'files': files
+        })
+    return row
+
+def compare(results, baseline_path, max_regression):
+    """与基线按参数组合比较吞吐，返回是否有组合退化超过阈值"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {row['key']: row for row in json.load(f)['results']}
+    regressed = False
+    print(f"\n{'参数组合':<48}{'基线':>10}{'当前':>10}{'变化':>9}", file=sys.stderr)
+    for row in results:
+        base = baseline.get(row['key'])
+        if not base or not base.get('audio_sec_per_sec') or not row.get('audio_sec_per_sec'):
+            continue
+        change = row['audio_sec_per_sec'] / base['audio_sec_per_sec'] - 1
+        row['baseline_change'] = round(change, 4)
+        flag = ''
+        if change < -max_regression:
+            regressed = True
+            flag = '  退化'
+        print(f"{row['key']:<48}{base['audio_sec_per_sec']:>10.2f}{row['audio_sec_per_sec']:>10.2f}"
+              f"{change:>+9.1%}{flag}", file=sys.stderr)
+    return regressed
+
+def environment():
+    info = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count()
+    }
+    for module in ('faster_whisper', 'ctranslate2', 'av'):
+        try:
+            info[module] = __import__(module).__version__
+        except (ImportError, AttributeError):
+            info[module] = None
+    return info
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.transcribe_bench', description='转写性能基准')
+    parser.add_argument('--corpus-dir', default='./benchmarks/corpus', help='合成语料的存放目录')
+    parser.add_argument('--audio', nargs='+', help='使用本地音频文件代替合成语料')
+    parser.add_argument('--models', nargs='+', default=['small'])
+    parser.add_argument('--compute-types', nargs='+', default=['int8'])
+    parser.add_argument('--threads', nargs='+', type=int, default=[0], help='cpu_threads，0为自动')
+    parser.add_argument('--beam-sizes', nargs='+', type=int, default=[5])
+    parser.add_argument('--vad', nargs='+', choices=['off', 'on'], default=['off'])
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[0], help='0为不使用批量推理')
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--model-path')
+    parser.add_argument('--language', default='zh')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--no-warmup', action='store_true', help='不在计时前先转写一次最短的文件')
+    parser.add_argument('--audio-cache', action='store_true', help='允许使用解码后的音频缓存')
+    parser.add_argument('--timeout', type=float, default=3600, help='每组参数的超时时间(秒)')
+    parser.add_argument('--output', help='结果文件路径(不含扩展名)，默认 benchmarks/results/时间戳')
+    parser.add_argument('--baseline', help='用于比较的历史结果 JSON')
+    parser.add_argument('--max-regression', type=float, default=0.1, help='吞吐下降超过该比例时退出码为1')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.audio:
+        from benchmarks.corpus import load_corpus
+        corpus = load_corpus(args.audio)
+    else:
+        from benchmarks.corpus import build_corpus
+        corpus = build_corpus(args.corpus_dir)
+
+    settings = {
+        'device': args.device,
+        'model_path': args.model_path,
+        'language': args.language,
+        'repeat': max(args.repeat, 1),
+        'warmup': not args.no_warmup,
+        'audio_cache': args.audio_cache,
+        'timeout': args.timeout
+    }
+    configs = [
+        Config(model, compute_type, threads, beam_size, vad == 'on', batch_size)
+        for model, compute_type, threads, beam_size, vad, batch_size in itertools.product(
+            args.models, args.compute_types, args.threads, args.beam_sizes, args.vad, args.batch_sizes)
+    ]
+
+    results = []
+    for index, config in enumerate(configs, 1):
+        print(f"[{index}/{len(configs)}] {config_key(config)}", file=sys.stderr, flush=True)
+        row = run_config(config, corpus, settings)
+        if row['status'] == 'ok':
+            print(f"    加载 {row['load_time']:.2f}s  RTF {row['rtf']:.3f}  {row['audio_sec_per_sec']:.2f} 音频秒/秒"
+                  f"  首段 {row['ttfs_median']:.2f}s  内存峰值 {row['peak_rss_mb']} MB", file=sys.stderr)
+        else:
+            print(f"    失败: {row['error']}", file=sys.stderr)
+        results.append(row)
+
+    regressed = compare(results, args.baseline, args.max_regression) if args.baseline else False
+
+    output = args.output or os.path.join('benchmarks', 'results', time.strftime('%Y%m%d-%H%M%S'))
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output + '.json', 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment(), 'settings': settings, 'corpus': corpus, 'results': results},
+                  f, ensure_ascii=False, indent=2)
+    with open(output + '.csv', 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"\n结果已保存至 {output}.json / {output}.csv", file=sys.stderr)
+
+    failed = any(row['status'] != 'ok' for row in results)
+    return 1 if regressed or failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,9 +6,18 @@ from PyQt5.QtGui import QFont
 from qfluentwidgets import (FluentWindow, PushButton, RadioButton, 
                           ComboBox, TextEdit, ProgressBar, setTheme, Theme, 
                           PrimaryPushButton, SubtitleLabel, setFont, FluentIcon, TitleLabel,
-                          CardWidget, ScrollArea, NavigationItemPosition, InfoBar, InfoBarPosition)
-from services.transcribe import TranscribeWorker, MultiTranscribeWorker
+                          CardWidget, ScrollArea, NavigationItemPosition, InfoBar, InfoBarPosition, BodyLabel)
+from services.transcribe import TranscribeWorker, MultiTranscribeWorker, ParallelTranscribeWorker, LiveTranscribeWorker
 from services.api_server import APIServer
+from services.exporters import export_segments
+from services.manifest import output_path_for
+from services.audio import audio_cache
+from services.decoding import vad_parameters
+from services.model_pool import model_pool
+from services.segments import SegmentStore
+from services.transcript_cache import transcript_cache
+from widgets.segment_view import SegmentListView
+from widgets.stats_panel import StatsPanel
 from opencc import OpenCC
 
 class WhisperInterface(ScrollArea):
@@ -20,6 +29,7 @@ class WhisperInterface(ScrollArea):
         self.cc = OpenCC('t2s')
         self.is_recognizing = False
         self.audio_file = None
+        self.store = SegmentStore()  # 结构化的转写结果，保存时直接导出
 
          # 设置样式表
         self.setStyleSheet("QWidget{background: transparent}")
@@ -113,9 +123,9 @@ class WhisperInterface(ScrollArea):
         self.main_layout.addLayout(control_layout)
         
         # 文本显示区域
-        self.result_text_edit = TextEdit(self)
-        self.result_text_edit.setReadOnly(True)
-        self.main_layout.addWidget(self.result_text_edit)
+        # 虚拟化列表只绘制可见行，长音频的结果再多也不会拖慢界面
+        self.result_view = SegmentListView(self)
+        self.main_layout.addWidget(self.result_view)
 
     def create_bottom_area(self):
         # 底部区域
@@ -139,7 +149,14 @@ class WhisperInterface(ScrollArea):
         self.save_button.clicked.connect(self.save_result)
 
     def update_text_edit(self, text):
-        self.result_text_edit.append(text)
+        self.result_view.append_text(text)
+
+    def add_segments(self, segments):
+        rows = []
+        for audio_file, segment in segments:
+            self.store.append(segment)
+            rows.append((self.store, len(self.store) - 1))
+        self.result_view.append_rows(rows)
 
     def update_progress_bar(self, progress):
         self.progress_bar.setValue(progress)
@@ -190,7 +207,8 @@ class WhisperInterface(ScrollArea):
             if not self.is_recognizing:
                 self.is_recognizing = True
                 self.recognition_started.emit()
-                self.result_text_edit.clear()
+                self.result_view.clear()
+                self.store = SegmentStore()
                 self.recognize_button.setText('停止识别')
                 
                 # 获取语言代码
@@ -204,11 +222,17 @@ class WhisperInterface(ScrollArea):
                     settings.device_type.currentText().lower(),
                     settings.compute_type.currentText(),
                     self,
-                    language=language
+                    model_path=settings.model_path_edit.toPlainText().strip() or None,
+                    language=language,
+                    batch_size=settings.get_batch_size(),
+                    vad=settings.get_vad_parameters(),
+                    chunk_workers=settings.chunk_workers.value(),
+                    word_timestamps=settings.word_timestamps.isChecked()
                 )
                 
                 # 连接信号
                 self.transcribe_thread.transcribe_signal.connect(self.update_text_edit)
+                self.transcribe_thread.segments_signal.connect(self.add_segments)
                 self.transcribe_thread.progress_signal.connect(self.update_progress_bar)
                 self.transcribe_thread.complete_signal.connect(self.update_recognize_button)
                 self.transcribe_thread.complete_signal.connect(lambda status: self.recognition_finished.emit())  # 添加完成信号连接
@@ -221,6 +245,7 @@ class WhisperInterface(ScrollArea):
                     # 断开所有信号连接，防止后续信号导致问题
                     try:
                         self.transcribe_thread.transcribe_signal.disconnect()
+                        self.transcribe_thread.segments_signal.disconnect()
                         self.transcribe_thread.progress_signal.disconnect()
                         self.transcribe_thread.complete_signal.disconnect()
                     except:
@@ -254,7 +279,7 @@ class WhisperInterface(ScrollArea):
             )
     
     def save_result(self):
-        if not self.result_text_edit.toPlainText():
+        if not self.store:
             InfoBar.warning(
                 title='警告',
                 content="没有可保存的内容",
@@ -269,56 +294,13 @@ class WhisperInterface(ScrollArea):
             self, 
             "保存文件", 
             './', 
-            "Text Files (*.txt);;Subtitle Files (*.srt);;All Files (*)"
+            "Text Files (*.txt);;Subtitle Files (*.srt);;WebVTT Files (*.vtt);;JSON Files (*.json);;All Files (*)"
         )
         
         if file_path:
             try:
-                filtered_lines = [
-                    line for line in self.result_text_edit.toPlainText().split('\n')
-                    if line.strip() and 
-                    "初次使用将下载模型" not in line and 
-                    "模型下载完毕" not in line
-                ]
-                
-                if file_path.endswith('.srt'):
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        counter = 1
-                        for line in filtered_lines:
-                            if line.strip() and '[' in line and ']' in line:
-                                try:
-                                    # 解析时间戳
-                                    time_str = line[line.find('[')+1:line.find(']')]
-                                    text = line[line.find(']')+1:].strip()
-                                    
-                                    # 移除's'并转换为浮点数
-                                    start_time = float(time_str.split('->')[0].strip().replace('s', ''))
-                                    end_time = float(time_str.split('->')[1].strip().replace('s', ''))
-                                    
-                                    # 转换为srt时间格式
-                                    start = "{:02d}:{:02d}:{:02d},{:03d}".format(
-                                        int(start_time // 3600),
-                                        int((start_time % 3600) // 60),
-                                        int(start_time % 60),
-                                        int((start_time % 1) * 1000)
-                                    )
-                                    end = "{:02d}:{:02d}:{:02d},{:03d}".format(
-                                        int(end_time // 3600),
-                                        int((end_time % 3600) // 60),
-                                        int(end_time % 60),
-                                        int((end_time % 1) * 1000)
-                                    )
-                                    
-                                    # 写入srt格式
-                                    f.write(f"{counter}\n")
-                                    f.write(f"{start} --> {end}\n")
-                                    f.write(f"{text}\n\n")
-                                    counter += 1
-                                except ValueError as ve:
-                                    continue  # 跳过无效的时间戳行
-                else:
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write('\n'.join(filtered_lines))
+                # 直接从结构化结果导出，不再从文本框解析时间戳
+                export_segments(file_path, {self.audio_file: self.store})
                 
                 InfoBar.success(
                     title='成功',
@@ -339,6 +321,235 @@ class WhisperInterface(ScrollArea):
                     parent=self
                 )
 
+class LiveInterface(ScrollArea):
+    recognition_started = pyqtSignal()
+    recognition_finished = pyqtSignal()
+    def __init__(self, parent=None):
+        super().__init__(parent=parent)
+        self.setObjectName('liveInterface')
+        self.is_recognizing = False
+        self.audio_file = None
+        self.source_name = None
+        self.store = SegmentStore()
+        self.transcribe_thread = None
+
+        self.setStyleSheet("QWidget{background: transparent}")
+        
+        self.main_widget = QWidget()
+        self.main_layout = QVBoxLayout(self.main_widget)
+        self.setWidget(self.main_widget)
+        self.setWidgetResizable(True)
+
+        self.title = TitleLabel('实时转写', self)
+        self.main_layout.addWidget(self.title)
+        self.main_layout.addSpacing(10)
+        
+        self.create_top_area()
+        self.create_middle_area()
+        self.create_bottom_area()
+        self.setup_connections()
+
+    def create_top_area(self):
+        top_layout = QHBoxLayout()
+        
+        # 音源选择区域
+        self.source_frame = CardWidget()
+        source_layout = QVBoxLayout(self.source_frame)
+        source_layout.setContentsMargins(20, 5, 20, 10)
+        self.source_frame.setMaximumHeight(160)
+        
+        self.source_label = SubtitleLabel('音源', self.source_frame)
+        self.mic_radio = RadioButton('麦克风(需要安装 sounddevice)', self.source_frame)
+        self.file_radio = RadioButton('音频文件(按播放速度模拟实时输入)', self.source_frame)
+        self.mic_radio.setChecked(True)
+        self.file_button = PushButton(FluentIcon.FOLDER, '选择文件', self.source_frame)
+        self.file_button.setEnabled(False)
+        
+        source_layout.addWidget(self.source_label)
+        source_layout.addSpacing(10)
+        source_layout.addWidget(self.mic_radio)
+        source_layout.addWidget(self.file_radio)
+        source_layout.addWidget(self.file_button)
+        source_layout.addStretch()
+        
+        # 模型和语言选择区域
+        self.model_frame = CardWidget()
+        model_layout = QVBoxLayout(self.model_frame)
+        model_layout.setContentsMargins(20, 5, 20, 10)
+        self.model_frame.setMaximumHeight(160)
+        
+        self.model_label = SubtitleLabel('模型选择', self.model_frame)
+        self.small_radio = RadioButton('small: 延迟最低，适合实时字幕', self.model_frame)
+        self.medium_radio = RadioButton('medium: 精度更高，需要较快的CPU或GPU', self.model_frame)
+        self.small_radio.setChecked(True)
+        
+        lang_layout = QHBoxLayout()
+        lang_layout.addWidget(SubtitleLabel('语言:', self.model_frame))
+        self.language_combo = ComboBox(self.model_frame)
+        self.language_combo.addItems(['中文', '英语', '日语'])
+        self.language_combo.setCurrentIndex(0)
+        lang_layout.addWidget(self.language_combo)
+        lang_layout.addStretch()
+        
+        model_layout.addWidget(self.model_label)
+        model_layout.addSpacing(10)
+        model_layout.addWidget(self.small_radio)
+        model_layout.addWidget(self.medium_radio)
+        model_layout.addLayout(lang_layout)
+        model_layout.addStretch()
+        
+        top_layout.addWidget(self.source_frame)
+        top_layout.addWidget(self.model_frame)
+        self.main_layout.addLayout(top_layout)
+
+    def create_middle_area(self):
+        control_layout = QHBoxLayout()
+        self.recognize_button = PrimaryPushButton('开始收听', self)
+        self.recognize_button.setFixedWidth(200)
+        control_layout.addStretch(1)
+        control_layout.addWidget(self.recognize_button)
+        control_layout.addStretch(1)
+        self.main_layout.addLayout(control_layout)
+        
+        # 已断句的最终分段
+        self.result_view = SegmentListView(self)
+        self.main_layout.addWidget(self.result_view)
+        
+        # 正在说的这句话的临时结果，断句后清空
+        self.partial_label = BodyLabel('', self)
+        self.partial_label.setWordWrap(True)
+        self.partial_label.setStyleSheet("color: gray")
+        self.main_layout.addWidget(self.partial_label)
+
+    def create_bottom_area(self):
+        bottom_layout = QHBoxLayout()
+        self.save_button = PushButton(FluentIcon.SAVE, '保存结果', self)
+        bottom_layout.addWidget(self.save_button)
+        bottom_layout.addStretch()
+        self.main_layout.addLayout(bottom_layout)
+
+    def setup_connections(self):
+        self.file_radio.toggled.connect(self.file_button.setEnabled)
+        self.file_button.clicked.connect(self.select_file)
+        self.recognize_button.clicked.connect(self.check_and_recognize)
+        self.save_button.clicked.connect(self.save_result)
+
+    def update_text_edit(self, text):
+        self.result_view.append_text(text)
+
+    def update_partial(self, text):
+        self.partial_label.setText(text)
+
+    def add_segments(self, segments):
+        rows = []
+        for source_name, segment in segments:
+            self.store.append(segment)
+            rows.append((self.store, len(self.store) - 1))
+        self.result_view.append_rows(rows)
+
+    def on_complete(self, status):
+        self.partial_label.setText('')
+        self.recognize_button.setText('开始收听')
+        self.recognize_button.setEnabled(True)
+        self.is_recognizing = False
+        self.transcribe_thread = None
+        self.recognition_finished.emit()
+
+    def select_file(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "选择音频文件", "", "Audio files (*.wav *.mp3);;All files (*)")
+        if file_path:
+            self.audio_file = file_path
+            self.file_button.setText(os.path.basename(file_path))
+
+    def show_error(self, content):
+        InfoBar.error(
+            title='错误',
+            content=content,
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            parent=self
+        )
+
+    def check_and_recognize(self):
+        if self.is_recognizing:
+            # 停止收音后窗口内剩余的语音仍会断句输出，完成后恢复按钮
+            if self.transcribe_thread is not None:
+                self.transcribe_thread.stop()
+            self.recognize_button.setText('正在结束...')
+            self.recognize_button.setEnabled(False)
+            return
+        
+        audio_file = None
+        if self.file_radio.isChecked():
+            if not self.audio_file:
+                self.show_error("请先选择音频文件")
+                return
+            audio_file = self.audio_file
+        
+        settings = self.window().settings_interface
+        lang_map = {'中文': 'zh', '英语': 'en', '日语': 'ja'}
+        try:
+            self.transcribe_thread = LiveTranscribeWorker(
+                'medium' if self.medium_radio.isChecked() else 'small',
+                settings.device_type.currentText().lower(),
+                settings.compute_type.currentText(),
+                self,
+                model_path=settings.model_path_edit.toPlainText().strip() or None,
+                language=lang_map[self.language_combo.currentText()],
+                audio_file=audio_file,
+                vad=settings.get_vad_parameters()
+            )
+        except Exception as e:
+            self.show_error(str(e))
+            return
+        
+        self.is_recognizing = True
+        self.recognition_started.emit()
+        self.result_view.clear()
+        self.partial_label.setText('')
+        self.store = SegmentStore()
+        self.source_name = self.transcribe_thread.source.name
+        self.recognize_button.setText('停止收听')
+        
+        self.transcribe_thread.transcribe_signal.connect(self.update_text_edit)
+        self.transcribe_thread.segments_signal.connect(self.add_segments)
+        self.transcribe_thread.partial_signal.connect(self.update_partial)
+        self.transcribe_thread.complete_signal.connect(self.on_complete)
+        self.transcribe_thread.start()
+    
+    def save_result(self):
+        if not self.store:
+            InfoBar.warning(
+                title='警告',
+                content="没有可保存的内容",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                parent=self
+            )
+            return
+        
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "保存文件",
+            './',
+            "Text Files (*.txt);;Subtitle Files (*.srt);;WebVTT Files (*.vtt);;JSON Files (*.json);;All Files (*)"
+        )
+        if file_path:
+            try:
+                export_segments(file_path, {self.source_name: self.store})
+                InfoBar.success(
+                    title='成功',
+                    content="文件保存成功！",
+                    orient=Qt.Horizontal,
+                    isClosable=True,
+                    position=InfoBarPosition.TOP,
+                    parent=self
+                )
+            except Exception as e:
+                self.show_error(f"保存文件失败: {str(e)}")
+
 class MultiwhisperInterface(ScrollArea):
     recognition_started = pyqtSignal()
     recognition_finished = pyqtSignal()
@@ -350,6 +561,7 @@ class MultiwhisperInterface(ScrollArea):
         self.is_recognizing = False
         self.audio_files = []
         self.save_directory = None
+        self.stores = {}  # 音频文件 -> 结构化的转写结果
 
         # 设置样式表
         self.setStyleSheet("QWidget{background: transparent}")
@@ -439,9 +651,9 @@ class MultiwhisperInterface(ScrollArea):
         self.main_layout.addLayout(control_layout)
         
         # 文本显示区域
-        self.result_text_edit = TextEdit(self)
-        self.result_text_edit.setReadOnly(True)
-        self.main_layout.addWidget(self.result_text_edit)
+        # 虚拟化列表只绘制可见行，长音频的结果再多也不会拖慢界面
+        self.result_view = SegmentListView(self)
+        self.main_layout.addWidget(self.result_view)
 
     def create_bottom_area(self):
         bottom_layout = QHBoxLayout()
@@ -481,6 +693,7 @@ class MultiwhisperInterface(ScrollArea):
             
             if audio_files:
                 self.audio_files = audio_files
+                self.save_directory = None  # 输出到新选择的文件夹
                 self.file_button.setText(f'已选择: {len(audio_files)}个音频文件')
                 self.file_button.setToolTip('\n'.join(audio_files))
             else:
@@ -494,7 +707,15 @@ class MultiwhisperInterface(ScrollArea):
                 )
 
     def update_text_edit(self, text):
-        self.result_text_edit.append(text)
+        self.result_view.append_text(text)
+
+    def add_segments(self, segments):
+        rows = []
+        for audio_file, segment in segments:
+            store = self.stores.setdefault(audio_file, SegmentStore())
+            store.append(segment)
+            rows.append((store, len(store) - 1))
+        self.result_view.append_rows(rows)
 
     def update_progress_bar(self, progress):
         self.progress_bar.setValue(progress)
@@ -510,28 +731,12 @@ class MultiwhisperInterface(ScrollArea):
                 self.save_directory = os.path.dirname(self.audio_files[0])
             
             # 构建输出文件路径
-            base_name = os.path.splitext(os.path.basename(file_name))[0]
-            save_path = os.path.join(self.save_directory, f"{base_name}.txt")
+            save_path = output_path_for(file_name, self.save_directory)
             
-            # 获取当前文本并过滤
-            text = self.result_text_edit.toPlainText()
-            current_file_text = []
-            is_current_file = False
-            
-            for line in text.split('\n'):
-                if f"正在处理: {os.path.basename(file_name)}" in line:
-                    is_current_file = True
-                    continue
-                elif "正在处理:" in line:
-                    is_current_file = False
-                elif is_current_file and line.strip():
-                    current_file_text.append(line)
-            
-            # 保存文件
-            with open(save_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(current_file_text))
+            # 只导出该文件自己的分段
+            export_segments(save_path, {file_name: self.stores.get(file_name, SegmentStore())})
                 
-            self.transcribe_signal.emit(f"\n已保存至: {save_path}\n")
+            self.update_text_edit(f"\n已保存至: {save_path}\n")
             
         except Exception as e:
             InfoBar.error(
@@ -578,25 +783,55 @@ class MultiwhisperInterface(ScrollArea):
             if not self.is_recognizing:
                 self.is_recognizing = True
                 self.recognition_started.emit()
-                self.result_text_edit.clear()
+                self.result_view.clear()
+                self.stores = {}
                 self.recognize_button.setText('停止识别')
                 
                 # 获取语言代码
                 lang_map = {'中文': 'zh', '英语': 'en', '日语': 'ja'}
                 language = lang_map[self.language_combo.currentText()]
                 
-                # 创建并配置转录线程
-                self.transcribe_thread = MultiTranscribeWorker(
-                    model_size,
-                    self.audio_files,
-                    settings.device_type.currentText().lower(),
-                    settings.compute_type.currentText(),
-                    self,
-                    language=language
-                )
+                # 输出目录下的转写清单用于断点续传
+                if not self.save_directory:
+                    self.save_directory = os.path.dirname(self.audio_files[0])
+                
+                # 创建并配置转录线程，设置了多个进程时按文件并行转写
+                processes = settings.parallel_processes.value()
+                if processes > 1 and len(self.audio_files) > 1:
+                    self.transcribe_thread = ParallelTranscribeWorker(
+                        model_size,
+                        self.audio_files,
+                        settings.device_type.currentText().lower(),
+                        settings.compute_type.currentText(),
+                        self,
+                        model_path=settings.model_path_edit.toPlainText().strip() or None,
+                        language=language,
+                        batch_size=settings.get_batch_size(),
+                        processes=processes,
+                        output_dir=self.save_directory,
+                        vad=settings.get_vad_parameters(),
+                        chunk_workers=settings.chunk_workers.value(),
+                        word_timestamps=settings.word_timestamps.isChecked()
+                    )
+                else:
+                    self.transcribe_thread = MultiTranscribeWorker(
+                        model_size,
+                        self.audio_files,
+                        settings.device_type.currentText().lower(),
+                        settings.compute_type.currentText(),
+                        self,
+                        model_path=settings.model_path_edit.toPlainText().strip() or None,
+                        language=language,
+                        batch_size=settings.get_batch_size(),
+                        output_dir=self.save_directory,
+                        vad=settings.get_vad_parameters(),
+                        chunk_workers=settings.chunk_workers.value(),
+                        word_timestamps=settings.word_timestamps.isChecked()
+                    )
                 
                 # 连接信号
                 self.transcribe_thread.transcribe_signal.connect(self.update_text_edit)
+                self.transcribe_thread.segments_signal.connect(self.add_segments)
                 self.transcribe_thread.progress_signal.connect(self.update_progress_bar)
                 self.transcribe_thread.complete_signal.connect(self.update_recognize_button)
                 self.transcribe_thread.file_complete_signal.connect(self.auto_save_result)  # 添加自动保存信号连接
@@ -610,6 +845,7 @@ class MultiwhisperInterface(ScrollArea):
                     # 断开所有信号连接，防止后续信号导致问题
                     try:
                         self.transcribe_thread.transcribe_signal.disconnect()
+                        self.transcribe_thread.segments_signal.disconnect()
                         self.transcribe_thread.progress_signal.disconnect()
                         self.transcribe_thread.complete_signal.disconnect()
                         self.transcribe_thread.file_complete_signal.disconnect()
@@ -644,7 +880,7 @@ class MultiwhisperInterface(ScrollArea):
             )
     
     def save_result(self):
-        if not self.result_text_edit.toPlainText():
+        if not any(self.stores.values()):
             InfoBar.warning(
                 title='警告',
                 content="没有可保存的内容",
@@ -659,56 +895,13 @@ class MultiwhisperInterface(ScrollArea):
             self, 
             "保存文件", 
             './', 
-            "Text Files (*.txt);;Subtitle Files (*.srt);;All Files (*)"
+            "Text Files (*.txt);;Subtitle Files (*.srt);;WebVTT Files (*.vtt);;JSON Files (*.json);;All Files (*)"
         )
         
         if file_path:
             try:
-                filtered_lines = [
-                    line for line in self.result_text_edit.toPlainText().split('\n')
-                    if line.strip() and 
-                    "初次使用将下载模型" not in line and 
-                    "模型下载完毕" not in line
-                ]
-                
-                if file_path.endswith('.srt'):
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        counter = 1
-                        for line in filtered_lines:
-                            if line.strip() and '[' in line and ']' in line:
-                                try:
-                                    # 解析时间戳
-                                    time_str = line[line.find('[')+1:line.find(']')]
-                                    text = line[line.find(']')+1:].strip()
-                                    
-                                    # 移除's'并转换为浮点数
-                                    start_time = float(time_str.split('->')[0].strip().replace('s', ''))
-                                    end_time = float(time_str.split('->')[1].strip().replace('s', ''))
-                                    
-                                    # 转换为srt时间格式
-                                    start = "{:02d}:{:02d}:{:02d},{:03d}".format(
-                                        int(start_time // 3600),
-                                        int((start_time % 3600) // 60),
-                                        int(start_time % 60),
-                                        int((start_time % 1) * 1000)
-                                    )
-                                    end = "{:02d}:{:02d}:{:02d},{:03d}".format(
-                                        int(end_time // 3600),
-                                        int((end_time % 3600) // 60),
-                                        int(end_time % 60),
-                                        int((end_time % 1) * 1000)
-                                    )
-                                    
-                                    # 写入srt格式
-                                    f.write(f"{counter}\n")
-                                    f.write(f"{start} --> {end}\n")
-                                    f.write(f"{text}\n\n")
-                                    counter += 1
-                                except ValueError as ve:
-                                    continue  # 跳过无效的时间戳行
-                else:
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write('\n'.join(filtered_lines))
+                # 直接从结构化结果导出，不再从文本框解析时间戳
+                export_segments(file_path, self.stores)
                 
                 InfoBar.success(
                     title='成功',
@@ -762,6 +955,91 @@ class SettingsInterface(ScrollArea):
         
         self.main_layout.addWidget(device_frame)
         
+        from qfluentwidgets import SwitchButton, SpinBox, DoubleSpinBox
+        
+        # 推理设置
+        inference_frame = CardWidget()
+        inference_layout = QVBoxLayout(inference_frame)
+        
+        inference_layout.addWidget(SubtitleLabel('推理设置', inference_frame))
+        
+        # 批量推理：按VAD切分后多个片段一起解码，长音频与批量转写速度更快
+        self.batched_enabled = SwitchButton(inference_frame)
+        batched_layout = QHBoxLayout()
+        batched_layout.addWidget(SubtitleLabel('批量推理', inference_frame))
+        batched_layout.addWidget(self.batched_enabled)
+        batched_layout.addStretch()
+        inference_layout.addLayout(batched_layout)
+        
+        batch_size_layout = QHBoxLayout()
+        batch_size_layout.addWidget(SubtitleLabel('批大小', inference_frame))
+        self.batch_size = SpinBox(inference_frame)
+        self.batch_size.setRange(1, 64)
+        self.batch_size.setValue(8)
+        batch_size_layout.addWidget(self.batch_size)
+        batch_size_layout.addStretch()
+        inference_layout.addLayout(batch_size_layout)
+        
+        # 多条转写的并行进程数，每个进程持有一份模型并均分CPU线程
+        processes_layout = QHBoxLayout()
+        processes_layout.addWidget(SubtitleLabel('多条转写并行进程数', inference_frame))
+        self.parallel_processes = SpinBox(inference_frame)
+        self.parallel_processes.setRange(1, max(os.cpu_count() or 1, 1))
+        self.parallel_processes.setValue(1)
+        processes_layout.addWidget(self.parallel_processes)
+        processes_layout.addStretch()
+        inference_layout.addLayout(processes_layout)
+        
+        # 单条转写时长音频在静音处切块，由多个线程并行解码(批量推理开启时不生效)
+        chunk_layout = QHBoxLayout()
+        chunk_layout.addWidget(SubtitleLabel('长音频分块并行数', inference_frame))
+        self.chunk_workers = SpinBox(inference_frame)
+        self.chunk_workers.setRange(1, max(os.cpu_count() or 1, 1))
+        self.chunk_workers.setValue(1)
+        chunk_layout.addWidget(self.chunk_workers)
+        chunk_layout.addStretch()
+        inference_layout.addLayout(chunk_layout)
+        
+        # VAD：解码前去除静音等非语音部分，会议、客服录音可显著减少解码时长
+        self.vad_enabled = SwitchButton(inference_frame)
+        vad_layout = QHBoxLayout()
+        vad_layout.addWidget(SubtitleLabel('VAD过滤静音', inference_frame))
+        vad_layout.addWidget(self.vad_enabled)
+        vad_layout.addStretch()
+        inference_layout.addLayout(vad_layout)
+        
+        vad_params_layout = QHBoxLayout()
+        vad_params_layout.addWidget(SubtitleLabel('阈值', inference_frame))
+        self.vad_threshold = DoubleSpinBox(inference_frame)
+        self.vad_threshold.setRange(0.05, 0.95)
+        self.vad_threshold.setSingleStep(0.05)
+        self.vad_threshold.setValue(0.5)
+        vad_params_layout.addWidget(self.vad_threshold)
+        vad_params_layout.addWidget(SubtitleLabel('最短静音(ms)', inference_frame))
+        self.vad_min_silence = SpinBox(inference_frame)
+        self.vad_min_silence.setRange(0, 10000)
+        self.vad_min_silence.setSingleStep(100)
+        self.vad_min_silence.setValue(2000)
+        vad_params_layout.addWidget(self.vad_min_silence)
+        vad_params_layout.addWidget(SubtitleLabel('语音填充(ms)', inference_frame))
+        self.vad_speech_pad = SpinBox(inference_frame)
+        self.vad_speech_pad.setRange(0, 2000)
+        self.vad_speech_pad.setSingleStep(50)
+        self.vad_speech_pad.setValue(400)
+        vad_params_layout.addWidget(self.vad_speech_pad)
+        vad_params_layout.addStretch()
+        inference_layout.addLayout(vad_params_layout)
+        
+        # 逐词时间戳：导出 JSON 时包含每个词的时间与概率，VTT 字幕逐词高亮
+        self.word_timestamps = SwitchButton(inference_frame)
+        word_layout = QHBoxLayout()
+        word_layout.addWidget(SubtitleLabel('逐词时间戳', inference_frame))
+        word_layout.addWidget(self.word_timestamps)
+        word_layout.addStretch()
+        inference_layout.addLayout(word_layout)
+        
+        self.main_layout.addWidget(inference_frame)
+        
         # API设置
         api_frame = CardWidget()
         api_layout = QVBoxLayout(api_frame)
@@ -769,7 +1047,6 @@ class SettingsInterface(ScrollArea):
         api_layout.addWidget(SubtitleLabel('API设置', api_frame))
         
         # API启用开关
-        from qfluentwidgets import SwitchButton, SpinBox
         self.api_enabled = SwitchButton(api_frame)
         api_enabled_layout = QHBoxLayout()
         api_enabled_layout.addWidget(SubtitleLabel('启用API服务', api_frame))
@@ -818,10 +1095,21 @@ class SettingsInterface(ScrollArea):
         self.api_enabled.checkedChanged.connect(self.on_api_config_changed)
         self.api_port.valueChanged.connect(self.on_api_config_changed)
         
-        # 检查配置文件中的模型路径和API设置
+        # 检查配置文件中的模型路径、推理和API设置
         self.load_model_path()
+        self.load_inference_config()
         self.load_api_config()
         
+        self.batched_enabled.checkedChanged.connect(self.save_inference_config)
+        self.batch_size.valueChanged.connect(self.save_inference_config)
+        self.parallel_processes.valueChanged.connect(self.save_inference_config)
+        self.chunk_workers.valueChanged.connect(self.save_inference_config)
+        self.vad_enabled.checkedChanged.connect(self.save_inference_config)
+        self.vad_threshold.valueChanged.connect(self.save_inference_config)
+        self.vad_min_silence.valueChanged.connect(self.save_inference_config)
+        self.vad_speech_pad.valueChanged.connect(self.save_inference_config)
+        self.word_timestamps.checkedChanged.connect(self.save_inference_config)
+        
         self.main_layout.addStretch()
 
     def select_model_path(self):
@@ -964,6 +1252,75 @@ class SettingsInterface(ScrollArea):
                 parent=self
             )
     
+    def get_batch_size(self):
+        # 未启用批量推理时返回0
+        return self.batch_size.value() if self.batched_enabled.isChecked() else 0
+    
+    def get_vad_parameters(self):
+        # 未启用VAD时返回None
+        if not self.vad_enabled.isChecked():
+            return None
+        return vad_parameters(round(self.vad_threshold.value(), 2), self.vad_min_silence.value(),
+                              self.vad_speech_pad.value())
+    
+    def save_inference_config(self):
+        try:
+            import json
+            config = {}
+            if os.path.exists("config.json"):
+                with open("config.json", "r", encoding="utf-8") as f:
+                    config = json.load(f)
+            
+            config["batched_inference"] = self.batched_enabled.isChecked()
+            config["batch_size"] = self.batch_size.value()
+            config["parallel_processes"] = self.parallel_processes.value()
+            config["chunk_workers"] = self.chunk_workers.value()
+            config["vad_filter"] = self.vad_enabled.isChecked()
+            config["vad_threshold"] = round(self.vad_threshold.value(), 2)
+            config["vad_min_silence_ms"] = self.vad_min_silence.value()
+            config["vad_speech_pad_ms"] = self.vad_speech_pad.value()
+            config["word_timestamps"] = self.word_timestamps.isChecked()
+            
+            with open("config.json", "w", encoding="utf-8") as f:
+                json.dump(config, f, ensure_ascii=False, indent=4)
+        except Exception as e:
+            InfoBar.error(
+                title='错误',
+                content=f"保存推理配置失败: {str(e)}",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                parent=self
+            )
+    
+    def load_inference_config(self):
+        try:
+            import json
+            if os.path.exists("config.json"):
+                with open("config.json", "r", encoding="utf-8") as f:
+                    config = json.load(f)
+                
+                if "batched_inference" in config:
+                    self.batched_enabled.setChecked(config["batched_inference"])
+                if "batch_size" in config:
+                    self.batch_size.setValue(config["batch_size"])
+                if "parallel_processes" in config:
+                    self.parallel_processes.setValue(config["parallel_processes"])
+                if "chunk_workers" in config:
+                    self.chunk_workers.setValue(config["chunk_workers"])
+                if "vad_filter" in config:
+                    self.vad_enabled.setChecked(config["vad_filter"])
+                if "vad_threshold" in config:
+                    self.vad_threshold.setValue(config["vad_threshold"])
+                if "vad_min_silence_ms" in config:
+                    self.vad_min_silence.setValue(config["vad_min_silence_ms"])
+                if "vad_speech_pad_ms" in config:
+                    self.vad_speech_pad.setValue(config["vad_speech_pad_ms"])
+                if "word_timestamps" in config:
+                    self.word_timestamps.setChecked(config["word_timestamps"])
+        except Exception:
+            pass
+    
     def save_api_config(self):
         try:
             import json
@@ -1008,6 +1365,22 @@ class SettingsInterface(ScrollArea):
         if hasattr(main_window, 'restart_api_server'):
             main_window.restart_api_server()
 
+class StatsInterface(ScrollArea):
+    def __init__(self, parent=None):
+        super().__init__(parent=parent)
+        self.setObjectName('statsInterface')
+        self.setStyleSheet("QWidget{background: transparent}")
+        
+        self.main_widget = QWidget()
+        self.main_layout = QVBoxLayout(self.main_widget)
+        self.setWidget(self.main_widget)
+        self.setWidgetResizable(True)
+        
+        # GUI、API与命令行共用进程内的指标，API服务开启时同样可通过 /metrics 读取
+        self.stats_panel = StatsPanel(self)
+        self.main_layout.addWidget(self.stats_panel)
+        self.main_layout.addStretch(1)
+
 class MainWindow(FluentWindow):
     def __init__(self):
         super().__init__()
@@ -1026,14 +1399,18 @@ class MainWindow(FluentWindow):
         # 创建并添加主界面
         self.whisper_interface = WhisperInterface(self)
         self.whisper_interface.setObjectName('whisperInterface')  # 设置对象名称
+        self.live_interface = LiveInterface(self)
         self.multi_whisper_interface = MultiwhisperInterface(self)
         self.multi_whisper_interface.setObjectName('multiWhisperInterface')  # 设置对象名称
         self.settings_interface = SettingsInterface(self)
         self.settings_interface.setObjectName('settingsInterface')
+        self.stats_interface = StatsInterface(self)
 
         # 连接信号
         self.whisper_interface.recognition_started.connect(self.disable_navigation)
         self.whisper_interface.recognition_finished.connect(self.enable_navigation)
+        self.live_interface.recognition_started.connect(self.disable_navigation)
+        self.live_interface.recognition_finished.connect(self.enable_navigation)
         # 添加多条转写界面的信号连接
         self.multi_whisper_interface.recognition_started.connect(self.disable_navigation)
         self.multi_whisper_interface.recognition_finished.connect(self.enable_navigation)
@@ -1044,6 +1421,12 @@ class MainWindow(FluentWindow):
             '单条转写',
             position=NavigationItemPosition.TOP  # 设置导航位置
         )
+        self.addSubInterface(
+            self.live_interface,
+            FluentIcon.MICROPHONE,
+            '实时转写',
+            position=NavigationItemPosition.TOP
+        )
         self.addSubInterface(
             self.multi_whisper_interface,
             FluentIcon.CAFE,
@@ -1056,6 +1439,12 @@ class MainWindow(FluentWindow):
             '设置',
             position=NavigationItemPosition.TOP
         )
+        self.addSubInterface(
+            self.stats_interface,
+            FluentIcon.SPEED_HIGH,
+            '性能统计',
+            position=NavigationItemPosition.BOTTOM
+        )
         
         # 启动API服务
         self.start_api_server()
@@ -1068,11 +1457,15 @@ class MainWindow(FluentWindow):
                     config = json.load(f)
                 
                 if config.get("api_enabled", False):
-                    api_config = {
+                    # 只透传 api_* 配置项(常驻模型数、预加载列表、API默认的VAD与逐词时间戳等)与模型后端设置，
+                    # 桌面端的VAD、逐词时间戳等设置不影响API请求的默认行为
+                    api_config = {key: value for key, value in config.items()
+                                  if key.startswith(('api_', 'fake_')) or key in ('model_backend', 'cpu_threads')}
+                    api_config.update({
                         'model_path': config.get('model_path'),
                         'device': self.settings_interface.device_type.currentText().lower(),
                         'compute_type': self.settings_interface.compute_type.currentText()
-                    }
+                    })
                     self.api_server = APIServer(api_config)
                     self.api_thread = self.api_server.start_background(
                         host=config.get('api_host', '0.0.0.0'),
@@ -1096,12 +1489,19 @@ class MainWindow(FluentWindow):
     def disable_navigation(self):
         # 禁用导航栏
         print("禁用导航栏")
-        self.navigationInterface.setEnabled(False)
+        # 转写期间仍可在当前页面与性能统计页面之间切换
+        current = self.stackedWidget.currentWidget()
+        for interface in (self.whisper_interface, self.live_interface, self.multi_whisper_interface,
+                          self.settings_interface):
+            if interface is not current:
+                self.navigationInterface.widget(interface.objectName()).setEnabled(False)
     
     def enable_navigation(self):
         # 启用导航栏
         print("启用导航栏") 
-        self.navigationInterface.setEnabled(True)
+        for interface in (self.whisper_interface, self.live_interface, self.multi_whisper_interface,
+                          self.settings_interface):
+            self.navigationInterface.widget(interface.objectName()).setEnabled(True)
 
 if __name__ == '__main__':
     # 设置默认环境变量
@@ -1117,6 +1517,24 @@ if __name__ == '__main__':
             
             if "model_path" in config and os.path.exists(config["model_path"]):
                 os.environ["HF_HOME"] = config["model_path"]
+            
+            # 共享模型池的内存预算(MB, 0为不限制)与空闲释放时间(秒)
+            model_pool.configure(
+                memory_budget_mb=config.get("model_memory_budget_mb", 0),
+                idle_ttl=config.get("model_idle_ttl", 600)
+            )
+            
+            # 转写结果缓存目录与大小上限(MB, 0为关闭)
+            transcript_cache.configure(
+                cache_dir=config.get("transcript_cache_dir"),
+                max_mb=config.get("transcript_cache_mb", 512)
+            )
+            
+            # 解码后PCM缓存目录与大小上限(MB, 0为关闭)
+            audio_cache.configure(
+                cache_dir=config.get("audio_cache_dir"),
+                max_mb=config.get("audio_cache_mb", 4096)
+            )
     except Exception as e:
         print(f"读取配置文件失败: {str(e)}")
     
@@ -0,0 +1,4 @@
+import sys
+from services.cli import main
+
+sys.exit(main())
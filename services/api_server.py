@@ -1,20 +1,210 @@
 from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
-from faster_whisper import WhisperModel
-from opencc import OpenCC
 import json
+import math
 import os
+import queue
 import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from services.audio import audio_cache
+from services.cli import AUDIO_EXTENSIONS
+from services.decoding import skipped_duration, vad_parameters
+from services.engine import DecodeOptions, transcribe_segments
+from services.exporters import word_json
+from services.ingest import IngestSession, make_decoder
+from services.jobs import JobManager
+from services.live import LiveTranscriber, event_to_dict
+from services.metrics import Gauge, metrics, queue_wait_seconds
+from services.model_pool import model_pool
+from services.transcript_cache import transcript_cache
+from services.uploads import UploadRequest, extract_archive, take_upload, remove_upload
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after):
+        super().__init__('推理队列已满')
+        self.retry_after = retry_after
+
+class InferenceTask:
+    def __init__(self):
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+    
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+    
+    def timing(self):
+        started_at = self.started_at or time.monotonic()
+        finished_at = self.finished_at or time.monotonic()
+        return {
+            'queue_wait': round(started_at - self.submitted_at, 3),
+            'run_time': round(finished_at - started_at, 3) if self.started_at else 0.0
+        }
+
+class InferenceScheduler:
+    """固定推理槽位 + 有界等待队列，避免并发请求同时推理导致CPU超额占用"""
+    
+    def __init__(self, slots=0, queue_size=None, cpu_threads=0):
+        cores = os.cpu_count() or 1
+        self.slots = slots or max(1, cores // 4)
+        # 每个槽位分得的CPU线程数
+        self.cpu_threads = cpu_threads or max(1, cores // self.slots)
+        self.queue_size = self.slots * 4 if queue_size is None else queue_size
+        self.executor = ThreadPoolExecutor(max_workers=self.slots, thread_name_prefix='inference')
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.avg_run_time = 0.0
+    
+    def submit(self, fn, *args, **kwargs):
+        with self.lock:
+            if self.queued + self.running >= self.slots + self.queue_size:
+                raise QueueFullError(self._retry_after_locked())
+            self.queued += 1
+        task = InferenceTask()
+        try:
+            self.executor.submit(self._run, task, fn, args, kwargs)
+        except BaseException:
+            # 调度器已关闭(shutdown 后 executor 拒绝新任务)，撤销排队计数
+            with self.lock:
+                self.queued -= 1
+            raise
+        return task
+    
+    def stats(self):
+        with self.lock:
+            return {
+                'slots': self.slots,
+                'cpu_threads': self.cpu_threads,
+                'running': self.running,
+                'queued': self.queued,
+                'queue_size': self.queue_size
+            }
+    
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+    
+    def _run(self, task, fn, args, kwargs):
+        with self.lock:
+            self.queued -= 1
+            self.running += 1
+        task.started_at = time.monotonic()
+        queue_wait_seconds.observe(task.started_at - task.submitted_at)
+        try:
+            task.future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            task.future.set_exception(e)
+        finally:
+            task.finished_at = time.monotonic()
+            run_time = task.finished_at - task.started_at
+            with self.lock:
+                self.running -= 1
+                # 运行耗时的指数滑动平均，用于估算 Retry-After
+                self.avg_run_time = run_time if not self.avg_run_time else 0.8 * self.avg_run_time + 0.2 * run_time
+    
+    def _retry_after_locked(self):
+        waves = (self.queued + self.running) / self.slots
+        return max(1, int(math.ceil(waves * self.avg_run_time)))
+
+class BatchRun:
+    """把一批文件逐个提交给推理调度器，按完成顺序产出 (序号, 文件名, InferenceTask)
+
+    同时在途的任务数不超过 window，一批文件不会占满等待队列，其余请求仍可排队；
+    任务完成后立即补交下一个文件，推理槽位保持忙碌。fn(path, cancel) 负责删除 path。
+    """
+    
+    def __init__(self, scheduler, fn, entries, window):
+        self.scheduler = scheduler
+        self.fn = fn
+        self.pending = deque(enumerate(entries))
+        self.window = max(1, window)
+        self.done = queue.Queue()
+        self.in_flight = 0
+        self.cancel = threading.Event()
+    
+    def start(self):
+        """提交第一批文件，队列已满且一个都未能提交时抛出 QueueFullError"""
+        self._fill(wait=False)
+        return self
+    
+    def __iter__(self):
+        try:
+            while self.in_flight:
+                item = self.done.get()
+                self.in_flight -= 1
+                self._fill()
+                yield item
+        finally:
+            self.close()
+    
+    def close(self):
+        """停止未完成的文件并删除尚未提交的上传文件"""
+        self.cancel.set()
+        while self.pending:
+            _, (_, path) = self.pending.popleft()
+            remove_upload(path)
+    
+    def _fill(self, wait=True):
+        while self.pending and self.in_flight < self.window and not self.cancel.is_set():
+            index, (name, path) = self.pending[0]
+            try:
+                task = self.scheduler.submit(self.fn, path, self.cancel)
+            except QueueFullError as e:
+                if self.in_flight:
+                    # 其他请求占满了队列，等在途的文件完成后再补交
+                    return
+                if not wait:
+                    raise
+                self.cancel.wait(min(e.retry_after, 1))
+                continue
+            self.pending.popleft()
+            self.in_flight += 1
+            task.future.add_done_callback(lambda _, item=(index, name, task): self.done.put(item))
+
+_scheduler_slots = Gauge('whisper_api_inference_slots', 'API推理槽位数')
+_scheduler_running = Gauge('whisper_api_inference_running', '正在推理的API任务数')
+_scheduler_queued = Gauge('whisper_api_inference_queued', '排队等待推理的API任务数')
+_api_jobs = Gauge('whisper_api_jobs', '各状态的异步任务数', ['status'])
 
 class APIServer:
     def __init__(self, config):
         self.app = Flask(__name__)
         CORS(self.app)
         self.config = config
-        self.model = None
-        self.cc = OpenCC('t2s')
+        
+        # 上传文件直接写入独立临时目录，并限制上传大小
+        self.app.request_class = type('APIUploadRequest', (UploadRequest,), {
+            'upload_root': config.get('api_upload_dir')
+        })
+        max_upload_mb = config.get('api_max_upload_mb', 1024)
+        if max_upload_mb:
+            self.app.config['MAX_CONTENT_LENGTH'] = int(max_upload_mb * 1024 * 1024)
+        # 模型后端，"fake" 为不做推理的模拟模型，用于压测
+        self.backend = config.get('model_backend', 'whisper')
+        if self.backend == 'fake':
+            from services.fake_model import configure_fake_backend
+            configure_fake_backend(latency=config.get('fake_latency'), load_time=config.get('fake_load_time'),
+                                   fail_rate=config.get('fake_fail_rate'))
+        # 常驻模型: model_size -> 模型实例，按最近使用排序
+        self.models = OrderedDict()
+        self.max_models = max(int(config.get('api_max_models', 2)), 1)
+        self.models_lock = threading.Lock()
+        self.scheduler = InferenceScheduler(
+            slots=int(config.get('api_workers', 0)),
+            queue_size=config.get('api_queue_size'),
+            cpu_threads=int(config.get('cpu_threads', 0))
+        )
+        self.jobs = JobManager(ttl=config.get('api_job_ttl', 3600))
+        # 'wsgi' 为 werkzeug 多线程服务；'asgi' 使用 uvicorn 异步处理请求，需要安装 starlette、uvicorn、python-multipart 与 a2wsgi
+        self.mode = config.get('api_server_mode', 'wsgi')
         self.server = None
+        metrics.add_collector('api', self._collect_metrics)
         self.setup_routes()
+        self.setup_live_routes()
         
     def setup_routes(self):
         @self.app.route('/transcribe', methods=['POST'])
@@ -26,81 +216,557 @@ class APIServer:
             model_size = request.form.get('model_size', 'small')
             language = request.form.get('language', 'zh')
             stream = request.form.get('stream', 'false').lower() == 'true'
+            try:
+                vad = self._vad_options(request.form)
+            except ValueError as e:
+                return jsonify({'error': f"VAD参数错误: {str(e)}"}), 400
+            word_timestamps = self._word_timestamps(request.form)
             
-            # 保存临时文件
-            temp_path = f"temp_{file.filename}"
-            file.save(temp_path)
+            # 接管已写入临时目录的上传文件，由推理任务负责删除
+            temp_path = take_upload(request, file)
             
             try:
                 if stream:
                     return Response(
-                        self._transcribe_stream(temp_path, model_size, language),
+                        self._transcribe_stream(temp_path, model_size, language, vad, word_timestamps),
                         mimetype='text/event-stream'
                     )
-                else:
-                    result = self._transcribe_full(temp_path, model_size, language)
-                    return jsonify(result)
-            finally:
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
+                task = self.scheduler.submit(self._transcribe_full, temp_path, model_size, language, vad,
+                                             word_timestamps=word_timestamps)
+            except QueueFullError as e:
+                remove_upload(temp_path)
+                return self._queue_full_response(e)
+            
+            try:
+                result = task.result()
+            except Exception as e:
+                # 音频无法解码或推理失败时与流式、批量接口一样返回JSON错误
+                return jsonify({'error': str(e)}), 500
+            result['timing'] = task.timing()
+            return jsonify(result)
+        
+        @self.app.route('/transcribe/batch', methods=['POST'])
+        def transcribe_batch():
+            # 多个 files 字段或 zip 压缩包，每个文件独立转写，结果按完成顺序以 NDJSON 逐行返回
+            uploads = request.files.getlist('files') + request.files.getlist('file')
+            if not uploads:
+                return jsonify({'error': '未提供音频文件'}), 400
+            model_size = request.form.get('model_size', 'small')
+            language = request.form.get('language', 'zh')
+            stream = request.form.get('stream', 'true').lower() == 'true'
+            try:
+                vad = self._vad_options(request.form)
+            except ValueError as e:
+                return jsonify({'error': f"VAD参数错误: {str(e)}"}), 400
+            word_timestamps = self._word_timestamps(request.form)
+            try:
+                batch_size = max(int(request.form.get('batch_size', 0)), 0)
+            except ValueError:
+                return jsonify({'error': 'batch_size 必须为整数'}), 400
+            try:
+                entries = self._batch_entries(request, uploads)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            if not entries:
+                return jsonify({'error': '未找到可转写的音频文件'}), 400
+            
+            transcribe = lambda path, cancel: self._transcribe_full(path, model_size, language, vad,
+                                                                    batch_size=batch_size, cancel=cancel,
+                                                                    word_timestamps=word_timestamps)
+            run = BatchRun(self.scheduler, transcribe, entries, self.scheduler.slots)
+            try:
+                run.start()
+            except QueueFullError as e:
+                run.close()
+                return self._queue_full_response(e)
+            
+            if stream:
+                return Response(self._batch_events(run, len(entries)), mimetype='application/x-ndjson')
+            results = sorted((self._batch_result(*item) for item in run), key=lambda data: data['index'])
+            failed = sum(1 for data in results if data['status'] == 'failed')
+            return jsonify({'files': len(results), 'failed': failed, 'results': results})
+        
+        @self.app.route('/transcribe/chunked', methods=['POST'])
+        def transcribe_chunked():
+            # 请求体为持续上传的音频(可使用 Transfer-Encoding: chunked)，参数放在查询字符串中
+            try:
+                options = self._live_options(request.args)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            partial = request.args.get('partial', 'false').lower() == 'true'
+            return Response(self._chunked_events(request.stream, options, partial), mimetype='text/event-stream')
+        
+        @self.app.route('/jobs', methods=['POST'])
+        def create_job():
+            if 'file' not in request.files:
+                return jsonify({'error': '未提供音频文件'}), 400
+            
+            file = request.files['file']
+            model_size = request.form.get('model_size', 'small')
+            language = request.form.get('language', 'zh')
+            try:
+                vad = self._vad_options(request.form)
+            except ValueError as e:
+                return jsonify({'error': f"VAD参数错误: {str(e)}"}), 400
+            word_timestamps = self._word_timestamps(request.form)
+            
+            temp_path = take_upload(request, file)
+            
+            job = self.jobs.create({'filename': file.filename, 'model_size': model_size, 'language': language,
+                                    'vad': vad, 'word_timestamps': word_timestamps})
+            try:
+                job.task = self.scheduler.submit(self._run_job, job, temp_path, model_size, language, vad,
+                                                 word_timestamps)
+            except QueueFullError as e:
+                self.jobs.remove(job.id)
+                remove_upload(temp_path)
+                return self._queue_full_response(e)
+            
+            response = jsonify({'id': job.id, 'status': job.status})
+            response.status_code = 202
+            response.headers['Location'] = f"/jobs/{job.id}"
+            return response
+        
+        @self.app.route('/jobs/<job_id>', methods=['GET'])
+        def get_job(job_id):
+            job = self.jobs.get(job_id)
+            if job is None:
+                return jsonify({'error': '任务不存在'}), 404
+            return jsonify(job.to_dict())
+        
+        @self.app.route('/jobs/<job_id>/events', methods=['GET'])
+        def job_events(job_id):
+            job = self.jobs.get(job_id)
+            if job is None:
+                return jsonify({'error': '任务不存在'}), 404
+            return Response(self._job_events(job), mimetype='text/event-stream')
+        
+        @self.app.route('/jobs/<job_id>', methods=['DELETE'])
+        def cancel_job(job_id):
+            job = self.jobs.get(job_id)
+            if job is None:
+                return jsonify({'error': '任务不存在'}), 404
+            job.cancel()
+            return jsonify(job.to_dict(include_segments=False))
+        
+        @self.app.teardown_request
+        def cleanup_uploads(exc):
+            if isinstance(request, UploadRequest):
+                request.cleanup_uploads()
+        
+        @self.app.errorhandler(413)
+        def upload_too_large(e):
+            return jsonify({'error': '上传文件超过大小限制'}), 413
         
         @self.app.route('/health', methods=['GET'])
         def health():
-            return jsonify({'status': 'ok'})
+            return jsonify(self.health_status())
+        
+        @self.app.route('/metrics', methods=['GET'])
+        def metrics_endpoint():
+            return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
     
-    def _load_model(self, model_size):
-        if self.model is None:
-            model_path = self.config.get('model_path')
-            device = self.config.get('device', 'cpu')
-            compute_type = self.config.get('compute_type', 'int8')
-            
-            if model_path and os.path.exists(model_path):
-                hf_path = os.path.join(model_path, f"models--guillaumekln--faster-whisper-{model_size}")
-                if os.path.isdir(hf_path):
-                    os.environ["HF_HOME"] = model_path
-                    self.model = WhisperModel(model_size, device=device, compute_type=compute_type)
-                else:
-                    direct_path = os.path.join(model_path, model_size)
-                    if os.path.isdir(direct_path):
-                        self.model = WhisperModel(direct_path, device=device, compute_type=compute_type)
+    def setup_live_routes(self):
+        # WebSocket 依赖可选的 flask-sock，未安装时其余接口不受影响
+        try:
+            from flask_sock import Sock
+        except ImportError:
+            print("未安装 flask-sock，实时转写接口 /live 不可用")
+            return
+        sock = Sock(self.app)
+        
+        @sock.route('/live')
+        def live(ws):
+            self._live_session(ws, request.args)
+    
+    def _live_options(self, args):
+        """读取实时与分块接入的公共参数，参数非法时抛出 ValueError"""
+        try:
+            vad = self._vad_options(args)
+        except ValueError as e:
+            raise ValueError(f"VAD参数错误: {str(e)}")
+        return {
+            'model_size': args.get('model_size', 'small'),
+            'language': args.get('language', 'zh'),
+            'vad': vad,
+            'decoder': make_decoder(args.get('format', 'pcm'), args.get('sample_rate')),
+        }
+    
+    def _live_transcriber(self, model, options, partial):
+        # 每次解码都经过推理调度器，实时会话与普通请求共享推理槽位
+        run_inference = lambda fn: self.scheduler.submit(fn).result()
+        return LiveTranscriber(model, options['language'], vad=options['vad'],
+                               partial_interval=1.0 if partial else 0, run_inference=run_inference)
+    
+    def _ingest_session(self, model, options, partial, on_event):
+        transcriber = self._live_transcriber(model, options, partial)
+        return IngestSession(options['decoder'], transcriber, on_event,
+                             max_backlog=self.config.get('api_ingest_backlog_seconds', 10)).start()
+    
+    def _live_session(self, ws, args):
+        """客户端持续发送音频二进制帧，发送文本消息 end 结束；
+        服务端以 JSON 文本帧推送 partial(临时结果) 与 final(最终分段)，结束时发送 end"""
+        from simple_websocket import ConnectionClosed
+        send = lambda data: ws.send(json.dumps(data, ensure_ascii=False))
+        try:
+            options = self._live_options(args)
+        except ValueError as e:
+            send({'type': 'error', 'error': str(e)})
+            return
+        partial = args.get('partial', 'true').lower() == 'true'
+        
+        session = None
+        try:
+            with self._use_model(options['model_size']) as model:
+                session = self._ingest_session(model, options, partial, lambda event: send(event_to_dict(event)))
+                while True:
+                    data = ws.receive()
+                    if isinstance(data, str):
+                        if data.strip().lower() == 'end':
+                            break
+                        continue
+                    # 推理落后太多时在此阻塞，不再读取新的数据帧
+                    session.put(data)
+                session.finish()
+                session.join()
+                send({'type': 'end', 'duration': round(session.transcriber.position, 3),
+                      'peak_backlog': session.peak_backlog_seconds})
+        except ConnectionClosed:
+            pass
+        except QueueFullError as e:
+            send({'type': 'error', 'error': str(e), 'retry_after': e.retry_after})
+        except Exception as e:
+            send({'type': 'error', 'error': str(e)})
+        finally:
+            if session is not None:
+                session.close()
+            else:
+                # 模型加载失败等情况下会话未创建，解码器的后台线程同样需要结束
+                options['decoder'].abort()
+    
+    def _chunked_events(self, stream, options, partial):
+        """边读取请求体边转写，以 SSE 推送最终分段"""
+        events = queue.Queue()
+        
+        def read_body(session):
+            try:
+                while True:
+                    data = stream.read(16384)
+                    if not data:
+                        break
+                    session.put(data)
+                session.finish()
+                session.join()
+                events.put(('end', {'duration': round(session.transcriber.position, 3),
+                                    'peak_backlog': session.peak_backlog_seconds}))
+            except QueueFullError as e:
+                events.put(('error', {'error': str(e), 'retry_after': e.retry_after}))
+            except Exception as e:
+                events.put(('error', {'error': str(e)}))
+        
+        session = None
+        try:
+            with self._use_model(options['model_size']) as model:
+                on_event = lambda event: events.put((event.kind, event_to_dict(event)))
+                session = self._ingest_session(model, options, partial, on_event)
+                threading.Thread(target=read_body, args=(session,), daemon=True).start()
+                while True:
+                    kind, data = events.get()
+                    if kind == 'final':
+                        yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
                     else:
-                        self.model = WhisperModel(model_size, device=device, compute_type=compute_type)
+                        yield f"event: {kind}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                    if kind in ('end', 'error'):
+                        break
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)}, ensure_ascii=False)}\n\n"
+        finally:
+            # 客户端断开时丢弃尚未转写的音频，读取线程随之结束
+            if session is not None:
+                session.close()
             else:
-                self.model = WhisperModel(model_size, device=device, compute_type=compute_type)
+                # 模型加载失败等情况下会话未创建，解码器的后台线程同样需要结束
+                options['decoder'].abort()
     
-    def _transcribe_stream(self, audio_path, model_size, language='zh'):
-        self._load_model(model_size)
-        segments, info = self.model.transcribe(audio_path, beam_size=5, language=language)
-        
-        for segment in segments:
-            text = self.cc.convert(segment.text) if language == 'zh' and self.cc else segment.text
-            data = {
-                'start': segment.start,
-                'end': segment.end,
-                'text': text
-            }
-            yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    def _collect_metrics(self):
+        stats = self.scheduler.stats()
+        samples = [
+            (_scheduler_slots, {}, stats['slots']),
+            (_scheduler_running, {}, stats['running']),
+            (_scheduler_queued, {}, stats['queued'])
+        ]
+        samples.extend((_api_jobs, {'status': status}, count) for status, count in self.jobs.stats().items())
+        return samples
     
-    def _transcribe_full(self, audio_path, model_size, language='zh'):
-        self._load_model(model_size)
-        segments, info = self.model.transcribe(audio_path, beam_size=5, language=language)
+    def health_status(self):
+        with self.models_lock:
+            models = list(self.models)
+        return {
+            'status': 'ok',
+            'backend': self.backend,
+            'mode': self.mode,
+            'models': models,
+            'scheduler': self.scheduler.stats(),
+            'jobs': self.jobs.stats(),
+            'transcript_cache': transcript_cache.stats(),
+            'audio_cache': audio_cache.stats()
+        }
+    
+    def _batch_entries(self, request, uploads):
+        """接管批量请求的上传文件并解压其中的 zip，返回 [(文件名, 磁盘路径)]；出错时删除已接管的文件"""
+        max_files = self.config.get('api_batch_max_files', 1000)
+        max_upload_mb = self.config.get('api_max_upload_mb', 1024)
+        entries = []
+        try:
+            for file in uploads:
+                path = take_upload(request, file)
+                if not (file.filename or '').lower().endswith('.zip'):
+                    entries.append((file.filename, path))
+                    continue
+                try:
+                    entries.extend(extract_archive(path, self.config.get('api_upload_dir'), AUDIO_EXTENSIONS,
+                                                   max_files=max_files - len(entries) if max_files else None,
+                                                   max_bytes=max_upload_mb * 1024 * 1024 if max_upload_mb else None))
+                finally:
+                    remove_upload(path)
+            if max_files and len(entries) > max_files:
+                raise ValueError(f"文件数超过上限 {max_files}")
+        except ValueError:
+            for _, path in entries:
+                remove_upload(path)
+            raise
+        return entries
+    
+    def _batch_result(self, index, filename, task):
+        data = {'type': 'result', 'index': index, 'filename': filename}
+        try:
+            data.update(task.result())
+            data['status'] = 'completed'
+        except Exception as e:
+            data.update({'status': 'failed', 'error': str(e)})
+        data['timing'] = task.timing()
+        return data
+    
+    def _batch_events(self, run, total):
+        started = time.monotonic()
+        failed = 0
+        try:
+            for item in run:
+                data = self._batch_result(*item)
+                failed += data['status'] == 'failed'
+                yield json.dumps(data, ensure_ascii=False) + "\n"
+            summary = {'type': 'end', 'files': total, 'failed': failed,
+                       'elapsed': round(time.monotonic() - started, 3)}
+            yield json.dumps(summary) + "\n"
+        finally:
+            # 客户端断开时停止剩余文件
+            run.close()
+    
+    def _queue_full_response(self, error):
+        response = jsonify({'error': str(error), 'retry_after': error.retry_after})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(error.retry_after)
+        return response
+    
+    def _acquire_model(self, model_size):
+        # 与GUI共用进程级模型池，避免同一模型在内存中保留两份
+        return model_pool.acquire(
+            model_size,
+            self.config.get('device', 'cpu'),
+            self.config.get('compute_type', 'int8'),
+            model_path=self.config.get('model_path'),
+            # 线程数与并发数只在模型加载时生效，不影响与GUI共用同一实例
+            cpu_threads=self.scheduler.cpu_threads,
+            num_workers=self.scheduler.slots,
+            backend=self.backend
+        )
+    
+    def _load_model(self, model_size):
+        """确保指定大小的模型常驻，超出常驻数量时按LRU释放最久未使用的模型"""
+        with self.models_lock:
+            if model_size in self.models:
+                self.models.move_to_end(model_size)
+                return self.models[model_size]
+        
+        model = self._acquire_model(model_size)
         
-        results = []
-        for segment in segments:
-            text = self.cc.convert(segment.text) if language == 'zh' and self.cc else segment.text
-            results.append({
-                'start': segment.start,
-                'end': segment.end,
-                'text': text
-            })
+        evicted = []
+        with self.models_lock:
+            if model_size in self.models:
+                # 其他请求已并发加载完成，归还多余的引用
+                evicted.append(model)
+            else:
+                self.models[model_size] = model
+            self.models.move_to_end(model_size)
+            while len(self.models) > self.max_models:
+                _, old_model = self.models.popitem(last=False)
+                evicted.append(old_model)
+            model = self.models[model_size]
+        
+        for old_model in evicted:
+            model_pool.release(old_model, evict=old_model is not model)
+        return model
+    
+    @contextmanager
+    def _use_model(self, model_size):
+        # 请求期间额外持有模型引用，避免正在使用的模型被释放
+        self._load_model(model_size)
+        model = self._acquire_model(model_size)
+        try:
+            yield model
+        finally:
+            model_pool.release(model)
+    
+    def preload_models(self, model_sizes):
+        for model_size in model_sizes:
+            try:
+                self._load_model(model_size)
+                print(f"API模型已预加载: {model_size}")
+            except Exception as e:
+                print(f"API模型预加载失败 {model_size}: {str(e)}")
+    
+    def _vad_options(self, form):
+        """从表单读取VAD参数，未提供时使用 api_vad_* 配置(与桌面端的VAD设置无关)；不启用VAD时返回 None"""
+        enabled = form.get('vad_filter')
+        if enabled is None:
+            enabled = self.config.get('api_vad_filter', False)
+        else:
+            enabled = enabled.lower() == 'true'
+        if not enabled:
+            return None
+        return vad_parameters(
+            form.get('vad_threshold', self.config.get('api_vad_threshold')),
+            form.get('vad_min_silence_ms', self.config.get('api_vad_min_silence_ms')),
+            form.get('vad_speech_pad_ms', self.config.get('api_vad_speech_pad_ms'))
+        )
+    
+    def _word_timestamps(self, form):
+        """是否输出逐词时间戳，未提供时使用 api_word_timestamps 配置"""
+        enabled = form.get('word_timestamps')
+        if enabled is None:
+            return bool(self.config.get('api_word_timestamps', False))
+        return enabled.lower() == 'true'
+    
+    def _iter_segments(self, audio_path, model_size, language='zh', cancel=None, on_info=None, vad=None,
+                       batch_size=0, word_timestamps=False):
+        """逐段产出转写结果，cancel 被设置后停止解码"""
+        if cancel is not None and cancel.is_set():
+            return
+        with self._use_model(model_size) as model:
+            options = DecodeOptions(language, batch_size, vad, word_timestamps=word_timestamps)
+            for segment in transcribe_segments(model, audio_path, options, cancel=cancel, on_info=on_info):
+                data = {
+                    'start': segment.start,
+                    'end': segment.end,
+                    'text': segment.text,
+                    'avg_logprob': round(segment.avg_logprob, 4),
+                    'no_speech_prob': round(segment.no_speech_prob, 4)
+                }
+                if segment.words:
+                    data['words'] = [word_json(*word) for word in segment.words]
+                yield data
+    
+    def _transcribe_stream(self, audio_path, model_size, language='zh', vad=None, word_timestamps=False):
+        # 在推理槽位中生产分段，当前生成器只负责把结果推送给客户端
+        events = queue.Queue()
+        cancel = threading.Event()
+        task = self.scheduler.submit(self._produce_stream, events, cancel, audio_path, model_size, language, vad,
+                                     word_timestamps)
+        return self._stream_events(task, events, cancel)
+    
+    def _produce_stream(self, events, cancel, audio_path, model_size, language, vad=None, word_timestamps=False):
+        try:
+            for data in self._iter_segments(audio_path, model_size, language, cancel=cancel, vad=vad,
+                                            word_timestamps=word_timestamps):
+                events.put(data)
+        except Exception as e:
+            events.put({'error': str(e)})
+        finally:
+            remove_upload(audio_path)
+            events.put(None)
+    
+    def _stream_events(self, task, events, cancel):
+        try:
+            while True:
+                data = events.get()
+                if data is None:
+                    break
+                yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+            task.result()
+            yield f"event: timing\ndata: {json.dumps(task.timing())}\n\n"
+        finally:
+            # 客户端断开时通知推理槽位尽快停止
+            cancel.set()
+    
+    def _transcribe_full(self, audio_path, model_size, language='zh', vad=None, batch_size=0, cancel=None,
+                         word_timestamps=False):
+        infos = []
+        try:
+            results = list(self._iter_segments(audio_path, model_size, language, cancel=cancel,
+                                               on_info=infos.append, vad=vad, batch_size=batch_size,
+                                               word_timestamps=word_timestamps))
+        finally:
+            remove_upload(audio_path)
+        if not infos:
+            raise RuntimeError('转写已取消')
+        info = infos[0]
         
         return {
             'duration': info.duration,
             'language': info.language,
+            # VAD 丢弃的非语音时长，未启用VAD时为0
+            'skipped_duration': round(skipped_duration(info), 3),
             'segments': results
         }
     
+    def _run_job(self, job, audio_path, model_size, language='zh', vad=None, word_timestamps=False):
+        try:
+            if job.cancel_event.is_set():
+                return
+            job.start()
+            on_info = lambda info: job.set_info(info.duration, info.language, skipped_duration(info))
+            for data in self._iter_segments(audio_path, model_size, language,
+                                            cancel=job.cancel_event, on_info=on_info, vad=vad,
+                                            word_timestamps=word_timestamps):
+                job.add_segment(data)
+            
+            if job.cancel_event.is_set():
+                job.finish(job.CANCELLED)
+            else:
+                job.finish(job.COMPLETED)
+        except Exception as e:
+            job.finish(job.FAILED, str(e))
+        finally:
+            remove_upload(audio_path)
+    
+    def _job_events(self, job):
+        sent = 0
+        while True:
+            job.wait_for_update(sent, timeout=15)
+            segments = job.segments[sent:]
+            for data in segments:
+                yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+            sent += len(segments)
+            if segments:
+                yield f"event: progress\ndata: {json.dumps({'progress': job.progress})}\n\n"
+            elif not job.finished:
+                # 心跳，防止代理因空闲超时断开连接
+                yield ": keep-alive\n\n"
+            if job.finished and sent >= len(job.segments):
+                status = job.to_dict(include_segments=False)
+                yield f"event: end\ndata: {json.dumps(status, ensure_ascii=False)}\n\n"
+                break
+    
     def run(self, host='0.0.0.0', port=5000):
+        if self.mode == 'asgi':
+            try:
+                from services.asgi_app import UvicornServer
+            except ImportError as e:
+                print(f"ASGI 模式需要安装 starlette、uvicorn、python-multipart 与 a2wsgi({str(e)})，改用 WSGI 模式")
+            else:
+                self.server = UvicornServer(self, host, port)
+                self.server.serve_forever()
+                return
         from werkzeug.serving import make_server
         self.server = make_server(host, port, self.app, threaded=True)
         self.server.serve_forever()
@@ -108,9 +774,22 @@ class APIServer:
     def start_background(self, host='0.0.0.0', port=5000):
         thread = threading.Thread(target=self.run, args=(host, port), daemon=True)
         thread.start()
+        
+        # 后台预加载配置的模型，避免首个请求承担冷启动耗时
+        preload = self.config.get('api_preload_models') or []
+        if preload:
+            threading.Thread(target=self.preload_models, args=(preload,), daemon=True).start()
         return thread
     
     def stop(self):
         if self.server:
             self.server.shutdown()
-            self.server = None
\ No newline at end of file
+            self.server = None
+        metrics.remove_collector('api')
+        self.jobs.cancel_all()
+        self.scheduler.shutdown()
+        with self.models_lock:
+            models = list(self.models.values())
+            self.models.clear()
+        for model in models:
+            model_pool.release(model)
\ No newline at end of file
@@ -0,0 +1,343 @@
+"""APIServer 的 ASGI 服务方式(需要安装 starlette、uvicorn、python-multipart 与 a2wsgi)
+
+/health、/metrics、/transcribe(含 stream=true) 与 /live 由事件循环异步处理，推理仍在
+APIServer 的推理调度器线程中执行；空闲的流式连接不占用线程，可同时保持大量 SSE 与 WebSocket 连接。
+其余接口(/jobs、/transcribe/batch、/transcribe/chunked)经 a2wsgi 转交原有的 Flask 应用，在线程池中处理；
+a2wsgi 边接收边把请求体交给 Flask，分块接入仍可边上传边转写，上传文件仍直接写入磁盘。
+
+在 config.json 中设置 "api_server_mode": "asgi" 后由 APIServer.run 自动使用；
+也可单独运行: uvicorn services.asgi_app:create_app --factory --port 5000
+"""
+import asyncio
+import json
+import threading
+from a2wsgi import WSGIMiddleware
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Mount, Route, WebSocketRoute
+from services.api_server import QueueFullError
+from services.live import event_to_dict
+from services.metrics import metrics
+from services.uploads import new_upload_path, remove_upload
+
+class _LoopQueue:
+    """推理线程调用 put()，事件循环中 await get()"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+
+    def put(self, item):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+
+    async def get(self):
+        return await self.queue.get()
+
+def _queue_full_response(error):
+    return JSONResponse({'error': str(error), 'retry_after': error.retry_after}, status_code=429,
+                        headers={'Retry-After': str(error.retry_after)})
+
+class _UploadTooLarge(Exception):
+    pass
+
+class _MultipartUpload:
+    """边接收边解析 multipart 请求体
+
+    普通字段保存在 fields 中；名为 file_field 的第一个文件直接写入独立的临时目录，不经过内存或二次复制，
+    其余文件部分被忽略。累计接收超过 max_bytes 时抛出 _UploadTooLarge，格式错误时抛出 ValueError。
+    """
+
+    MAX_FIELD_BYTES = 64 * 1024
+
+    def __init__(self, content_type, upload_root=None, max_bytes=0, file_field='file'):
+        _, params = parse_options_header(content_type)
+        if b'boundary' not in params:
+            raise ValueError('请求需为 multipart/form-data')
+        self.upload_root = upload_root
+        self.max_bytes = max_bytes
+        self.file_field = file_field
+        self.received = 0
+        self.fields = {}
+        self.path = None
+        self.filename = None
+        self._file = None
+        self._data = None
+        self._header_field = b''
+        self._header_value = b''
+        self._headers = {}
+        self.parser = MultipartParser(params[b'boundary'], {
+            'on_part_begin': self._part_begin,
+            'on_part_data': self._part_data,
+            'on_part_end': self._part_end,
+            'on_header_field': self._on_header_field,
+            'on_header_value': self._on_header_value,
+            'on_header_end': self._header_end,
+            'on_headers_finished': self._headers_finished,
+        })
+
+    def write(self, chunk):
+        self.received += len(chunk)
+        if self.max_bytes and self.received > self.max_bytes:
+            raise _UploadTooLarge()
+        self.parser.write(chunk)
+
+    def finish(self):
+        self.parser.finalize()
+
+    def discard(self):
+        """解析失败或超出限制时关闭并删除已写入的文件"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        remove_upload(self.path)
+        self.path = None
+
+    def _part_begin(self):
+        self._headers = {}
+        self._name = None
+        self._data = None
+
+    def _on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b''
+
+    def _headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b'content-disposition'))
+        if b'name' not in options:
+            raise ValueError('multipart 字段缺少 name')
+        self._name = options[b'name'].decode('utf-8', 'replace')
+        if b'filename' not in options:
+            self._data = bytearray()
+        elif self._name == self.file_field and self.path is None:
+            self.filename = options[b'filename'].decode('utf-8', 'replace')
+            self.path = new_upload_path(self.filename, self.upload_root)
+            self._file = open(self.path, 'wb')
+
+    def _part_data(self, data, start, end):
+        if self._file is not None:
+            self._file.write(data[start:end])
+        elif self._data is not None:
+            if len(self._data) + end - start > self.MAX_FIELD_BYTES:
+                raise ValueError(f"字段 {self._name} 过长")
+            self._data.extend(data[start:end])
+
+    def _part_end(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        elif self._data is not None:
+            self.fields[self._name] = self._data.decode('utf-8', 'replace')
+            self._data = None
+
+async def _receive_upload(request, upload_root, max_bytes):
+    """接收 multipart 上传，按实际读取的字节数检查大小上限(分块传输的请求没有 Content-Length)"""
+    upload = _MultipartUpload(request.headers.get('content-type', ''), upload_root, max_bytes)
+    try:
+        async for chunk in request.stream():
+            # 写文件在线程池中进行，不阻塞事件循环
+            await run_in_threadpool(upload.write, chunk)
+        upload.finish()
+    except BaseException:
+        upload.discard()
+        raise
+    return upload
+
+def _terminated_input(app):
+    """标记请求体由服务器负责结束
+
+    a2wsgi 的 wsgi.input 在 ASGI 请求体结束时返回 EOF，与 werkzeug 开发服务器处理分块请求时相同；
+    不设置该标记时 werkzeug 对没有 Content-Length 的请求体(如 /transcribe/chunked)返回空流。
+    """
+    def wrapped(environ, start_response):
+        environ['wsgi.input_terminated'] = True
+        return app(environ, start_response)
+    return wrapped
+
+def create_asgi_app(server):
+    """为 APIServer 创建 Starlette 应用，与 Flask 应用共用模型、推理调度器与任务管理"""
+    max_upload_mb = server.config.get('api_max_upload_mb', 1024)
+    max_upload_bytes = max_upload_mb * 1024 * 1024 if max_upload_mb else 0
+    upload_root = server.config.get('api_upload_dir')
+
+    async def health(request):
+        return JSONResponse(await run_in_threadpool(server.health_status))
+
+    async def metrics_endpoint(request):
+        return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
+
+    async def transcribe(request):
+        try:
+            content_length = int(request.headers.get('content-length') or 0)
+        except ValueError:
+            return JSONResponse({'error': '请求格式错误: Content-Length 无效'}, status_code=400)
+        if max_upload_bytes and content_length > max_upload_bytes:
+            return JSONResponse({'error': '上传文件超过大小限制'}, status_code=413)
+        # 与 Flask 接口一致，上传文件边接收边写入独立临时目录，之后由推理任务负责删除
+        try:
+            upload = await _receive_upload(request, upload_root, max_upload_bytes)
+        except _UploadTooLarge:
+            return JSONResponse({'error': '上传文件超过大小限制'}, status_code=413)
+        except ValueError as e:
+            return JSONResponse({'error': f"请求格式错误: {str(e)}"}, status_code=400)
+        form = upload.fields
+        temp_path = upload.path
+        if temp_path is None:
+            return JSONResponse({'error': '未提供音频文件'}, status_code=400)
+        model_size = form.get('model_size', 'small')
+        language = form.get('language', 'zh')
+        stream = form.get('stream', 'false').lower() == 'true'
+        try:
+            vad = server._vad_options(form)
+        except ValueError as e:
+            remove_upload(temp_path)
+            return JSONResponse({'error': f"VAD参数错误: {str(e)}"}, status_code=400)
+        word_timestamps = server._word_timestamps(form)
+
+        try:
+            if stream:
+                events = _LoopQueue(asyncio.get_running_loop())
+                cancel = threading.Event()
+                task = server.scheduler.submit(server._produce_stream, events, cancel, temp_path, model_size,
+                                               language, vad, word_timestamps)
+                return StreamingResponse(_stream_events(task, events, cancel), media_type='text/event-stream')
+            task = server.scheduler.submit(server._transcribe_full, temp_path, model_size, language, vad,
+                                           word_timestamps=word_timestamps)
+        except QueueFullError as e:
+            remove_upload(temp_path)
+            return _queue_full_response(e)
+
+        try:
+            result = await asyncio.wrap_future(task.future)
+        except Exception as e:
+            return JSONResponse({'error': str(e)}, status_code=500)
+        result['timing'] = task.timing()
+        return JSONResponse(result)
+
+    async def _stream_events(task, events, cancel):
+        try:
+            while True:
+                data = await events.get()
+                if data is None:
+                    break
+                yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+            await asyncio.wrap_future(task.future)
+            yield f"event: timing\ndata: {json.dumps(task.timing())}\n\n"
+        finally:
+            # 客户端断开时通知推理槽位尽快停止
+            cancel.set()
+
+    async def live(websocket):
+        await websocket.accept()
+        args = websocket.query_params
+        outgoing = _LoopQueue(asyncio.get_running_loop())
+
+        async def send_events():
+            while True:
+                data = await outgoing.get()
+                if data is None:
+                    return
+                await websocket.send_text(json.dumps(data, ensure_ascii=False))
+
+        try:
+            options = server._live_options(args)
+        except ValueError as e:
+            await websocket.send_text(json.dumps({'type': 'error', 'error': str(e)}, ensure_ascii=False))
+            await websocket.close()
+            return
+        partial = args.get('partial', 'true').lower() == 'true'
+
+        sender = asyncio.create_task(send_events())
+        model_context = server._use_model(options['model_size'])
+        model = session = None
+        disconnected = False
+        try:
+            # 模型加载可能耗时较长，在线程池中进入上下文，避免阻塞事件循环
+            model = await run_in_threadpool(model_context.__enter__)
+            session = server._ingest_session(model, options, partial,
+                                             lambda event: outgoing.put(event_to_dict(event)))
+            while True:
+                message = await websocket.receive()
+                if message['type'] == 'websocket.disconnect':
+                    disconnected = True
+                    break
+                if message.get('bytes') is not None:
+                    # 推理落后太多时在线程中阻塞，期间不再读取新的数据帧
+                    await run_in_threadpool(session.put, message['bytes'])
+                elif (message.get('text') or '').strip().lower() == 'end':
+                    break
+            if not disconnected:
+                await run_in_threadpool(session.finish)
+                await run_in_threadpool(session.join)
+                outgoing.put({'type': 'end', 'duration': round(session.transcriber.position, 3),
+                              'peak_backlog': session.peak_backlog_seconds})
+        except QueueFullError as e:
+            outgoing.put({'type': 'error', 'error': str(e), 'retry_after': e.retry_after})
+        except Exception as e:
+            outgoing.put({'type': 'error', 'error': str(e)})
+        finally:
+            if session is not None:
+                session.close()
+            else:
+                options['decoder'].abort()
+            outgoing.put(None)
+            try:
+                await sender
+            except Exception:
+                disconnected = True
+            if model is not None:
+                await run_in_threadpool(model_context.__exit__, None, None, None)
+            if not disconnected:
+                await websocket.close()
+
+    routes = [
+        Route('/health', health, methods=['GET']),
+        Route('/metrics', metrics_endpoint, methods=['GET']),
+        Route('/transcribe', transcribe, methods=['POST']),
+        WebSocketRoute('/live', live),
+        # 其余接口沿用 Flask 实现
+        Mount('/', app=WSGIMiddleware(_terminated_input(server.app))),
+    ]
+    return Starlette(routes=routes, middleware=[Middleware(CORSMiddleware, allow_origins=['*'],
+                                                          allow_methods=['*'], allow_headers=['*'])])
+
+class UvicornServer:
+    """与 werkzeug 服务相同的 serve_forever / shutdown 接口，便于 APIServer 在后台线程中启停
+
+    uvicorn 只在主线程中安装信号处理函数，在后台线程中运行时由 shutdown() 结束服务。
+    """
+
+    def __init__(self, server, host, port):
+        import uvicorn
+        config = uvicorn.Config(create_asgi_app(server), host=host, port=port, log_level='warning',
+                                lifespan='off')
+        self.server = uvicorn.Server(config)
+
+    def serve_forever(self):
+        self.server.run()
+
+    def shutdown(self):
+        self.server.should_exit = True
+
+def create_app(config_path='config.json'):
+    """供 uvicorn --factory 使用：读取配置文件创建 APIServer 并返回其 ASGI 应用"""
+    import os
+    from services.api_server import APIServer
+    config = {}
+    if os.path.exists(config_path):
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    server = APIServer(config)
+    preload = config.get('api_preload_models') or []
+    if preload:
+        threading.Thread(target=server.preload_models, args=(preload,), daemon=True).start()
+    return create_asgi_app(server)
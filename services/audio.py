@@ -0,0 +1,162 @@
+import os
+import struct
+import threading
+import numpy as np
+from services.manifest import cached_file_digest
+from services.metrics import audio_decode_seconds
+
+SAMPLING_RATE = 16000
+# .npy 头部预留的固定长度，解码完成后再写入实际的采样数
+NPY_HEADER_SIZE = 128
+
+def _npy_header(length):
+    header = repr({'descr': '<f4', 'fortran_order': False, 'shape': (length,)})
+    header = header.ljust(NPY_HEADER_SIZE - 10 - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1')
+
+def decode_to_npy(audio_path, npy_path, sampling_rate=SAMPLING_RATE):
+    """以流式方式把音频解码为单声道 float32 并写入 .npy 文件，内存占用与音频时长无关"""
+    import av
+    length = 0
+    resampler = av.audio.resampler.AudioResampler(format='s16', layout='mono', rate=sampling_rate)
+    with open(npy_path, 'wb') as out, av.open(audio_path, metadata_errors='ignore') as container:
+        out.write(b'\0' * NPY_HEADER_SIZE)
+
+        def write(frames):
+            nonlocal length
+            for frame in frames:
+                samples = frame.to_ndarray().reshape(-1).astype(np.float32) / 32768.0
+                out.write(samples.astype('<f4').tobytes())
+                length += len(samples)
+
+        try:
+            for frame in container.decode(audio=0):
+                write(resampler.resample(frame))
+        except av.error.InvalidDataError:
+            pass  # 与 faster_whisper 一致，忽略文件末尾的损坏数据
+        write(resampler.resample(None))
+
+        out.seek(0)
+        out.write(_npy_header(length))
+    return length
+
+class AudioCache:
+    """解码后的 16kHz 单声道 PCM 缓存
+
+    每个文件按内容哈希解码一次并保存为 .npy，之后以内存映射方式读取；
+    同一文件换模型、换语言或重试时不再重复解码，长音频也只按需读入内存。
+    总大小超出上限时按最久未使用的顺序删除。
+    """
+
+    def __init__(self, cache_dir='./cache/audio', max_mb=4096):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = None  # 缓存目录总大小，None 表示尚未统计
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def configure(self, cache_dir=None, max_mb=None):
+        with self.lock:
+            if cache_dir:
+                self.cache_dir = cache_dir
+            if max_mb is not None:
+                self.max_bytes = int(max_mb * 1024 * 1024)
+            self._total_bytes = None
+
+    def _path(self, digest):
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.npy")
+
+    def load(self, audio_path):
+        """返回只读内存映射的 float32 数组，未缓存时先解码"""
+        path = self._path(cached_file_digest(audio_path))
+        try:
+            audio = np.load(path, mmap_mode='r')
+            os.utime(path)  # 更新最近使用时间
+            with self.lock:
+                self.hits += 1
+            return audio
+        except (OSError, ValueError):
+            pass
+
+        with self.lock:
+            self.misses += 1
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 并发解码同一文件时各自写入临时文件，最后原子替换
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with audio_decode_seconds.time():
+                decode_to_npy(audio_path, temp_path)
+            size = os.path.getsize(temp_path)
+            # 其他线程可能已写入同一文件，只累计大小的差值
+            replaced = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        with self.lock:
+            if self._total_bytes is not None:
+                self._total_bytes += size - replaced
+        self._evict(keep=path)
+        return np.load(path, mmap_mode='r')
+
+    def _scan(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.npy'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self, keep=None):
+        with self.lock:
+            # 未超出上限时不扫描缓存目录
+            if self._total_bytes is not None and self._total_bytes <= self.max_bytes:
+                return
+            entries = self._scan()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    # Windows 下仍被映射的文件无法删除，留待下次清理
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            self._total_bytes = total
+
+    def stats(self):
+        with self.lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._scan())
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'size_mb': round(self._total_bytes / (1024 * 1024), 1),
+                'max_mb': round(self.max_bytes / (1024 * 1024), 1)
+            }
+
+def load_audio(audio_path):
+    """读取 16kHz 单声道音频：启用缓存时返回内存映射数组，否则直接解码到内存"""
+    if audio_cache.enabled:
+        return audio_cache.load(audio_path)
+    from faster_whisper import decode_audio
+    with audio_decode_seconds.time():
+        return decode_audio(audio_path, sampling_rate=SAMPLING_RATE)
+
+# 进程级共享音频缓存
+audio_cache = AudioCache()
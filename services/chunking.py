@@ -0,0 +1,105 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from services.audio import SAMPLING_RATE, load_audio
+from services.segments import TranscriptInfo, segment_from_whisper, shift_segment
+
+# 分块的最短时长(秒)，过短的块会丢失上下文并增加接缝数量
+MIN_CHUNK_SECONDS = 120
+# 用于寻找切分点的静音时长，比解码用的VAD参数更短以便找到足够多的候选位置
+SPLIT_SILENCE_MS = 500
+# 接缝处判定为重复分段的时间容差(秒)
+SEAM_TOLERANCE = 0.2
+
+def plan_chunks(audio, workers, speech=None):
+    """在语音段之间的静音处切分，返回 [(起始采样, 结束采样)]
+
+    目标块数为并行数的4倍，使各线程负载更均衡；切分点取静音区间的中点。
+    """
+    total = len(audio)
+    target = max(MIN_CHUNK_SECONDS * SAMPLING_RATE, total // max(workers * 4, 1))
+    if total <= target * 1.5:
+        return [(0, total)]
+    if speech is None:
+        speech = speech_timestamps(audio)
+
+    chunks = []
+    chunk_start = 0
+    for previous, current in zip(speech, speech[1:]):
+        cut = (previous['end'] + current['start']) // 2
+        if cut - chunk_start >= target:
+            chunks.append((chunk_start, cut))
+            chunk_start = cut
+    # 末尾过短的块并入上一块
+    if chunks and total - chunk_start < target // 2:
+        chunk_start = chunks.pop()[0]
+    chunks.append((chunk_start, total))
+    return chunks
+
+def speech_timestamps(audio, vad=None):
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+    options = dict(vad or {})
+    options.setdefault('min_silence_duration_ms', SPLIT_SILENCE_MS)
+    return get_speech_timestamps(audio, VadOptions(**options))
+
+def _normalize(text):
+    return re.sub(r'[\W_]+', '', text).lower()
+
+def _is_seam_duplicate(segment, previous):
+    """相邻块在接缝处重复识别同一句话时丢弃后者"""
+    if previous is None or segment.start >= previous.end - SEAM_TOLERANCE:
+        return False
+    if segment.end <= previous.end + SEAM_TOLERANCE:
+        return True
+    return _normalize(segment.text) == _normalize(previous.text)
+
+def _transcribe_chunk(model, audio, start, end, language, vad, beam_size=5, word_timestamps=False):
+    # 在线程内完整消费生成器，CTranslate2 解码时释放GIL，多个块可真正并行
+    segments, _ = model.transcribe(audio[start:end], beam_size=beam_size, language=language,
+                                   vad_filter=vad is not None, vad_parameters=vad, word_timestamps=word_timestamps)
+    offset = start / SAMPLING_RATE
+    return [shift_segment(segment, offset) for segment in map(segment_from_whisper, segments)]
+
+def transcribe_chunked(model, audio, language, workers, vad=None, beam_size=5, word_timestamps=False):
+    """把长音频切成多块并行转写，按时间顺序返回分段，时间戳换算为全局时间
+
+    模型需以 num_workers >= workers 加载，才能同时执行多个解码。
+    """
+    if isinstance(audio, str):
+        audio = load_audio(audio)
+    # 启用VAD时切分点与跳过时长使用同一组参数，否则在切分需要时才运行VAD
+    speech = speech_timestamps(audio, vad) if vad is not None else None
+    chunks = plan_chunks(audio, workers, speech)
+    duration = len(audio) / SAMPLING_RATE
+    if speech is not None:
+        duration_after_vad = sum(item['end'] - item['start'] for item in speech) / SAMPLING_RATE
+    else:
+        duration_after_vad = duration
+    info = TranscriptInfo(duration, language, 1.0, duration_after_vad)
+    return _iter_chunks(model, audio, chunks, language, workers, vad, beam_size, word_timestamps), info
+
+def _iter_chunks(model, audio, chunks, language, workers, vad, beam_size, word_timestamps):
+    executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks))),
+                                  thread_name_prefix='whisper-chunk')
+    try:
+        futures = [
+            executor.submit(_transcribe_chunk, model, audio, start, end, language, vad, beam_size, word_timestamps)
+            for start, end in chunks
+        ]
+        previous = None
+        for future in futures:
+            at_seam = previous is not None
+            for segment in future.result():
+                # 只检查每块开头与上一块重叠的分段
+                if at_seam and _is_seam_duplicate(segment, previous):
+                    continue
+                at_seam = False
+                previous = segment
+                yield segment
+    finally:
+        # 调用方提前停止时取消尚未开始的块
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def chunk_threads(workers):
+    """分块并行时每个解码线程可用的CPU线程数"""
+    return max(1, (os.cpu_count() or 1) // max(workers, 1))
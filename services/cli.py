@@ -0,0 +1,259 @@
+"""命令行批量转写，不依赖 PyQt5，可在无图形界面的服务器上使用
+
+    python -m services audio/*.mp3 -o out -f txt srt --model medium
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from services.manifest import JobManifest, output_path_for
+from services.segments import Segment, SegmentStore
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.m4a', '.flac')
+
+EXIT_OK = 0
+EXIT_FAILED = 1  # 部分或全部文件转写失败
+EXIT_USAGE = 2  # 参数错误或没有可处理的文件
+EXIT_INTERRUPTED = 130
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m services', description='faster-whisper 批量转写')
+    parser.add_argument('inputs', nargs='+', help='音频文件、通配符或文件夹')
+    parser.add_argument('-r', '--recursive', action='store_true', help='递归处理子文件夹')
+    parser.add_argument('-o', '--output-dir', help='输出目录，默认与音频文件相同')
+    parser.add_argument('-f', '--format', nargs='+', choices=['txt', 'srt', 'vtt', 'json'], default=['txt'],
+                        help='输出格式，可指定多个')
+    parser.add_argument('-m', '--model', default='small', help='模型大小')
+    parser.add_argument('--model-path', help='本地模型目录或 HuggingFace 缓存目录')
+    parser.add_argument('-l', '--language', default='zh', help='语言代码')
+    parser.add_argument('--device', default='cpu', choices=['cpu', 'cuda', 'auto'])
+    parser.add_argument('--compute-type', default='int8')
+    parser.add_argument('-t', '--threads', type=int, default=0, help='CPU线程总数，0为自动；多进程时按进程数均分')
+    parser.add_argument('-p', '--processes', type=int, default=1, help='并行转写的进程数')
+    parser.add_argument('--batch-size', type=int, default=0, help='批量推理的批大小，0为不使用')
+    parser.add_argument('--chunk-workers', type=int, default=1, help='长音频分块并行解码的线程数')
+    parser.add_argument('--word-timestamps', action='store_true', help='输出逐词时间戳与概率(json、vtt)')
+    parser.add_argument('--vad', action='store_true', help='解码前用VAD去除非语音部分')
+    parser.add_argument('--vad-threshold', type=float)
+    parser.add_argument('--vad-min-silence-ms', type=int)
+    parser.add_argument('--vad-speech-pad-ms', type=int)
+    parser.add_argument('--resume', action='store_true', help='跳过输出目录清单中已完成的文件(需要 -o)')
+    parser.add_argument('--no-cache', action='store_true', help='不使用转写结果与音频缓存')
+    parser.add_argument('--summary', help='把JSON汇总写入该文件，默认输出到标准输出')
+    parser.add_argument('-q', '--quiet', action='store_true', help='不输出进度信息')
+    return parser
+
+def collect_inputs(patterns, recursive=False):
+    """展开文件、通配符与文件夹，返回 (去重后的音频文件, 未匹配的输入)"""
+    files, missing = [], []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            if recursive:
+                matches = [
+                    os.path.join(root, name)
+                    for root, _, names in os.walk(pattern) for name in names
+                ]
+            else:
+                matches = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+            matches = sorted(path for path in matches if path.lower().endswith(AUDIO_EXTENSIONS))
+        elif os.path.isfile(pattern):
+            matches = [pattern]
+        else:
+            matches = sorted(path for path in glob.glob(pattern, recursive=recursive) if os.path.isfile(path))
+        if not matches:
+            missing.append(pattern)
+        files.extend(matches)
+    unique = list(dict.fromkeys(os.path.abspath(path) for path in files))
+    return unique, missing
+
+class BatchRunner:
+    def __init__(self, args, log):
+        self.args = args
+        self.log = log
+        self.vad = None
+        if args.vad:
+            from services.decoding import vad_parameters
+            self.vad = vad_parameters(args.vad_threshold, args.vad_min_silence_ms, args.vad_speech_pad_ms)
+        self.batch_size = max(args.batch_size, 0)
+        # 与转写缓存键一致，包含 --model-path 解析出的模型与分块并行数
+        from services.engine import DecodeOptions, resume_fingerprint
+        options = DecodeOptions(args.language, self.batch_size, self.vad, max(args.chunk_workers, 1),
+                                word_timestamps=args.word_timestamps)
+        self.fingerprint = resume_fingerprint(args.model, args.compute_type, options, args.model_path)
+        self.manifest = None
+        if args.resume and args.output_dir:
+            self.manifest = JobManifest(args.output_dir)
+
+    def output_paths(self, audio_file):
+        output_dir = self.args.output_dir or os.path.dirname(audio_file)
+        return [output_path_for(audio_file, output_dir, f".{fmt}") for fmt in self.args.format]
+
+    def finish_file(self, audio_file, store, started, duration=None):
+        from services.exporters import export_segments
+        outputs = self.output_paths(audio_file)
+        for path in outputs:
+            export_segments(path, {audio_file: store})
+        if self.manifest:
+            self.manifest.mark(audio_file, JobManifest.DONE, self.fingerprint, output=outputs[0])
+        self.log(f"完成: {os.path.basename(audio_file)} ({len(store)} 段)")
+        return {
+            'file': audio_file,
+            'status': 'done',
+            'outputs': outputs,
+            'segments': len(store),
+            'duration': round(duration, 3) if duration is not None else None,
+            'elapsed': round(time.perf_counter() - started, 3)
+        }
+
+    def fail_file(self, audio_file, error, started=None):
+        if self.manifest:
+            self.manifest.mark(audio_file, JobManifest.FAILED, self.fingerprint, error=error)
+        self.log(f"失败: {os.path.basename(audio_file)}: {error}")
+        return {
+            'file': audio_file,
+            'status': 'failed',
+            'error': error,
+            'elapsed': round(time.perf_counter() - started, 3) if started else 0.0
+        }
+
+    def run(self, audio_files):
+        if self.manifest:
+            pending = self.manifest.pending_files(audio_files, self.fingerprint)
+            results = [
+                {'file': audio_file, 'status': 'skipped', 'outputs': self.output_paths(audio_file)}
+                for audio_file in audio_files if audio_file not in pending
+            ]
+            if results:
+                self.log(f"跳过 {len(results)} 个已完成的文件")
+            audio_files = pending
+        else:
+            results = []
+        if not audio_files:
+            return results
+        if self.args.processes > 1 and len(audio_files) > 1:
+            return results + list(self.run_parallel(audio_files))
+        return results + list(self.run_serial(audio_files))
+
+    def run_serial(self, audio_files):
+        from services.engine import DecodeOptions, TranscriptionEngine
+
+        args = self.args
+        options = DecodeOptions(args.language, self.batch_size, self.vad, max(args.chunk_workers, 1),
+                                word_timestamps=args.word_timestamps)
+        engine = TranscriptionEngine.for_options(args.model, args.device, args.compute_type, options,
+                                                 model_path=args.model_path, cpu_threads=args.threads)
+        model_desc = engine.describe()
+        if model_desc:
+            self.log(model_desc)
+        try:
+            engine.load()
+        except Exception as e:
+            for audio_file in audio_files:
+                yield self.fail_file(audio_file, f"模型加载失败: {str(e)}")
+            return
+
+        try:
+            for audio_file in audio_files:
+                self.log(f"正在处理: {os.path.basename(audio_file)}")
+                started = time.perf_counter()
+                if self.manifest:
+                    self.manifest.mark(audio_file, JobManifest.RUNNING, self.fingerprint)
+                infos = []
+                try:
+                    store = SegmentStore()
+                    for segment in engine.transcribe(audio_file, options, on_info=infos.append):
+                        store.append(segment)
+                    yield self.finish_file(audio_file, store, started, infos[0].duration)
+                except Exception as e:
+                    yield self.fail_file(audio_file, str(e), started)
+        finally:
+            engine.release()
+
+    def run_parallel(self, audio_files):
+        from services.parallel import ParallelTranscriber
+
+        args = self.args
+        transcriber = ParallelTranscriber(
+            audio_files, args.model, args.device, args.compute_type, model_path=args.model_path,
+            language=args.language, batch_size=self.batch_size, processes=args.processes, vad=self.vad,
+            word_timestamps=args.word_timestamps, cpu_threads=args.threads, chunk_workers=args.chunk_workers
+        )
+        self.log(f"正在启动 {transcriber.processes} 个转写进程...")
+        stores, started, reported = {}, {}, set()
+        transcriber.start()
+        try:
+            for event in transcriber.events():
+                kind, audio_file = event[0], event[1]
+                if kind == 'start':
+                    stores[audio_file] = SegmentStore()
+                    started[audio_file] = time.perf_counter()
+                    if self.manifest:
+                        self.manifest.mark(audio_file, JobManifest.RUNNING, self.fingerprint)
+                elif kind == 'segment':
+                    # 子进程已完成繁简转换
+                    stores.setdefault(audio_file, SegmentStore()).append(Segment(*event[2]))
+                elif kind == 'done':
+                    reported.add(audio_file)
+                    yield self.finish_file(audio_file, stores.pop(audio_file, SegmentStore()), started[audio_file],
+                                           transcriber.durations.get(audio_file))
+                elif kind == 'error':
+                    reported.add(audio_file)
+                    stores.pop(audio_file, None)
+                    yield self.fail_file(audio_file, event[2], started.get(audio_file))
+                elif kind == 'fatal':
+                    self.log(f"转写进程出错: {event[2]}")
+        finally:
+            transcriber.stop()
+            transcriber.join()
+        for audio_file in audio_files:
+            if audio_file not in reported:
+                yield self.fail_file(audio_file, '转写进程异常退出')
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    log = (lambda message: None) if args.quiet else (lambda message: print(message, file=sys.stderr, flush=True))
+
+    if args.resume and not args.output_dir:
+        parser.error('--resume 需要同时指定 --output-dir')
+    audio_files, missing = collect_inputs(args.inputs, args.recursive)
+    for pattern in missing:
+        log(f"未找到音频文件: {pattern}")
+    if not audio_files:
+        return EXIT_USAGE
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    if args.no_cache:
+        from services.audio import audio_cache
+        from services.transcript_cache import transcript_cache
+        audio_cache.configure(max_mb=0)
+        transcript_cache.configure(max_mb=0)
+
+    started = time.perf_counter()
+    try:
+        runner = BatchRunner(args, log)
+        results = runner.run(audio_files)
+    except ValueError as e:
+        parser.error(str(e))
+    except KeyboardInterrupt:
+        log('已中断')
+        return EXIT_INTERRUPTED
+
+    failed = sum(1 for result in results if result['status'] == 'failed')
+    summary = {
+        'total': len(results),
+        'done': sum(1 for result in results if result['status'] == 'done'),
+        'skipped': sum(1 for result in results if result['status'] == 'skipped'),
+        'failed': failed,
+        'missing': missing,
+        'elapsed': round(time.perf_counter() - started, 3),
+        'files': results
+    }
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return EXIT_FAILED if failed else EXIT_OK
@@ -0,0 +1,105 @@
+from services.audio import audio_cache
+from services.chunking import transcribe_chunked
+from services.model_pool import model_pool
+from services.segments import segment_from_whisper, info_from_whisper
+from services.transcript_cache import transcript_cache
+
+# Silero VAD 参数的默认值，与 faster_whisper.vad.VadOptions 一致
+VAD_DEFAULTS = {'threshold': 0.5, 'min_silence_duration_ms': 2000, 'speech_pad_ms': 400}
+
+def vad_parameters(threshold=None, min_silence_ms=None, speech_pad_ms=None):
+    """生成 VAD 参数，未指定的项使用默认值；取值非法时抛出 ValueError"""
+    vad = dict(VAD_DEFAULTS)
+    if threshold is not None:
+        vad['threshold'] = float(threshold)
+    if min_silence_ms is not None:
+        vad['min_silence_duration_ms'] = int(min_silence_ms)
+    if speech_pad_ms is not None:
+        vad['speech_pad_ms'] = int(speech_pad_ms)
+    if not 0 < vad['threshold'] < 1:
+        raise ValueError('VAD阈值必须在0到1之间')
+    if vad['min_silence_duration_ms'] < 0 or vad['speech_pad_ms'] < 0:
+        raise ValueError('VAD时长参数不能为负数')
+    return vad
+
+def skipped_duration(info):
+    """VAD 丢弃的非语音时长(秒)"""
+    after_vad = getattr(info, 'duration_after_vad', None)
+    if after_vad is None:
+        return 0.0
+    return max(info.duration - after_vad, 0.0)
+
+def vad_report(info):
+    skipped = skipped_duration(info)
+    if skipped <= 0:
+        return None
+    ratio = skipped / info.duration * 100 if info.duration > 0 else 0
+    return f"VAD已跳过 {skipped:.1f} 秒非语音音频 ({ratio:.0f}%)"
+
+def cache_key(model_id, audio_path, language, batch_size=0, vad=None, chunk_workers=0, beam_size=5,
+              word_timestamps=False):
+    """转写结果的缓存键，缓存未启用或无法确定模型标识时返回 None"""
+    if not transcript_cache.enabled or not model_id:
+        return None
+    if batch_size > 0 or chunk_workers <= 1:
+        chunk_workers = 0
+    options = {'language': language, 'beam_size': beam_size, 'batch_size': batch_size, 'vad': vad}
+    if chunk_workers:
+        options['chunk_workers'] = chunk_workers
+    if word_timestamps:
+        options['word_timestamps'] = True
+    return transcript_cache.make_key(transcript_cache.audio_digest(audio_path), model_id, options)
+
+def transcribe_audio(model, audio, language, batch_size=0, vad=None, chunk_workers=0, samples=None, beam_size=5,
+                     word_timestamps=False):
+    """转写音频，结果按内容与解码参数缓存
+
+    batch_size 大于0时使用批量推理：先按VAD切分语音片段，再将多个片段合并为一批解码。
+    vad 为 VAD 参数字典时先用 Silero VAD 去除非语音部分再解码，为 None 时不做预处理。
+    chunk_workers 大于1且未使用批量推理时，长音频在静音处切块后由多个线程并行解码。
+    samples 为已解码的音频数组(如预取得到的)，提供时 audio 路径只用于查找缓存。
+    word_timestamps 为真时额外对齐每个词的起止时间与概率，解码耗时略有增加。
+    """
+    if batch_size > 0 or chunk_workers <= 1:
+        chunk_workers = 0
+    key = None
+    if isinstance(audio, str):
+        key = cache_key(model_pool.identity(model), audio, language, batch_size, vad, chunk_workers, beam_size,
+                        word_timestamps)
+    if key is not None:
+        cached = transcript_cache.get(key)
+        if cached is not None:
+            info, segments = cached
+            return iter(segments), info
+
+    if samples is not None:
+        audio = samples
+    elif isinstance(audio, str) and audio_cache.enabled:
+        # 同一文件只解码一次，之后以内存映射数组交给模型
+        audio = audio_cache.load(audio)
+
+    if batch_size > 0:
+        # 延迟导入，命令行等场景无需在启动时加载 faster_whisper
+        from faster_whisper import BatchedInferencePipeline
+        pipeline = BatchedInferencePipeline(model=model)
+        # 批量推理本身依赖VAD切分，vad 为 None 时使用默认参数
+        segments, info = pipeline.transcribe(audio, beam_size=beam_size, language=language, batch_size=batch_size,
+                                             vad_parameters=vad, word_timestamps=word_timestamps)
+    elif chunk_workers:
+        segments, info = transcribe_chunked(model, audio, language, chunk_workers, vad, beam_size, word_timestamps)
+    else:
+        segments, info = model.transcribe(audio, beam_size=beam_size, language=language,
+                                          vad_filter=vad is not None, vad_parameters=vad,
+                                          word_timestamps=word_timestamps)
+
+    if key is None:
+        return segments, info
+    return _record_segments(segments, key, info_from_whisper(info)), info
+
+def _record_segments(segments, key, info):
+    # 只有完整解码的结果才写入缓存，中途停止时生成器不会执行到最后
+    collected = []
+    for segment in segments:
+        collected.append(segment_from_whisper(segment))
+        yield segment
+    transcript_cache.put(key, info, collected)
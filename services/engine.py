@@ -0,0 +1,188 @@
+"""不依赖 Qt 的转写引擎，GUI 工作线程、API 与命令行共用
+
+模型来自共享模型池，音频经音频缓存解码，结果经转写缓存复用；
+调用方只需处理逐段产出的 Segment、进度回调与取消。
+"""
+import threading
+import time
+from collections import namedtuple
+from services.chunking import chunk_threads
+from services.decoding import cache_key, transcribe_audio
+from services import metrics
+from services.manifest import settings_fingerprint
+from services.model_pool import model_identity, model_pool, resolve_model
+from services.segments import segment_from_whisper
+from services.transcript_cache import transcript_cache
+
+# 影响转写结果的解码参数
+DecodeOptions = namedtuple('DecodeOptions', ['language', 'batch_size', 'vad', 'chunk_workers', 'beam_size',
+                                             'word_timestamps'],
+                           defaults=('zh', 0, None, 1, 5, False))
+
+def resume_fingerprint(model_size, compute_type, options, model_path=None):
+    """断点续传清单使用的设置指纹
+
+    与转写缓存键一致，包含解析后的模型标识(换用同名的其他本地模型时变化)与实际生效的分块并行数。
+    """
+    model_id, _ = resolve_model(model_size, model_path)
+    chunk_workers = options.chunk_workers if options.batch_size <= 0 and options.chunk_workers > 1 else 1
+    return settings_fingerprint({
+        'model_size': model_size, 'model_id': model_id, 'compute_type': compute_type,
+        'language': options.language, 'batch_size': options.batch_size, 'vad': options.vad,
+        'chunk_workers': chunk_workers, 'word_timestamps': options.word_timestamps
+    })
+
+class CancelToken:
+    """跨线程的取消标记，与 threading.Event 一样提供 is_set()"""
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    def is_set(self):
+        return self.event.is_set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+_converters = {}
+_converters_lock = threading.Lock()
+
+def text_converter(language):
+    """中文结果统一转换为简体，其余语言不做转换时返回 None"""
+    if language != 'zh':
+        return None
+    with _converters_lock:
+        converter = _converters.get('t2s')
+        if converter is None:
+            from opencc import OpenCC
+            converter = _converters['t2s'] = OpenCC('t2s').convert
+    return converter
+
+def convert_segment(segment, convert):
+    """转换分段文本，逐词结果逐个转换以保持与时间戳的对应"""
+    words = segment.words
+    if words:
+        words = tuple(word._replace(word=convert(word.word)) for word in words)
+    return segment._replace(text=convert(segment.text), words=words)
+
+def estimate_progress(segment, duration):
+    """无法预知分段总数，按已转写到的时间估算进度(0-99)"""
+    return min(int((segment.end / duration if duration > 0 else 1.0) * 100), 99)
+
+def transcribe_segments(model, audio, options, cancel=None, on_info=None, on_progress=None, samples=None):
+    """逐段产出转写结果，中文已转换为简体
+
+    on_info 在解码开始前以 TranscriptionInfo 调用一次，on_progress 每段以估算进度调用；
+    cancel.is_set() 为真时停止解码，未开始的分块与缓存写入随之取消。
+    """
+    if cancel is not None and cancel.is_set():
+        return
+    metrics.active_transcriptions.inc()
+    status = 'failed'
+    # 只累计生成器内的耗时，调用方处理分段(界面刷新、网络发送)的时间不计入
+    decode_time = 0.0
+    try:
+        started = time.perf_counter()
+        segments, info = transcribe_audio(model, audio, options.language, options.batch_size, vad=options.vad,
+                                          chunk_workers=options.chunk_workers, samples=samples,
+                                          beam_size=options.beam_size, word_timestamps=options.word_timestamps)
+        decode_time += time.perf_counter() - started
+        if on_info:
+            on_info(info)
+        convert = text_converter(options.language)
+        try:
+            started = time.perf_counter()
+            for segment in segments:
+                if cancel is not None and cancel.is_set():
+                    status = 'cancelled'
+                    break
+                elapsed = time.perf_counter() - started
+                metrics.segment_decode_seconds.observe(elapsed)
+                decode_time += elapsed
+                segment = segment_from_whisper(segment)
+                if convert:
+                    segment = convert_segment(segment, convert)
+                if on_progress:
+                    on_progress(estimate_progress(segment, info.duration))
+                yield segment
+                started = time.perf_counter()
+            else:
+                status = 'completed'
+                metrics.transcription_seconds.observe(decode_time)
+                metrics.audio_seconds_total.inc(info.duration)
+                if info.duration > 0:
+                    metrics.realtime_factor.observe(decode_time / info.duration)
+        except GeneratorExit:
+            # 调用方提前关闭生成器(客户端断开、停止转写)
+            status = 'cancelled'
+            raise
+        finally:
+            if hasattr(segments, 'close'):
+                segments.close()
+    finally:
+        metrics.active_transcriptions.dec()
+        metrics.transcriptions_total.inc(status=status)
+
+class TranscriptionEngine:
+    """持有共享模型池中的一个模型租约
+
+    同时解码多个块时模型以 num_workers 加载，未指定线程数时CPU线程按并行数均分。
+    """
+
+    def __init__(self, model_size, device='cpu', compute_type='int8', model_path=None, cpu_threads=0,
+                 num_workers=1, backend='whisper'):
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self.model_path = model_path
+        self.num_workers = max(num_workers, 1)
+        if not cpu_threads and self.num_workers > 1:
+            cpu_threads = chunk_threads(self.num_workers)
+        self.cpu_threads = cpu_threads
+        self.backend = backend
+        self.model = None
+
+    @classmethod
+    def for_options(cls, model_size, device, compute_type, options, model_path=None, cpu_threads=0,
+                    backend='whisper'):
+        # 批量推理不分块，只需单路解码
+        num_workers = options.chunk_workers if options.batch_size <= 0 else 1
+        return cls(model_size, device, compute_type, model_path, cpu_threads, num_workers, backend)
+
+    def describe(self):
+        """返回使用本地模型时的说明文字，使用默认下载位置时为 None"""
+        return resolve_model(self.model_size, self.model_path)[1]
+
+    def load(self):
+        if self.model is None:
+            self.model = model_pool.acquire(self.model_size, self.device, self.compute_type,
+                                            model_path=self.model_path, cpu_threads=self.cpu_threads,
+                                            num_workers=self.num_workers, backend=self.backend)
+        return self.model
+
+    def release(self):
+        model_pool.release(self.model)
+        self.model = None
+
+    def is_cached(self, audio_file, options):
+        """转写缓存中是否已有该文件在此模型与参数下的结果，无需加载模型"""
+        model_id, _ = resolve_model(self.model_size, self.model_path)
+        key = cache_key(model_identity(model_id, self.compute_type, self.backend), audio_file, options.language,
+                        options.batch_size, options.vad, options.chunk_workers, options.beam_size,
+                        options.word_timestamps)
+        return key is not None and transcript_cache.contains(key)
+
+    def __enter__(self):
+        self.load()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def transcribe(self, audio, options, cancel=None, on_info=None, on_progress=None, samples=None):
+        return transcribe_segments(self.load(), audio, options, cancel=cancel, on_info=on_info,
+                                   on_progress=on_progress, samples=samples)
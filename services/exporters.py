@@ -0,0 +1,99 @@
+import json
+import os
+
+def format_line(segment):
+    return f"[{segment.start:.2f}s -> {segment.end:.2f}s] {segment.text.strip()}"
+
+def srt_timestamp(seconds):
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600 * 1000)
+    minutes, milliseconds = divmod(milliseconds, 60 * 1000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{milliseconds:03d}"
+
+def vtt_timestamp(seconds):
+    return srt_timestamp(seconds).replace(',', '.')
+
+def write_txt(f, stores):
+    for index, (name, store) in enumerate(stores.items()):
+        # 多个文件合并导出时以文件名分隔
+        if len(stores) > 1:
+            if index:
+                f.write('\n')
+            f.write(f"正在处理: {os.path.basename(name)}\n")
+        for segment in store:
+            f.write(format_line(segment) + '\n')
+
+def write_srt(f, stores):
+    counter = 1
+    for store in stores.values():
+        for segment in store:
+            f.write(f"{counter}\n")
+            f.write(f"{srt_timestamp(segment.start)} --> {srt_timestamp(segment.end)}\n")
+            f.write(f"{segment.text.strip()}\n\n")
+            counter += 1
+
+def write_vtt(f, stores):
+    """WebVTT 字幕；有逐词时间戳时在每个词前插入时间标签，播放器可逐词高亮(卡拉OK效果)"""
+    f.write("WEBVTT\n\n")
+    for store in stores.values():
+        for index in range(len(store)):
+            f.write(f"{vtt_timestamp(store.starts[index])} --> {vtt_timestamp(store.ends[index])}\n")
+            words = store.word_range(index)
+            if words:
+                # 直接按下标读取逐词数组，不为每个词创建对象；时间标签须晚于字幕开始时间
+                cue = ''.join(
+                    (f"<{vtt_timestamp(store.word_starts[i])}>" if store.word_starts[i] > store.starts[index] else '')
+                    + f"<c>{_vtt_escape(store.words[i])}</c>"
+                    for i in words
+                )
+                f.write(cue + "\n\n")
+            else:
+                f.write(f"{_vtt_escape(store.texts[index].strip())}\n\n")
+
+def _vtt_escape(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+def word_json(start, end, word, probability):
+    return {'start': round(start, 3), 'end': round(end, 3), 'word': word, 'probability': round(probability, 4)}
+
+def store_json(store):
+    """SegmentStore 转为 JSON 列表，逐词结果直接从数组读取"""
+    segments = []
+    for index in range(len(store)):
+        data = {
+            'start': round(store.starts[index], 3),
+            'end': round(store.ends[index], 3),
+            'text': store.texts[index].strip(),
+            'avg_logprob': round(store.avg_logprobs[index], 4),
+            'no_speech_prob': round(store.no_speech_probs[index], 4)
+        }
+        words = store.word_range(index)
+        if words:
+            data['words'] = [word_json(store.word_starts[i], store.word_ends[i], store.words[i],
+                                       store.word_probabilities[i]) for i in words]
+        segments.append(data)
+    return segments
+
+def write_json(f, stores):
+    data = [
+        {
+            'file': name,
+            'segments': store_json(store)
+        }
+        for name, store in stores.items()
+    ]
+    json.dump(data[0] if len(data) == 1 else data, f, ensure_ascii=False, indent=2)
+
+EXPORTERS = {
+    '.txt': write_txt,
+    '.srt': write_srt,
+    '.json': write_json,
+    '.vtt': write_vtt,
+}
+
+def export_segments(path, stores):
+    """按扩展名导出分段结果，stores 为 {文件名: SegmentStore}，未知扩展名按 txt 导出"""
+    writer = EXPORTERS.get(os.path.splitext(path)[1].lower(), write_txt)
+    with open(path, 'w', encoding='utf-8') as f:
+        writer(f, stores)
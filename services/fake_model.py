@@ -0,0 +1,62 @@
+"""模拟 WhisperModel 的假后端，用于压测与调度测试，不做任何推理
+
+按音频时长以固定速率 sleep 来模拟推理耗时，分段以与真实模型相同的方式逐个产出。
+在配置中设置 "model_backend": "fake" 后 APIServer 使用该后端。
+"""
+import random
+import time
+from services.model_pool import model_pool
+from services.segments import Segment, TranscriptInfo, Word
+
+SAMPLING_RATE = 16000
+
+class FakeWhisperModel:
+    def __init__(self, latency=0.05, segment_seconds=5.0, load_time=0.0, fail_rate=0.0):
+        self.latency = latency                  # 每秒音频的模拟推理耗时(秒)
+        self.segment_seconds = segment_seconds  # 每个分段覆盖的音频时长
+        self.fail_rate = fail_rate              # 按该比例随机抛出异常，用于测试错误处理
+        self.calls = 0
+        if load_time:
+            time.sleep(load_time)
+
+    def _duration(self, audio):
+        if isinstance(audio, str):
+            from services.parallel import probe_duration
+            return probe_duration(audio)
+        return len(audio) / SAMPLING_RATE
+
+    def transcribe(self, audio, language=None, **kwargs):
+        self.calls += 1
+        if self.fail_rate and random.random() < self.fail_rate:
+            raise RuntimeError('模拟推理失败')
+        duration = self._duration(audio)
+        info = TranscriptInfo(duration, language or 'zh', 1.0, duration)
+        return self._segments(duration, kwargs.get('word_timestamps', False)), info
+
+    def _segments(self, duration, word_timestamps=False):
+        start = 0.0
+        index = 0
+        while start < duration:
+            end = min(start + self.segment_seconds, duration)
+            time.sleep((end - start) * self.latency)
+            index += 1
+            text = f"模拟分段 {index}"
+            words = None
+            if word_timestamps:
+                # 分段时长在三个词之间均分
+                step = (end - start) / 3
+                words = tuple(Word(start + i * step, start + (i + 1) * step, word, 0.9)
+                              for i, word in enumerate(['模拟', '分段', f" {index}"]))
+            yield Segment(start, end, text, -0.3, 0.01, words)
+            start = end
+
+# 由 configure_fake_backend 设置，之后加载的假模型使用这些参数
+fake_settings = {'latency': 0.05, 'segment_seconds': 5.0, 'load_time': 0.0, 'fail_rate': 0.0}
+
+def configure_fake_backend(**settings):
+    fake_settings.update({key: value for key, value in settings.items() if value is not None})
+
+def _load_fake_model(model_id, device, compute_type, cpu_threads, num_workers):
+    return FakeWhisperModel(**fake_settings)
+
+model_pool.register_backend('fake', _load_fake_model)
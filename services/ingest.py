@@ -0,0 +1,271 @@
+"""边接收边转写的音频流接入
+
+客户端按块发送音频(PCM、Opus 数据包或 Ogg/WebM 容器流)，每块到达后立即解码为 16kHz PCM
+并送入 LiveTranscriber，无需等待整个文件上传完成。每个连接的待转写音频有时长上限，
+超出时接收方暂停读取，压力经 TCP 流量控制传回客户端。
+"""
+import collections
+import io
+import threading
+import numpy as np
+from services.audio import SAMPLING_RATE
+from services.live import pcm_to_float32
+
+FORMATS = ('pcm', 'opus', 'ogg', 'webm')
+
+_EMPTY = np.zeros(0, dtype=np.float32)
+
+def _frames_to_float32(frames):
+    arrays = [frame.to_ndarray().reshape(-1).astype(np.float32) / 32768.0 for frame in frames]
+    return np.concatenate(arrays) if arrays else _EMPTY
+
+def _resampler():
+    import av
+    return av.audio.resampler.AudioResampler(format='s16', layout='mono', rate=SAMPLING_RATE)
+
+class PCMDecoder:
+    """16位小端单声道 PCM，采样率不是 16kHz 时重采样(如电话的 8kHz)"""
+
+    def __init__(self, sample_rate=SAMPLING_RATE):
+        self.sample_rate = sample_rate
+        self.pending = b''  # 跨块的半个采样
+        self.resampler = _resampler() if sample_rate != SAMPLING_RATE else None
+
+    def feed(self, data):
+        data = self.pending + data
+        usable = len(data) - len(data) % 2
+        self.pending = data[usable:]
+        if self.resampler is None:
+            return pcm_to_float32(data[:usable])
+        import av
+        samples = np.frombuffer(data[:usable], dtype='<i2').reshape(1, -1)
+        frame = av.AudioFrame.from_ndarray(samples, format='s16', layout='mono')
+        frame.sample_rate = self.sample_rate
+        return _frames_to_float32(self.resampler.resample(frame))
+
+    def close(self):
+        return _frames_to_float32(self.resampler.resample(None)) if self.resampler else _EMPTY
+
+    def abort(self):
+        pass
+
+class OpusPacketDecoder:
+    """每块为一个不带容器的 Opus 数据包(WebRTC、电话网关的常见输出)"""
+
+    def __init__(self, sample_rate=48000):
+        import av
+        self.codec = av.CodecContext.create('opus', 'r')
+        self.codec.sample_rate = sample_rate
+        self.codec.layout = 'mono'
+        self.resampler = _resampler()
+
+    def feed(self, data):
+        import av
+        frames = []
+        for frame in self.codec.decode(av.Packet(data)):
+            frames.extend(self.resampler.resample(frame))
+        return _frames_to_float32(frames)
+
+    def close(self):
+        return _frames_to_float32(self.resampler.resample(None))
+
+    def abort(self):
+        pass
+
+class _BytePipe(io.RawIOBase):
+    """写入方追加字节、读取方阻塞读取的管道，用于把分块到达的数据交给 av.open"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.chunks = collections.deque()
+        self.eof = False
+
+    def readable(self):
+        return True
+
+    def write_chunk(self, data):
+        with self.cond:
+            self.chunks.append(bytes(data))
+            self.cond.notify()
+
+    def finish(self):
+        with self.cond:
+            self.eof = True
+            self.cond.notify()
+
+    def abort(self):
+        """丢弃未读取的数据并结束，读取方随即读到文件结尾"""
+        with self.cond:
+            self.chunks.clear()
+            self.eof = True
+            self.cond.notify()
+
+    def readinto(self, buffer):
+        with self.cond:
+            while not self.chunks and not self.eof:
+                self.cond.wait()
+            if not self.chunks:
+                return 0
+            chunk = self.chunks.popleft()
+            size = min(len(buffer), len(chunk))
+            buffer[:size] = chunk[:size]
+            if size < len(chunk):
+                self.chunks.appendleft(chunk[size:])
+            return size
+
+class ContainerDecoder:
+    """Ogg/WebM 容器中的音频流(如浏览器 MediaRecorder 的输出)，由后台线程持续解复用与解码"""
+
+    def __init__(self, container_format):
+        self.container_format = container_format
+        self.pipe = _BytePipe()
+        self.lock = threading.Lock()
+        self.decoded = []
+        self.error = None
+        self.resampler = _resampler()
+        self.thread = threading.Thread(target=self._run, name='ingest-demux', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        import av
+        try:
+            # 缩小探测长度，收到第一个数据页即可开始解码
+            with av.open(self.pipe, format=self.container_format, options={'probesize': '4096'}) as container:
+                for frame in container.decode(audio=0):
+                    samples = _frames_to_float32(self.resampler.resample(frame))
+                    with self.lock:
+                        self.decoded.append(samples)
+                samples = _frames_to_float32(self.resampler.resample(None))
+                with self.lock:
+                    self.decoded.append(samples)
+        except Exception as e:
+            self.error = e
+
+    def _take(self):
+        if self.error is not None:
+            raise RuntimeError(f"音频流解码失败: {self.error}")
+        with self.lock:
+            decoded, self.decoded = self.decoded, []
+        return np.concatenate(decoded) if decoded else _EMPTY
+
+    def feed(self, data):
+        self.pipe.write_chunk(data)
+        return self._take()
+
+    def close(self):
+        self.pipe.finish()
+        self.thread.join()
+        return self._take()
+
+    def abort(self, timeout=5):
+        """连接断开时结束解复用线程，不再解码剩余数据"""
+        self.pipe.abort()
+        self.thread.join(timeout)
+
+def make_decoder(audio_format='pcm', sample_rate=None):
+    """按格式名创建分块解码器，格式不支持时抛出 ValueError"""
+    if audio_format == 'pcm':
+        return PCMDecoder(int(sample_rate or SAMPLING_RATE))
+    if audio_format == 'opus':
+        return OpusPacketDecoder(int(sample_rate or 48000))
+    if audio_format in ('ogg', 'webm'):
+        return ContainerDecoder('matroska' if audio_format == 'webm' else 'ogg')
+    raise ValueError(f"不支持的音频格式: {audio_format}，可选 {', '.join(FORMATS)}")
+
+class IngestSession:
+    """单个连接的增量转写
+
+    接收方调用 put() 写入收到的音频字节，解码后进入待转写队列，由独立线程送入 LiveTranscriber；
+    尚未转写完的音频(队列中与正在推理的)超过 max_backlog 秒时 put() 阻塞，直到推理追上。
+    on_event 在推理线程中以每个 LiveEvent 调用。
+    """
+
+    def __init__(self, decoder, transcriber, on_event, max_backlog=10.0):
+        self.decoder = decoder
+        self.transcriber = transcriber
+        self.on_event = on_event
+        self.max_backlog = int(max_backlog * SAMPLING_RATE)
+        self.cond = threading.Condition()
+        self.queue = collections.deque()
+        self.backlog = 0        # 队列中与正在推理的采样数
+        self.peak_backlog = 0
+        self.finished = False
+        self.closed = False
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name='ingest', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def put(self, data):
+        self._enqueue(self.decoder.feed(data))
+
+    def finish(self):
+        """音频已全部收到，剩余的语音在推理线程中作为最终分段输出"""
+        self._enqueue(self.decoder.close())
+        with self.cond:
+            self.finished = True
+            self.cond.notify_all()
+
+    def join(self, timeout=None):
+        self.thread.join(timeout)
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        """连接断开时丢弃尚未转写的音频，并结束解码器的后台线程"""
+        with self.cond:
+            self.closed = True
+            self.queue.clear()
+            self.backlog = 0
+            self.cond.notify_all()
+        self.decoder.abort()
+
+    @property
+    def peak_backlog_seconds(self):
+        return round(self.peak_backlog / SAMPLING_RATE, 3)
+
+    def _enqueue(self, samples):
+        if len(samples) == 0:
+            return
+        with self.cond:
+            while self.backlog >= self.max_backlog and not self.closed and self.error is None:
+                self.cond.wait()
+            if self.error is not None:
+                raise self.error
+            if self.closed:
+                return
+            self.queue.append(samples)
+            self.backlog += len(samples)
+            self.peak_backlog = max(self.peak_backlog, self.backlog)
+            self.cond.notify_all()
+
+    def _run(self):
+        try:
+            while True:
+                with self.cond:
+                    while not self.queue and not self.finished and not self.closed:
+                        self.cond.wait()
+                    if self.closed:
+                        return
+                    # 一次取出所有已到达的音频，推理落后时减少VAD与解码的次数
+                    samples = list(self.queue)
+                    self.queue.clear()
+                    finished = self.finished
+                if samples:
+                    batch = np.concatenate(samples)
+                    for event in self.transcriber.feed(batch):
+                        self.on_event(event)
+                    # 推理完成后才从积压中扣除，接收方在推理期间不会再多缓存一倍的音频
+                    with self.cond:
+                        self.backlog = max(self.backlog - len(batch), 0)
+                        self.cond.notify_all()
+                if finished:
+                    for event in self.transcriber.flush():
+                        self.on_event(event)
+                    return
+        except Exception as e:
+            with self.cond:
+                self.error = e
+                self.cond.notify_all()
@@ -0,0 +1,143 @@
+import threading
+import time
+import uuid
+
+class TranscribeJob:
+    """异步转写任务，记录状态、进度与已产出的分段"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+    def __init__(self, params=None):
+        self.id = uuid.uuid4().hex
+        self.params = params or {}
+        self.status = self.QUEUED
+        self.progress = 0
+        self.segments = []
+        self.duration = None
+        self.language = None
+        self.skipped_duration = 0.0
+        self.error = None
+        self.task = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.cond = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in self.FINISHED_STATES
+
+    def start(self):
+        with self.cond:
+            if self.status == self.QUEUED:
+                self.status = self.RUNNING
+            self.cond.notify_all()
+
+    def set_info(self, duration, language, skipped_duration=0.0):
+        with self.cond:
+            self.duration = duration
+            self.language = language
+            self.skipped_duration = skipped_duration
+            self.cond.notify_all()
+
+    def add_segment(self, segment):
+        with self.cond:
+            self.segments.append(segment)
+            # 基于时间估算进度
+            if self.duration:
+                self.progress = min(int(segment['end'] / self.duration * 100), 99)
+            self.cond.notify_all()
+
+    def finish(self, status, error=None):
+        with self.cond:
+            if self.finished:
+                return
+            self.status = status
+            self.error = error
+            if status == self.COMPLETED:
+                self.progress = 100
+            self.finished_at = time.time()
+            self.cond.notify_all()
+
+    def cancel(self):
+        self.cancel_event.set()
+        with self.cond:
+            # 尚未开始的任务直接标记为已取消
+            if self.status == self.QUEUED:
+                self.finish(self.CANCELLED)
+
+    def wait_for_update(self, segment_count, timeout=None):
+        """等待产生新分段或任务结束"""
+        with self.cond:
+            if len(self.segments) <= segment_count and not self.finished:
+                self.cond.wait(timeout)
+
+    def to_dict(self, include_segments=True):
+        with self.cond:
+            data = {
+                'id': self.id,
+                'status': self.status,
+                'progress': self.progress,
+                'duration': self.duration,
+                'language': self.language,
+                'skipped_duration': round(self.skipped_duration, 3),
+                'segment_count': len(self.segments),
+                'error': self.error,
+                'created_at': self.created_at,
+                'finished_at': self.finished_at
+            }
+            if self.task is not None:
+                data['timing'] = self.task.timing()
+            if include_segments:
+                data['segments'] = list(self.segments)
+            return data
+
+class JobManager:
+    """管理异步任务，已结束的任务保留 ttl 秒后清理"""
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def create(self, params=None):
+        job = TranscribeJob(params)
+        with self.lock:
+            self._purge_locked()
+            self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def remove(self, job_id):
+        with self.lock:
+            return self.jobs.pop(job_id, None)
+
+    def cancel_all(self):
+        with self.lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            job.cancel()
+
+    def stats(self):
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+
+    def _purge_locked(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished and now - job.finished_at > self.ttl
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
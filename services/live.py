@@ -0,0 +1,226 @@
+"""实时转写：从麦克风或音频流持续读取，低延迟输出临时结果与最终分段
+
+滚动窗口只保存上一个断句点之后的音频。每收到 step_seconds 的新音频运行一次 VAD，
+尾部静音超过 endpoint_silence_ms 时视为一句结束，解码到该处并输出最终分段；
+一句话尚未结束时每隔 partial_interval 秒解码整个窗口，输出可能被改写的临时结果；
+窗口超过 max_window 秒仍无断句时在最后一个停顿处强制断句，延迟因此有上限。
+"""
+import queue
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+from services.audio import SAMPLING_RATE, load_audio
+from services.chunking import speech_timestamps
+from services.decoding import VAD_DEFAULTS
+from services.engine import text_converter
+from services.segments import Segment, segment_from_whisper
+
+# kind 为 'partial'(临时结果，后续会被替换) 或 'final'(最终分段)；时间以流开始为零点
+LiveEvent = namedtuple('LiveEvent', ['kind', 'start', 'end', 'text'])
+
+# 断句前保留的最长上文字符数，作为下一句的提示词
+CONTEXT_CHARS = 200
+# 窗口内没有语音时只保留末尾这段音频，避免截断下一句的开头
+SILENCE_KEEP_SECONDS = 0.5
+
+def pcm_to_float32(data):
+    """16位小端 PCM 字节转为 float32 数组，末尾不完整的采样被忽略"""
+    usable = len(data) - len(data) % 2
+    return np.frombuffer(data[:usable], dtype='<i2').astype(np.float32) / 32768.0
+
+class MicrophoneSource:
+    """从本地麦克风读取 16kHz 单声道音频，需要安装 sounddevice"""
+
+    def __init__(self, device=None, block_ms=100):
+        self.device = device
+        self.block_size = int(SAMPLING_RATE * block_ms / 1000)
+        self.name = '麦克风'
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        try:
+            import sounddevice
+        except ImportError:
+            raise RuntimeError('使用麦克风需要先安装 sounddevice: pip install sounddevice')
+        blocks = queue.Queue()
+        callback = lambda data, frames, time_info, status: blocks.put(data[:, 0].copy())
+        with sounddevice.InputStream(samplerate=SAMPLING_RATE, channels=1, dtype='float32',
+                                     blocksize=self.block_size, device=self.device, callback=callback):
+            while not self.closed.is_set():
+                try:
+                    yield blocks.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+
+    def close(self):
+        self.closed.set()
+
+class FileSource:
+    """按实际播放速度读取音频文件，用于在没有麦克风时测试实时转写"""
+
+    def __init__(self, path, block_ms=100, realtime=True):
+        self.path = path
+        self.name = path
+        self.block_size = int(SAMPLING_RATE * block_ms / 1000)
+        self.realtime = realtime
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        audio = load_audio(self.path)
+        started = time.monotonic()
+        for offset in range(0, len(audio), self.block_size):
+            if self.closed.is_set():
+                return
+            if self.realtime:
+                # 按音频时间对齐，而不是每块固定 sleep，避免误差累积
+                delay = started + offset / SAMPLING_RATE - time.monotonic()
+                if delay > 0 and self.closed.wait(delay):
+                    return
+            yield np.asarray(audio[offset:offset + self.block_size], dtype=np.float32)
+
+    def close(self):
+        self.closed.set()
+
+class PCMSource:
+    """从二进制流(管道、标准输入、套接字文件)读取 16kHz 单声道 16位 PCM"""
+
+    def __init__(self, stream, block_ms=100, name='PCM'):
+        self.stream = stream
+        self.name = name
+        self.block_bytes = int(SAMPLING_RATE * block_ms / 1000) * 2
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        while not self.closed.is_set():
+            data = self.stream.read(self.block_bytes)
+            if not data:
+                return
+            yield pcm_to_float32(data)
+
+    def close(self):
+        self.closed.set()
+
+class LiveTranscriber:
+    """滚动窗口的流式转写器，feed() 输入音频块，返回本次产生的 LiveEvent 列表
+
+    partial_interval 为0时不输出临时结果，只在断句时解码。
+    run_inference 用于把每次解码交给调用方的调度器执行，默认在当前线程直接调用。
+    """
+
+    def __init__(self, model, language='zh', vad=None, beam_size=1, step_seconds=0.5, partial_interval=1.0,
+                 endpoint_silence_ms=600, max_window=15.0, run_inference=None):
+        self.model = model
+        self.language = language
+        self.beam_size = beam_size
+        # 断句用的VAD参数：阈值沿用设置，静音时长使用更短的断句时长
+        vad = dict(vad or VAD_DEFAULTS)
+        self.vad = {'threshold': vad['threshold'], 'min_silence_duration_ms': endpoint_silence_ms,
+                    'speech_pad_ms': 0}
+        self.step = int(step_seconds * SAMPLING_RATE)
+        self.partial_interval = int(partial_interval * SAMPLING_RATE)
+        self.endpoint = int(endpoint_silence_ms * SAMPLING_RATE / 1000)
+        self.max_window = int(max_window * SAMPLING_RATE)
+        self.run_inference = run_inference or (lambda fn: fn())
+        self.convert = text_converter(language)
+
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.offset = 0          # 窗口起点在整个流中的采样位置
+        self.checked = 0         # 上次运行VAD时的窗口长度，断句后归零
+        self.partial_at = 0      # 上次输出临时结果时的窗口长度
+        self.context = ''
+
+    @property
+    def position(self):
+        """已接收音频的总时长(秒)"""
+        return (self.offset + len(self.buffer)) / SAMPLING_RATE
+
+    def feed(self, chunk):
+        self.buffer = np.concatenate([self.buffer, np.asarray(chunk, dtype=np.float32)])
+        events = []
+        # 一次收到多段音频(推理落后或客户端发送快于实时)时，断句后继续检查剩余部分
+        while len(self.buffer) - self.checked >= self.step:
+            self.checked = len(self.buffer)
+            step_events, finalized = self._step()
+            events.extend(step_events)
+            if not finalized:
+                break
+        return events
+
+    def _step(self):
+        """返回 (事件列表, 是否已断句)"""
+        speech = speech_timestamps(self.buffer, self.vad)
+        if not speech:
+            self._drop(max(len(self.buffer) - int(SILENCE_KEEP_SECONDS * SAMPLING_RATE), 0))
+            self.checked = len(self.buffer)
+            return [], False
+        if len(self.buffer) - speech[-1]['end'] >= self.endpoint:
+            # 一句话结束，在静音中间断句
+            return self._finalize(speech[-1]['end'] + self.endpoint // 2), True
+        if len(self.buffer) >= self.max_window:
+            # 持续说话超过窗口上限，在最后一个停顿处断句，没有停顿时整个窗口断句
+            cut = (speech[-2]['end'] + speech[-1]['start']) // 2 if len(speech) > 1 else len(self.buffer)
+            return self._finalize(cut), True
+        if self.partial_interval and len(self.buffer) - self.partial_at >= self.partial_interval:
+            self.partial_at = len(self.buffer)
+            segments = self._decode(self.buffer)
+            text = ''.join(segment.text for segment in segments).strip()
+            if text:
+                return [LiveEvent('partial', self.offset / SAMPLING_RATE, self.position, text)], False
+        return [], False
+
+    def flush(self):
+        """流结束时把窗口内剩余的语音作为最终分段输出"""
+        if len(self.buffer) == 0 or not speech_timestamps(self.buffer, self.vad):
+            self._drop(len(self.buffer))
+            return []
+        return self._finalize(len(self.buffer))
+
+    def run(self, source, cancel=None):
+        """逐个产出 LiveEvent，source 结束或 cancel 被设置后输出剩余的最终分段"""
+        try:
+            for chunk in source:
+                if cancel is not None and cancel.is_set():
+                    break
+                yield from self.feed(chunk)
+            yield from self.flush()
+        finally:
+            source.close()
+
+    def _decode(self, audio):
+        def transcribe():
+            segments, _ = self.model.transcribe(audio, language=self.language, beam_size=self.beam_size,
+                                                vad_filter=False, condition_on_previous_text=False,
+                                                initial_prompt=self.context or None)
+            return [segment_from_whisper(segment) for segment in segments]
+
+        segments = self.run_inference(transcribe)
+        if self.convert:
+            segments = [segment._replace(text=self.convert(segment.text)) for segment in segments]
+        return segments
+
+    def _finalize(self, cut):
+        cut = min(cut, len(self.buffer))
+        offset = self.offset / SAMPLING_RATE
+        events = []
+        for segment in self._decode(self.buffer[:cut]):
+            text = segment.text.strip()
+            if not text:
+                continue
+            events.append(LiveEvent('final', round(offset + segment.start, 3),
+                                    round(offset + min(segment.end, cut / SAMPLING_RATE), 3), text))
+            self.context = (self.context + text)[-CONTEXT_CHARS:]
+        self._drop(cut)
+        return events
+
+    def _drop(self, samples):
+        self.buffer = self.buffer[samples:]
+        self.offset += samples
+        self.checked = 0
+        self.partial_at = 0
+
+def event_to_segment(event):
+    return Segment(event.start, event.end, event.text, 0.0, 0.0)
+
+def event_to_dict(event):
+    return {'type': event.kind, 'start': event.start, 'end': event.end, 'text': event.text}
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+MANIFEST_NAME = '.whisper_manifest.jsonl'
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """计算文件内容的 SHA-1"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# (路径, 大小, 修改时间) -> 内容哈希
+_digest_memo = {}
+
+def cached_file_digest(path):
+    """同一进程内文件未变化时复用已计算的哈希"""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+    digest = _digest_memo.get(memo_key)
+    if digest is None:
+        digest = file_digest(path)
+        _digest_memo[memo_key] = digest
+    return digest
+
+def settings_fingerprint(settings):
+    """对影响转写结果的设置生成指纹，设置变化后已完成的文件需要重新转写"""
+    data = json.dumps(settings, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()[:16]
+
+def output_path_for(audio_file, output_dir, ext='.txt'):
+    base_name = os.path.splitext(os.path.basename(audio_file))[0]
+    return os.path.join(output_dir, f"{base_name}{ext}")
+
+class JobManifest:
+    """批量转写清单，以 JSONL 追加记录每个文件的状态，同一文件以最后一条记录为准
+
+    重新运行时跳过内容、设置均未变化且输出文件仍存在的已完成文件。
+    """
+
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.lock = threading.Lock()
+        self.records = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 跳过中断写入造成的残缺行
+                self.records[record['file']] = record
+        # 压缩清单，只保留每个文件的最新记录
+        self._rewrite()
+
+    def _rewrite(self):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for record in self.records.values():
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        os.replace(temp_path, self.path)
+
+    def _append(self, record):
+        self.records[record['file']] = record
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+
+    def content_hash(self, audio_file):
+        """文件大小与修改时间未变时复用已记录的哈希，避免重复读取整个文件"""
+        key = os.path.abspath(audio_file)
+        stat = os.stat(audio_file)
+        record = self.records.get(key)
+        if record and record.get('size') == stat.st_size and record.get('mtime') == stat.st_mtime:
+            return record['hash'], stat
+        return file_digest(audio_file), stat
+
+    def is_done(self, audio_file, fingerprint):
+        key = os.path.abspath(audio_file)
+        with self.lock:
+            record = self.records.get(key)
+        if not record or record.get('status') != self.DONE or record.get('fingerprint') != fingerprint:
+            return False
+        if not record.get('output') or not os.path.exists(record['output']):
+            return False
+        try:
+            content_hash, _ = self.content_hash(audio_file)
+        except OSError:
+            return False
+        return content_hash == record.get('hash')
+
+    def mark(self, audio_file, status, fingerprint, output=None, error=None):
+        key = os.path.abspath(audio_file)
+        try:
+            content_hash, stat = self.content_hash(audio_file)
+            size, mtime = stat.st_size, stat.st_mtime
+        except OSError:
+            content_hash, size, mtime = None, None, None
+        record = {
+            'file': key,
+            'status': status,
+            'hash': content_hash,
+            'size': size,
+            'mtime': mtime,
+            'fingerprint': fingerprint,
+            'output': output,
+            'error': error,
+            'updated_at': time.time()
+        }
+        with self.lock:
+            self._append(record)
+
+    def pending_files(self, audio_files, fingerprint):
+        """返回仍需转写的文件(未开始、失败、被中断或内容/设置已变化)"""
+        return [audio_file for audio_file in audio_files if not self.is_done(audio_file, fingerprint)]
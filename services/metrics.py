@@ -0,0 +1,281 @@
+"""进程内性能指标
+
+记录模型加载、音频解码、逐段解码、排队等待等各阶段耗时以及缓存命中与内存占用，
+API 的 /metrics 以 Prometheus 文本格式输出，GUI 的性能统计面板读取 snapshot()。
+只统计当前进程，多进程并行转写时子进程内的解码耗时不计入。
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# 适用于秒级到分钟级耗时的直方图分桶
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    escape = lambda value: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    pairs = ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 的标签应为 {self.labelnames}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def sample_labelnames(self, sample_name):
+        return self.labelnames
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, key, value) for key, value in self.values.items()]
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """执行期间数值加一"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                # [各分桶计数, 总和, 总数]
+                state = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def summary(self, **labels):
+        """返回 (次数, 总和)"""
+        with self.lock:
+            state = self.values.get(self._key(labels))
+            return (state[2], state[1]) if state else (0, 0.0)
+
+    def samples(self):
+        lines = []
+        with self.lock:
+            for key, (counts, total, count) in self.values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append((f"{self.name}_bucket", key + (_format_value(bound),), cumulative))
+                lines.append((f"{self.name}_sum", key, total))
+                lines.append((f"{self.name}_count", key, count))
+        return lines
+
+    def sample_labelnames(self, sample_name):
+        return self.labelnames + ('le',) if sample_name.endswith('_bucket') else self.labelnames
+
+class MetricsRegistry:
+    """指标注册表；collector 为在输出时才读取数值的回调，返回 [(指标, 标签字典, 数值)]"""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, name, collector):
+        """按名称注册，同名的 collector 会被替换(如 API 服务重启)"""
+        with self.lock:
+            self.collectors[name] = collector
+
+    def remove_collector(self, name):
+        with self.lock:
+            self.collectors.pop(name, None)
+
+    def _collected(self):
+        with self.lock:
+            collectors = list(self.collectors.values())
+        samples = []
+        for collector in collectors:
+            try:
+                samples.extend(collector())
+            except Exception:
+                continue  # 单个数据源出错不影响其余指标
+        return samples
+
+    def render(self):
+        """Prometheus 文本格式(version 0.0.4)"""
+        lines = []
+        with self.lock:
+            metrics = list(self.metrics)
+        for metric in metrics:
+            lines.extend(metric.header())
+            for sample_name, key, value in metric.samples():
+                labelnames = metric.sample_labelnames(sample_name)
+                lines.append(f"{sample_name}{_format_labels(labelnames, key)} {_format_value(value)}")
+        described = set()
+        for metric, labels, value in self._collected():
+            if metric.name not in described:
+                lines.extend(metric.header())
+                described.add(metric.name)
+            lines.append(f"{metric.name}{_format_labels(tuple(labels), tuple(labels.values()))} "
+                         f"{_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """供界面显示的汇总：直方图给出次数、总和与平均值，其余指标直接给出数值"""
+        result = {}
+        with self.lock:
+            metrics = list(self.metrics)
+        for metric in metrics:
+            if isinstance(metric, Histogram):
+                with metric.lock:
+                    for key, (_, total, count) in metric.values.items():
+                        result[(metric.name, key)] = {'count': count, 'sum': round(total, 3),
+                                                      'avg': round(total / count, 4) if count else 0.0}
+            else:
+                with metric.lock:
+                    for key, value in metric.values.items():
+                        result[(metric.name, key)] = value
+        for metric, labels, value in self._collected():
+            result[(metric.name, tuple(labels.values()))] = value
+        return result
+
+def process_rss_bytes():
+    """当前进程的常驻内存(字节)，无法获取时返回 None"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    if sys.platform == 'darwin':
+        # 无 psutil 时退而使用内存峰值
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return None
+
+# 进程级指标注册表
+metrics = MetricsRegistry()
+
+model_load_seconds = metrics.histogram(
+    'whisper_model_load_seconds', '模型加载耗时', ['backend'])
+audio_decode_seconds = metrics.histogram(
+    'whisper_audio_decode_seconds', '音频解码为16kHz PCM的耗时')
+segment_decode_seconds = metrics.histogram(
+    'whisper_segment_decode_seconds', '产出每个分段的编码与解码耗时(不含调用方处理时间)',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60))
+queue_wait_seconds = metrics.histogram(
+    'whisper_queue_wait_seconds', 'API推理任务在队列中的等待时间')
+transcription_seconds = metrics.histogram(
+    'whisper_transcription_seconds', '完整转写一个音频的解码耗时')
+realtime_factor = metrics.histogram(
+    'whisper_realtime_factor', '解码耗时与音频时长之比',
+    buckets=(0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5))
+audio_seconds_total = metrics.counter(
+    'whisper_audio_seconds_total', '已完整转写的音频总时长(秒)')
+active_transcriptions = metrics.gauge(
+    'whisper_active_transcriptions', '正在解码的转写数量')
+transcriptions_total = metrics.counter(
+    'whisper_transcriptions_total', '转写次数', ['status'])
+
+_cache_hits = Counter('whisper_cache_hits_total', '缓存命中次数', ['cache'])
+_cache_misses = Counter('whisper_cache_misses_total', '缓存未命中次数', ['cache'])
+_resident_memory = Gauge('process_resident_memory_bytes', '进程常驻内存(字节)')
+_models_loaded = Gauge('whisper_models_loaded', '模型池中已加载的模型数')
+_models_memory = Gauge('whisper_models_memory_mb', '模型池中模型的估算内存(MB)')
+
+def _process_collector():
+    from services.audio import audio_cache
+    from services.model_pool import model_pool
+    from services.transcript_cache import transcript_cache
+    samples = []
+    # 直接读取计数，不调用 stats()，避免每次采集都扫描缓存目录
+    for name, cache in (('transcript', transcript_cache), ('audio', audio_cache)):
+        samples.append((_cache_hits, {'cache': name}, cache.hits))
+    for name, cache in (('transcript', transcript_cache), ('audio', audio_cache)):
+        samples.append((_cache_misses, {'cache': name}, cache.misses))
+    rss = process_rss_bytes()
+    if rss is not None:
+        samples.append((_resident_memory, {}, rss))
+    pool = model_pool.stats()
+    samples.append((_models_loaded, {}, len(pool['models'])))
+    samples.append((_models_memory, {}, pool['total_mb']))
+    return samples
+
+metrics.add_collector('process', _process_collector)
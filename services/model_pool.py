@@ -0,0 +1,272 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from services.metrics import model_load_seconds
+
+# 各模型 float16 权重文件的大致大小(MB)，用于在无法读取本地文件时估算内存占用
+MODEL_SIZE_MB = {
+    'tiny': 75,
+    'base': 145,
+    'small': 484,
+    'medium': 1530,
+    'large': 3090,
+    'large-v1': 3090,
+    'large-v2': 3090,
+    'large-v3': 3090,
+}
+
+# 不同计算精度相对 float16 权重文件的内存倍率
+COMPUTE_TYPE_FACTOR = {
+    'int8': 0.5,
+    'int8_float32': 0.5,
+    'int8_float16': 0.5,
+    'float16': 1.0,
+    'float32': 2.0,
+}
+
+
+def resolve_model(model_size, model_path=None):
+    """根据模型路径的不同情况解析实际加载的模型，返回 (模型标识, 说明文字)"""
+    if model_path and os.path.exists(model_path):
+        # 情况1: 是否为Hugging Face缓存格式
+        hf_path = os.path.join(model_path, f"models--guillaumekln--faster-whisper-{model_size}")
+        if os.path.isdir(hf_path):
+            # 使用环境变量方式
+            os.environ["HF_HOME"] = model_path
+            return model_size, f"使用Hugging Face缓存模型: {model_size}"
+
+        # 情况2: 是否为直接的模型目录
+        direct_path = os.path.join(model_path, model_size)
+        if os.path.isdir(direct_path):
+            return direct_path, f"使用本地模型: {direct_path}"
+
+        # 情况3: 是否为模型自身
+        if model_size in model_path.lower() and (model_path.endswith('.bin') or os.path.isdir(model_path)):
+            model_dir = os.path.dirname(model_path) if model_path.endswith('.bin') else model_path
+            return model_dir, f"使用本地模型: {model_path}"
+
+        # 默认使用指定的模型大小
+        return model_size, f"使用默认模型: {model_size}"
+
+    # 无指定路径，使用默认下载
+    return model_size, None
+
+
+def estimate_model_mb(model_id, compute_type):
+    """估算模型加载后的常驻内存(MB)，无法估算时返回0"""
+    size_mb = 0
+    model_bin = os.path.join(model_id, 'model.bin')
+    if os.path.isfile(model_bin):
+        size_mb = os.path.getsize(model_bin) / (1024 * 1024)
+    else:
+        size_mb = MODEL_SIZE_MB.get(os.path.basename(model_id.rstrip('/\\')), 0)
+    return size_mb * COMPUTE_TYPE_FACTOR.get(compute_type, 1.0)
+
+
+def model_identity(model_id, compute_type, backend='whisper'):
+    """模型在转写缓存键中的标识(模型与计算精度)"""
+    identity = f"{model_id}:{compute_type}"
+    # 其他后端的结果不能与真实模型共用缓存
+    return identity if backend == 'whisper' else f"{backend}:{identity}"
+
+
+def _load_whisper_model(model_id, device, compute_type, cpu_threads, num_workers):
+    from faster_whisper import WhisperModel
+    return WhisperModel(model_id, device=device, compute_type=compute_type,
+                        cpu_threads=cpu_threads, num_workers=num_workers)
+
+
+class _PoolEntry:
+    def __init__(self, key, model, size_mb, cpu_threads=0, num_workers=1):
+        self.key = key
+        self.model = model
+        self.size_mb = size_mb
+        # 加载时使用的线程数与并发数，不属于键
+        self.cpu_threads = cpu_threads
+        self.num_workers = num_workers
+        self.refcount = 0
+        self.last_used = time.monotonic()
+
+
+class ModelPool:
+    """进程内共享的 WhisperModel 池
+
+    以 (模型, 设备, 计算精度, 后端) 为键，同一模型只加载一次，GUI 与 API 共用同一实例，
+    并记录正在使用的数量；空闲模型按 LRU 顺序在超出内存预算或空闲超时后被释放。
+
+    线程数与并发数只在加载时生效：常驻模型的并发数小于本次请求且无人使用时按更大的并发数重新加载，
+    正在使用时直接复用，多出的并发解码在 CTranslate2 内部排队。
+    """
+
+    def __init__(self, memory_budget_mb=0, idle_ttl=600, loader=None):
+        self.memory_budget_mb = memory_budget_mb  # 0 表示不限制
+        self.idle_ttl = idle_ttl                  # 0 表示不按时间释放
+        self.loader = loader or _load_whisper_model
+        self.backends = {}             # 后端名称 -> 加载函数，'whisper' 使用 self.loader
+        self._cond = threading.Condition()
+        self._entries = OrderedDict()  # key -> _PoolEntry，按最近使用排序
+        self._loading = set()
+        self._leases = {}              # id(model) -> key
+        self._janitor = None
+
+    def configure(self, memory_budget_mb=None, idle_ttl=None):
+        with self._cond:
+            if memory_budget_mb is not None:
+                self.memory_budget_mb = memory_budget_mb
+            if idle_ttl is not None:
+                self.idle_ttl = idle_ttl
+            self._evict_locked()
+
+    def register_backend(self, name, loader):
+        """注册其他模型后端，loader 的参数与 WhisperModel 的加载参数相同"""
+        self.backends[name] = loader
+
+    def _loader_for(self, backend):
+        if backend == 'whisper':
+            return self.loader
+        if backend not in self.backends:
+            raise ValueError(f"未知的模型后端: {backend}")
+        return self.backends[backend]
+
+    def acquire(self, model_size, device='cpu', compute_type='int8', model_path=None,
+                cpu_threads=0, num_workers=1, backend='whisper'):
+        """获取共享模型实例，用完后必须调用 release"""
+        loader = self._loader_for(backend)
+        model_id, _ = resolve_model(model_size, model_path)
+        key = (model_id, device, compute_type, backend)
+        size_mb = estimate_model_mb(model_id, compute_type) if backend == 'whisper' else 0
+
+        with self._cond:
+            # 同一模型正在被其他线程加载时等待，避免重复加载
+            while key in self._loading:
+                self._cond.wait()
+            entry = self._entries.get(key)
+            if entry is not None and entry.refcount == 0 and entry.num_workers < num_workers:
+                self._remove_locked(key)
+                entry = None
+            if entry is None:
+                self._loading.add(key)
+                # 加载前先为新模型腾出内存预算
+                self._evict_locked(reserve_mb=size_mb)
+
+        if entry is None:
+            try:
+                with model_load_seconds.time(backend=backend):
+                    model = loader(model_id, device, compute_type, cpu_threads, num_workers)
+            except Exception:
+                with self._cond:
+                    self._loading.discard(key)
+                    self._cond.notify_all()
+                raise
+            with self._cond:
+                entry = _PoolEntry(key, model, size_mb, cpu_threads, num_workers)
+                self._entries[key] = entry
+                self._loading.discard(key)
+                self._cond.notify_all()
+
+        with self._cond:
+            entry.refcount += 1
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(key)
+            self._leases[id(entry.model)] = key
+            self._evict_locked()
+            self._start_janitor_locked()
+            return entry.model
+
+    def release(self, model, evict=False):
+        """归还模型；evict 为 True 时若已无人使用则立即释放"""
+        if model is None:
+            return
+        with self._cond:
+            key = self._leases.get(id(model))
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refcount = max(entry.refcount - 1, 0)
+            entry.last_used = time.monotonic()
+            if entry.refcount == 0:
+                self._leases.pop(id(model), None)
+                if evict:
+                    self._remove_locked(key)
+            self._evict_locked()
+
+    def identity(self, model):
+        """返回模型的标识(模型与计算精度)，用于缓存键；非池内模型返回 None"""
+        with self._cond:
+            key = self._leases.get(id(model))
+        if key is None:
+            return None
+        return model_identity(key[0], key[2], key[3])
+
+    def evict_idle(self):
+        with self._cond:
+            self._evict_locked()
+
+    def clear(self):
+        """释放所有空闲模型"""
+        with self._cond:
+            for key in [k for k, e in self._entries.items() if e.refcount == 0]:
+                self._remove_locked(key)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'models': [
+                    {
+                        'model': e.key[0],
+                        'device': e.key[1],
+                        'compute_type': e.key[2],
+                        'cpu_threads': e.cpu_threads,
+                        'num_workers': e.num_workers,
+                        'backend': e.key[3],
+                        'in_use': e.refcount,
+                        'size_mb': round(e.size_mb, 1),
+                    }
+                    for e in self._entries.values()
+                ],
+                'total_mb': round(self._total_mb(), 1),
+                'memory_budget_mb': self.memory_budget_mb,
+            }
+
+    def _total_mb(self):
+        return sum(e.size_mb for e in self._entries.values())
+
+    def _remove_locked(self, key):
+        entry = self._entries.pop(key)
+        self._leases.pop(id(entry.model), None)
+        entry.model = None
+
+    def _evict_locked(self, reserve_mb=0):
+        now = time.monotonic()
+        # 空闲超时
+        if self.idle_ttl:
+            for key, entry in list(self._entries.items()):
+                if entry.refcount == 0 and now - entry.last_used > self.idle_ttl:
+                    self._remove_locked(key)
+        # 内存预算，按最久未使用的顺序释放空闲模型
+        if self.memory_budget_mb:
+            for key, entry in list(self._entries.items()):
+                if self._total_mb() + reserve_mb <= self.memory_budget_mb:
+                    break
+                if entry.refcount == 0:
+                    self._remove_locked(key)
+
+    def _start_janitor_locked(self):
+        if self.idle_ttl and (self._janitor is None or not self._janitor.is_alive()):
+            self._janitor = threading.Thread(target=self._janitor_loop, daemon=True)
+            self._janitor.start()
+
+    def _janitor_loop(self):
+        while True:
+            with self._cond:
+                if not self._entries or not self.idle_ttl:
+                    self._janitor = None
+                    return
+                interval = min(max(self.idle_ttl / 4, 1), 60)
+            time.sleep(interval)
+            self.evict_idle()
+
+
+# 进程级共享模型池，GUI 与 API 服务共用
+model_pool = ModelPool()
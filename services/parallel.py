@@ -0,0 +1,145 @@
+import multiprocessing
+import os
+import queue
+
+def probe_duration(audio_file):
+    """读取容器中的时长(秒)，只解析文件头，不解码音频；失败时返回0"""
+    try:
+        import av
+        with av.open(audio_file) as container:
+            if container.duration:
+                return container.duration / av.time_base
+            stream = container.streams.audio[0]
+            if stream.duration and stream.time_base:
+                return float(stream.duration * stream.time_base)
+    except Exception:
+        pass
+    return 0.0
+
+def order_longest_first(audio_files):
+    """按时长从长到短排序，配合多进程动态取任务可缩短整体完成时间"""
+    durations = {audio_file: probe_duration(audio_file) for audio_file in audio_files}
+    ordered = sorted(audio_files, key=lambda audio_file: durations[audio_file], reverse=True)
+    return ordered, durations
+
+def _worker_main(task_queue, result_queue, stop_event, model_args, language, batch_size, vad, cache_config,
+                 audio_cache_config, word_timestamps=False, chunk_workers=1):
+    # 子进程内只加载一次模型，之后不断从共享队列领取文件
+    from services.audio import audio_cache
+    from services.decoding import skipped_duration
+    from services.engine import DecodeOptions, TranscriptionEngine, estimate_progress
+    from services.transcript_cache import transcript_cache
+
+    transcript_cache.configure(**cache_config)
+    audio_cache.configure(**audio_cache_config)
+    options = DecodeOptions(language, batch_size, vad, chunk_workers, word_timestamps=word_timestamps)
+    engine = TranscriptionEngine.for_options(options=options, **model_args)
+    try:
+        engine.load()
+        while not stop_event.is_set():
+            audio_file = task_queue.get()
+            if audio_file is None:
+                break
+            result_queue.put(('start', audio_file))
+            infos = []
+            try:
+                for segment in engine.transcribe(audio_file, options, cancel=stop_event, on_info=infos.append):
+                    # 以普通元组跨进程传递分段
+                    progress = estimate_progress(segment, infos[0].duration)
+                    result_queue.put(('segment', audio_file, tuple(segment), progress))
+                if not stop_event.is_set():
+                    result_queue.put(('done', audio_file, skipped_duration(infos[0])))
+            except Exception as e:
+                result_queue.put(('error', audio_file, str(e)))
+    except Exception as e:
+        result_queue.put(('fatal', None, str(e)))
+    finally:
+        engine.release()
+        result_queue.put(('exit', None))
+
+class ParallelTranscriber:
+    """多进程并行转写一组文件
+
+    每个进程持有一份模型，CPU线程(cpu_threads 为总数，0 为全部核心)按进程数均分；文件按时长从长到短进入共享队列，
+    进程空闲时领取下一个文件，结果通过 events() 逐条返回。
+    """
+
+    def __init__(self, audio_files, model_size, device, compute_type, model_path=None, language='zh',
+                 batch_size=0, processes=2, vad=None, word_timestamps=False, cpu_threads=0, chunk_workers=1):
+        self.audio_files = list(audio_files)
+        self.language = language
+        self.batch_size = batch_size
+        self.vad = vad
+        self.word_timestamps = word_timestamps
+        self.chunk_workers = max(chunk_workers, 1)
+        self.processes = max(1, min(processes, len(self.audio_files)))
+        total_threads = cpu_threads or os.cpu_count() or 1
+        self.model_args = {
+            'model_size': model_size,
+            'device': device,
+            'compute_type': compute_type,
+            'model_path': model_path,
+            'cpu_threads': max(1, total_threads // self.processes)
+        }
+        # 子进程沿用主进程的转写缓存与音频缓存设置
+        from services.audio import audio_cache
+        from services.transcript_cache import transcript_cache
+        self.cache_config = {
+            'cache_dir': transcript_cache.cache_dir,
+            'max_mb': transcript_cache.max_bytes / (1024 * 1024)
+        }
+        self.audio_cache_config = {
+            'cache_dir': audio_cache.cache_dir,
+            'max_mb': audio_cache.max_bytes / (1024 * 1024)
+        }
+        # Windows 下只能使用 spawn，统一使用以保证行为一致
+        self.ctx = multiprocessing.get_context('spawn')
+        self.stop_event = self.ctx.Event()
+        self.workers = []
+        self.durations = {}
+
+    def start(self):
+        ordered, self.durations = order_longest_first(self.audio_files)
+        self.task_queue = self.ctx.Queue()
+        self.result_queue = self.ctx.Queue()
+        for audio_file in ordered:
+            self.task_queue.put(audio_file)
+        # 每个进程一个结束标记
+        for _ in range(self.processes):
+            self.task_queue.put(None)
+        for _ in range(self.processes):
+            worker = self.ctx.Process(
+                target=_worker_main,
+                args=(self.task_queue, self.result_queue, self.stop_event, self.model_args,
+                      self.language, self.batch_size, self.vad, self.cache_config,
+                      self.audio_cache_config, self.word_timestamps, self.chunk_workers),
+                daemon=True
+            )
+            worker.start()
+            self.workers.append(worker)
+
+    def events(self):
+        """逐条返回子进程产生的事件，所有子进程退出后结束"""
+        alive = len(self.workers)
+        while alive:
+            try:
+                event = self.result_queue.get(timeout=0.5)
+            except queue.Empty:
+                # 子进程异常退出时不会发送 exit 事件
+                if not any(worker.is_alive() for worker in self.workers):
+                    break
+                continue
+            if event[0] == 'exit':
+                alive -= 1
+                continue
+            yield event
+
+    def stop(self):
+        self.stop_event.set()
+
+    def join(self, timeout=5):
+        for worker in self.workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+        self.workers = []
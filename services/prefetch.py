@@ -0,0 +1,71 @@
+import queue
+import threading
+from services.audio import SAMPLING_RATE, load_audio
+
+class AudioPrefetcher:
+    """后台线程按顺序预先解码后续文件，与模型推理重叠进行
+
+    队列长度限制了已解码但尚未转写的文件数，内存占用不会随文件数增长。
+    迭代时依次返回 (文件路径, 音频数组, 时长秒数, 错误信息)，解码失败时数组为 None。
+    skip(文件路径) 为真的文件(如转写缓存中已有结果)不解码，数组同样为 None 且没有错误信息。
+    """
+
+    def __init__(self, audio_files, depth=2, skip=None):
+        self.audio_files = list(audio_files)
+        self.skip = skip
+        self.queue = queue.Queue(maxsize=max(depth, 1))
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='audio-prefetch', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _put(self, item):
+        # 消费方停止后不再阻塞在满队列上
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _skipped(self, audio_file):
+        # 判断失败(如文件无法读取)时照常解码，由解码报告错误
+        try:
+            return self.skip is not None and self.skip(audio_file)
+        except Exception:
+            return False
+
+    def _run(self):
+        for audio_file in self.audio_files:
+            if self.stop_event.is_set():
+                return
+            if self._skipped(audio_file):
+                item = (audio_file, None, 0.0, None)
+            else:
+                try:
+                    audio = load_audio(audio_file)
+                    item = (audio_file, audio, len(audio) / SAMPLING_RATE, None)
+                except Exception as e:
+                    item = (audio_file, None, 0.0, str(e))
+            if not self._put(item):
+                return
+        self._put(None)
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            yield item
+
+    def stop(self):
+        self.stop_event.set()
+        # 取出队列中的数据，释放已解码的音频
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
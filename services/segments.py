@@ -0,0 +1,92 @@
+from array import array
+from collections import namedtuple
+
+# 与 faster_whisper 的 Segment / Word / TranscriptionInfo 字段同名，缓存命中时可直接替代
+# words 只在启用逐词时间戳时为 Word 元组，否则为 None
+Segment = namedtuple('Segment', ['start', 'end', 'text', 'avg_logprob', 'no_speech_prob', 'words'],
+                     defaults=(None,))
+Word = namedtuple('Word', ['start', 'end', 'word', 'probability'])
+TranscriptInfo = namedtuple('TranscriptInfo', ['duration', 'language', 'language_probability', 'duration_after_vad'])
+
+def segment_from_whisper(segment):
+    words = getattr(segment, 'words', None)
+    if words:
+        words = tuple(Word(word.start, word.end, word.word, word.probability) for word in words)
+    return Segment(segment.start, segment.end, segment.text,
+                   getattr(segment, 'avg_logprob', 0.0), getattr(segment, 'no_speech_prob', 0.0), words or None)
+
+def shift_segment(segment, offset):
+    """分段及其逐词时间整体平移 offset 秒"""
+    words = segment.words
+    if words:
+        words = tuple(word._replace(start=word.start + offset, end=word.end + offset) for word in words)
+    return segment._replace(start=segment.start + offset, end=segment.end + offset, words=words)
+
+def segment_from_data(data):
+    """由普通元组或字典恢复分段，如跨进程传递的元组与缓存中的 JSON 对象"""
+    segment = Segment(**data) if isinstance(data, dict) else Segment(*data)
+    if segment.words:
+        segment = segment._replace(words=tuple(Word(*word) for word in segment.words))
+    return segment
+
+def info_from_whisper(info):
+    return TranscriptInfo(info.duration, info.language, getattr(info, 'language_probability', 1.0),
+                          getattr(info, 'duration_after_vad', info.duration))
+
+def segment_to_dict(segment):
+    return segment._asdict() if isinstance(segment, Segment) else segment_from_whisper(segment)._asdict()
+
+class SegmentStore:
+    """单个文件的分段结果，时间与置信度存放在紧凑的数组中
+
+    逐词结果按分段顺序连续存放，第 i 段的词为下标 word_offsets[i] 到 word_offsets[i + 1]，
+    导出时可直接按下标读取数组，不必为每个词创建对象。
+    """
+
+    def __init__(self):
+        self.starts = array('d')
+        self.ends = array('d')
+        self.avg_logprobs = array('f')
+        self.no_speech_probs = array('f')
+        self.texts = []
+        self.word_offsets = array('L', [0])
+        self.word_starts = array('d')
+        self.word_ends = array('d')
+        self.word_probabilities = array('f')
+        self.words = []
+
+    def append(self, segment):
+        self.starts.append(segment.start)
+        self.ends.append(segment.end)
+        self.avg_logprobs.append(segment.avg_logprob)
+        self.no_speech_probs.append(segment.no_speech_prob)
+        self.texts.append(segment.text)
+        for word in segment.words or ():
+            self.word_starts.append(word.start)
+            self.word_ends.append(word.end)
+            self.word_probabilities.append(word.probability)
+            self.words.append(word.word)
+        self.word_offsets.append(len(self.words))
+
+    @property
+    def has_words(self):
+        return bool(self.words)
+
+    def word_range(self, index):
+        """第 index 段的词在逐词数组中的下标范围"""
+        return range(self.word_offsets[index], self.word_offsets[index + 1])
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.texts)
+        words = tuple(Word(self.word_starts[i], self.word_ends[i], self.words[i], self.word_probabilities[i])
+                      for i in self.word_range(index))
+        return Segment(self.starts[index], self.ends[index], self.texts[index],
+                       self.avg_logprobs[index], self.no_speech_probs[index], words or None)
+
+    def __iter__(self):
+        for index in range(len(self.texts)):
+            yield self[index]
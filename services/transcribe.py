@@ -1,199 +1,396 @@
-from PyQt5.QtCore import QThread, pyqtSignal
-from faster_whisper import WhisperModel
-from opencc import OpenCC
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
 import os
+import threading
+from services.decoding import skipped_duration, vad_report
+from services.engine import CancelToken, DecodeOptions, TranscriptionEngine, resume_fingerprint
+from services.live import FileSource, LiveTranscriber, MicrophoneSource, event_to_segment
+from services.manifest import JobManifest, output_path_for
+from services.parallel import ParallelTranscriber
+from services.prefetch import AudioPrefetcher
+from services.segments import Segment
+
+class SignalBuffer(QObject):
+    """缓冲工作线程发出的信号，由界面线程的定时器按固定帧率批量发出
+
+    连续的分段合并为一次 segments_signal，进度信号只保留最新值，其余信号保持原有顺序。
+    """
+
+    COALESCED = ('progress_signal', 'file_progress_signal', 'partial_signal')
+
+    def __init__(self, worker, interval_ms=50):
+        super().__init__(worker)
+        self.worker = worker
+        self.lock = threading.Lock()
+        self.pending = []
+        self.latest = {}
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.flush)
+        worker.started.connect(self.timer.start)
+        worker.finished.connect(self.stop)
+
+    def emit(self, name, *args):
+        """可在任意线程调用"""
+        with self.lock:
+            if name in self.COALESCED:
+                self.latest[name] = args
+            else:
+                self.pending.append((name, args))
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, []
+            latest, self.latest = self.latest, {}
+        segments = []
+        for name, args in pending:
+            if name == 'segment':
+                segments.append(args)
+                continue
+            if segments:
+                self.worker.segments_signal.emit(segments)
+                segments = []
+            getattr(self.worker, name).emit(*args)
+        if segments:
+            self.worker.segments_signal.emit(segments)
+        for name, args in latest.items():
+            getattr(self.worker, name).emit(*args)
+
+    def stop(self):
+        self.timer.stop()
+        self.flush()
 
 class TranscribeWorker(QThread):
     transcribe_signal = pyqtSignal(str)
+    segments_signal = pyqtSignal(list)  # 批量的结构化分段 [(文件路径, Segment)]
     progress_signal = pyqtSignal(int)
     complete_signal = pyqtSignal(bool)
 
-    def __init__(self, model_size, audio_file, device, compute_type, parent=None, model_path=None, language='zh'):
+    def __init__(self, model_size, audio_file, device, compute_type, parent=None, model_path=None, language='zh',
+                 batch_size=0, vad=None, chunk_workers=1, word_timestamps=False):
         super().__init__(parent)
-        self.model_size = model_size
+        self.buffer = SignalBuffer(self)
         self.audio_file = audio_file
-        self.device = device
-        self.compute_type = compute_type
-        self.model_path = model_path
-        self.language = language
-        self.running = True
-        self.stop_requested = False
-        self.model = None
-        self.cc = OpenCC('t2s') if language == 'zh' else None
+        # 长音频分块并行解码的线程数，1为按顺序解码整个文件
+        self.options = DecodeOptions(language, batch_size, vad, chunk_workers, word_timestamps=word_timestamps)
+        self.engine = TranscriptionEngine.for_options(model_size, device, compute_type, self.options,
+                                                      model_path=model_path)
+        self.cancel = CancelToken()
 
     def run(self):
         try:
-            self.progress_signal.emit(0)
-            self.transcribe_signal.emit("初次使用将下载模型，请耐心等待！\n")
-            
-            # 根据模型路径的不同情况选择合适的初始化方式
-            if self.model_path:
-                # 检查是否是具体的模型目录而不是缓存根目录
-                model_path = self.model_path
-                
-                # 尝试检测具体的模型目录
-                # 情况1: 是否为Hugging Face缓存格式
-                hf_path = os.path.join(self.model_path, f"models--guillaumekln--faster-whisper-{self.model_size}")
-                if os.path.isdir(hf_path):
-                    self.transcribe_signal.emit(f"使用Hugging Face缓存模型: {self.model_size}\n")
-                    # 使用环境变量方式
-                    self.model = WhisperModel(self.model_size, device=self.device, compute_type=self.compute_type)
-                else:
-                    # 情况2: 是否为直接的模型目录
-                    direct_path = os.path.join(self.model_path, self.model_size)
-                    if os.path.isdir(direct_path):
-                        self.transcribe_signal.emit(f"使用本地模型: {direct_path}\n")
-                        self.model = WhisperModel(direct_path, device=self.device, compute_type=self.compute_type)
-                    # 情况3: 是否为模型自身
-                    elif self.model_size in self.model_path.lower() and (
-                            self.model_path.endswith('.bin') or os.path.isdir(self.model_path)):
-                        self.transcribe_signal.emit(f"使用本地模型: {self.model_path}\n")
-                        model_dir = self.model_path
-                        if self.model_path.endswith('.bin'):
-                            model_dir = os.path.dirname(self.model_path)
-                        self.model = WhisperModel(model_dir, device=self.device, compute_type=self.compute_type)
-                    else:
-                        # 默认使用指定的模型大小
-                        self.transcribe_signal.emit(f"使用默认模型: {self.model_size}\n")
-                        self.model = WhisperModel(self.model_size, device=self.device, compute_type=self.compute_type)
-            else:
-                # 无指定路径，使用默认下载
-                self.model = WhisperModel(self.model_size, device=self.device, compute_type=self.compute_type)
+            self.buffer.emit('progress_signal', 0)
+            self.buffer.emit('transcribe_signal', "初次使用将下载模型，请耐心等待！\n")
             
-            self.transcribe_signal.emit("模型加载完毕，正在提取...\n")
+            # 从共享模型池获取模型，相同配置的模型只加载一次
+            model_desc = self.engine.describe()
+            if model_desc:
+                self.buffer.emit('transcribe_signal', model_desc + "\n")
+            self.engine.load()
             
-            # 修改为实时流式处理
-            segments, info = self.model.transcribe(self.audio_file, beam_size=5, language=self.language)
+            self.buffer.emit('transcribe_signal', "模型加载完毕，正在提取...\n")
             
-            # 不再需要预先转换为列表，直接处理迭代器
-            segment_count = 0
-            for segment in segments:
-                if self.stop_requested:
-                    break
-                segment_count += 1
-                text = self.cc.convert(segment.text) if self.cc else segment.text
-                self.transcribe_signal.emit(f"[{segment.start:.2f}s -> {segment.end:.2f}s] {text}\n")
-                
-                # 估算进度 - 由于无法预先知道总数，基于时间估算进度
-                # 假设音频长度信息在 segment.end 可获取
-                estimated_progress = min(int((segment.end / info.duration if info.duration > 0 else 1.0) * 100), 99)
-                self.progress_signal.emit(estimated_progress)
-
-            if not self.stop_requested:
-                self.progress_signal.emit(100)
-                self.complete_signal.emit(True)
+            # 实时流式处理，每产出一段立即发送
+            for segment in self.engine.transcribe(self.audio_file, self.options, cancel=self.cancel,
+                                                  on_info=self._report_vad, on_progress=self._report_progress):
+                self.buffer.emit('segment', self.audio_file, segment)
+
+            if not self.cancel.is_set():
+                self.buffer.emit('progress_signal', 100)
+                self.buffer.emit('complete_signal', True)
                 
         except Exception as e:
-            self.transcribe_signal.emit(f"发生错误: {str(e)}\n")
-            self.complete_signal.emit(False)
+            self.buffer.emit('transcribe_signal', f"发生错误: {str(e)}\n")
+            self.buffer.emit('complete_signal', False)
+        finally:
+            self.engine.release()
+
+    def _report_vad(self, info):
+        report = vad_report(info)
+        if report:
+            self.buffer.emit('transcribe_signal', report + "\n")
+
+    def _report_progress(self, progress):
+        self.buffer.emit('progress_signal', progress)
 
     def stop(self):
         """优雅停止线程"""
-        self.stop_requested = True
-        self.running = False
+        self.cancel.cancel()
 
 class MultiTranscribeWorker(QThread):
     transcribe_signal = pyqtSignal(str)  # 转录文本信号
+    segments_signal = pyqtSignal(list)  # 批量的结构化分段信号 [(文件路径, Segment)]
     progress_signal = pyqtSignal(int)    # 总体进度信号
     file_progress_signal = pyqtSignal(int, str)  # 单文件进度信号 (进度, 文件名)
     complete_signal = pyqtSignal(bool)   # 完成信号
     file_complete_signal = pyqtSignal(str)  # 单文件完成信号
 
-    def __init__(self, model_size, audio_files, device, compute_type, parent=None, model_path=None, language='zh'):
+    def __init__(self, model_size, audio_files, device, compute_type, parent=None, model_path=None, language='zh',
+                 batch_size=0, output_dir=None, vad=None, chunk_workers=1, word_timestamps=False):
         super().__init__(parent)
-        self.model_size = model_size
+        self.buffer = SignalBuffer(self)
         self.audio_files = audio_files
-        self.device = device
-        self.compute_type = compute_type
-        self.model_path = model_path
-        self.language = language
-        self.running = True
-        self.stop_requested = False
-        self.cc = OpenCC('t2s') if language == 'zh' else None
-        self.model = None
+        self.output_dir = output_dir
+        self.options = DecodeOptions(language, batch_size, vad, chunk_workers, word_timestamps=word_timestamps)
+        self.engine = TranscriptionEngine.for_options(model_size, device, compute_type, self.options,
+                                                      model_path=model_path)
+        self.cancel = CancelToken()
+        self.manifest = None
+        self.prefetcher = None
+        self.fingerprint = resume_fingerprint(model_size, compute_type, self.options, model_path)
 
     def run(self):
         try:
-            self.progress_signal.emit(0)
+            self.buffer.emit('progress_signal', 0)
             
-            # 根据模型路径的不同情况选择合适的初始化方式
-            if self.model_path:
-                # 检查是否是具体的模型目录而不是缓存根目录
-                model_path = self.model_path
-                
-                # 尝试检测具体的模型目录
-                # 情况1: 是否为Hugging Face缓存格式
-                hf_path = os.path.join(self.model_path, f"models--guillaumekln--faster-whisper-{self.model_size}")
-                if os.path.isdir(hf_path):
-                    self.transcribe_signal.emit(f"使用Hugging Face缓存模型: {self.model_size}\n")
-                    # 使用环境变量方式
-                    self.model = WhisperModel(self.model_size, device=self.device, compute_type=self.compute_type)
-                else:
-                    # 情况2: 是否为直接的模型目录
-                    direct_path = os.path.join(self.model_path, self.model_size)
-                    if os.path.isdir(direct_path):
-                        self.transcribe_signal.emit(f"使用本地模型: {direct_path}\n")
-                        self.model = WhisperModel(direct_path, device=self.device, compute_type=self.compute_type)
-                    # 情况3: 是否为模型自身
-                    elif self.model_size in self.model_path.lower() and (
-                            self.model_path.endswith('.bin') or os.path.isdir(self.model_path)):
-                        self.transcribe_signal.emit(f"使用本地模型: {self.model_path}\n")
-                        model_dir = self.model_path
-                        if self.model_path.endswith('.bin'):
-                            model_dir = os.path.dirname(self.model_path)
-                        self.model = WhisperModel(model_dir, device=self.device, compute_type=self.compute_type)
-                    else:
-                        # 默认使用指定的模型大小
-                        self.transcribe_signal.emit(f"使用默认模型: {self.model_size}\n")
-                        self.model = WhisperModel(self.model_size, device=self.device, compute_type=self.compute_type)
-            else:
-                # 无指定路径，使用默认下载
-                self.model = WhisperModel(self.model_size, device=self.device, compute_type=self.compute_type)
+            # 断点续传: 跳过清单中已完成且内容与设置均未变化的文件
+            audio_files = self.audio_files
+            if self.output_dir:
+                self.manifest = JobManifest(self.output_dir)
+                audio_files = self.manifest.pending_files(self.audio_files, self.fingerprint)
+                skipped = len(self.audio_files) - len(audio_files)
+                if skipped:
+                    self.buffer.emit('transcribe_signal', f"跳过 {skipped} 个已完成的文件\n")
             
             total_files = len(self.audio_files)
-            for file_index, audio_file in enumerate(self.audio_files):
-                if self.stop_requested:
+            finished_files = total_files - len(audio_files)
+            success = True
+            skipped_total = 0.0
+            
+            if audio_files:
+                # 后台线程提前解码后续文件，与模型加载和推理同时进行；转写缓存已有结果的文件不解码
+                self.prefetcher = AudioPrefetcher(
+                    audio_files, skip=lambda audio_file: self.engine.is_cached(audio_file, self.options)
+                ).start()
+                # 从共享模型池获取模型，相同配置的模型只加载一次
+                model_desc = self.engine.describe()
+                if model_desc:
+                    self.buffer.emit('transcribe_signal', model_desc + "\n")
+                self.engine.load()
+            
+            for audio_file, samples, duration, decode_error in self.prefetcher or []:
+                if self.cancel.is_set():
                     break
                 
                 # 发送当前处理文件信息
                 current_file = os.path.basename(audio_file)
-                self.transcribe_signal.emit(f"\n正在处理: {current_file}\n")
-                self.file_progress_signal.emit(0, current_file)
+                self.buffer.emit('transcribe_signal', f"\n正在处理: {current_file}\n")
+                self.buffer.emit('file_progress_signal', 0, current_file)
+                self._mark(audio_file, JobManifest.RUNNING)
+                infos = []
                 
-                # 处理单个文件 - 修改为实时流式处理
-                segments, info = self.model.transcribe(audio_file, beam_size=5, language=self.language)
+                def on_info(info):
+                    infos.append(info)
+                    self._report_vad(info)
                 
-                # 直接处理迭代器，不预先转换为列表
-                for segment in segments:
-                    if self.stop_requested:
-                        break
-                    # 根据语言决定是否转换
-                    text = self.cc.convert(segment.text) if self.cc else segment.text
-                    self.transcribe_signal.emit(f"[{segment.start:.2f}s -> {segment.end:.2f}s] {text}\n")
-                    
-                    # 基于时间估算文件内进度
-                    file_progress = min(int((segment.end / info.duration if info.duration > 0 else 1.0) * 100), 99)
-                    self.file_progress_signal.emit(file_progress, current_file)
+                def on_progress(file_progress):
+                    # 文件内进度随已转写时间推进，总体进度随之平滑推进
+                    self.buffer.emit('file_progress_signal', file_progress, current_file)
+                    self.buffer.emit('progress_signal',
+                                     int((finished_files + file_progress / 100) / total_files * 100))
+                
+                try:
+                    if decode_error:
+                        raise RuntimeError(f"音频解码失败: {decode_error}")
+                    for segment in self.engine.transcribe(audio_file, self.options, cancel=self.cancel,
+                                                          on_info=on_info, on_progress=on_progress,
+                                                          samples=samples):
+                        self.buffer.emit('segment', audio_file, segment)
+                except Exception as e:
+                    # 单个文件失败不影响其余文件，下次运行时会重新处理
+                    self.buffer.emit('transcribe_signal', f"处理 {current_file} 时发生错误: {str(e)}\n")
+                    self._mark(audio_file, JobManifest.FAILED, error=str(e))
+                    success = False
+                    continue
+                
+                if self.cancel.is_set():
+                    break
+                if infos:
+                    skipped_total += skipped_duration(infos[0])
                 
                 # 文件处理完成后发送信号
-                self.file_complete_signal.emit(audio_file)
-                self.file_progress_signal.emit(100, current_file)
+                self._mark(audio_file, JobManifest.DONE)
+                self.buffer.emit('file_complete_signal', audio_file)
+                self.buffer.emit('file_progress_signal', 100, current_file)
                 
                 # 更新总体进度
-                total_progress = int((file_index + 1) / total_files * 100)
-                self.progress_signal.emit(total_progress)
+                finished_files += 1
+                total_progress = int(finished_files / total_files * 100)
+                self.buffer.emit('progress_signal', total_progress)
                 
-            if not self.stop_requested:
-                self.progress_signal.emit(100)
-                self.complete_signal.emit(True)
+            if not self.cancel.is_set():
+                if skipped_total > 0:
+                    self.buffer.emit('transcribe_signal', f"\nVAD共跳过 {skipped_total:.1f} 秒非语音音频\n")
+                self.buffer.emit('progress_signal', 100)
+                self.buffer.emit('complete_signal', success)
                 
         except Exception as e:
-            self.transcribe_signal.emit(f"发生错误: {str(e)}\n")
-            self.complete_signal.emit(False)
+            self.buffer.emit('transcribe_signal', f"发生错误: {str(e)}\n")
+            self.buffer.emit('complete_signal', False)
+        finally:
+            if self.prefetcher:
+                self.prefetcher.stop()
+                self.prefetcher = None
+            self.engine.release()
+
+    def _report_vad(self, info):
+        report = vad_report(info)
+        if report:
+            self.buffer.emit('transcribe_signal', report + "\n")
+
+    def _mark(self, audio_file, status, error=None):
+        if self.manifest:
+            output = output_path_for(audio_file, self.output_dir) if status == JobManifest.DONE else None
+            self.manifest.mark(audio_file, status, self.fingerprint, output=output, error=error)
+
+    def stop(self):
+        """优雅停止线程"""
+        self.cancel.cancel()
+
+class ParallelTranscribeWorker(QThread):
+    """多进程并行转写文件夹，信号与 MultiTranscribeWorker 保持一致"""
+    transcribe_signal = pyqtSignal(str)
+    segments_signal = pyqtSignal(list)
+    progress_signal = pyqtSignal(int)
+    file_progress_signal = pyqtSignal(int, str)
+    complete_signal = pyqtSignal(bool)
+    file_complete_signal = pyqtSignal(str)
+
+    def __init__(self, model_size, audio_files, device, compute_type, parent=None, model_path=None, language='zh',
+                 batch_size=0, processes=2, output_dir=None, vad=None, chunk_workers=1, word_timestamps=False):
+        super().__init__(parent)
+        self.buffer = SignalBuffer(self)
+        self.audio_files = audio_files
+        self.output_dir = output_dir
+        self.cancel = CancelToken()
+        self.manifest = None
+        options = DecodeOptions(language, batch_size, vad, chunk_workers, word_timestamps=word_timestamps)
+        self.fingerprint = resume_fingerprint(model_size, compute_type, options, model_path)
+        self.transcriber_args = dict(
+            model_size=model_size, device=device, compute_type=compute_type,
+            model_path=model_path, language=language, batch_size=batch_size, processes=processes,
+            vad=vad, word_timestamps=word_timestamps, chunk_workers=chunk_workers
+        )
+        self.transcriber = None
+
+    def run(self):
+        try:
+            self.buffer.emit('progress_signal', 0)
+            
+            # 断点续传: 跳过清单中已完成且内容与设置均未变化的文件
+            audio_files = self.audio_files
+            if self.output_dir:
+                self.manifest = JobManifest(self.output_dir)
+                audio_files = self.manifest.pending_files(self.audio_files, self.fingerprint)
+                skipped = len(self.audio_files) - len(audio_files)
+                if skipped:
+                    self.buffer.emit('transcribe_signal', f"跳过 {skipped} 个已完成的文件\n")
+            
+            # 多个文件同时转写，按文件缓存结果，完成后整体输出，避免不同文件的文本交错
+            pending = {}
+            total_files = len(self.audio_files)
+            finished_files = total_files - len(audio_files)
+            success = True
+            skipped_total = 0.0
+            if audio_files and not self.cancel.is_set():
+                self.transcriber = ParallelTranscriber(audio_files, **self.transcriber_args)
+                self.buffer.emit('transcribe_signal', f"正在启动 {self.transcriber.processes} 个转写进程...\n")
+                self.transcriber.start()
+            
+            for event in self.transcriber.events() if self.transcriber else []:
+                kind, audio_file = event[0], event[1]
+                current_file = os.path.basename(audio_file) if audio_file else ''
+                if kind == 'start':
+                    pending[audio_file] = []
+                    self._mark(audio_file, JobManifest.RUNNING)
+                    self.buffer.emit('file_progress_signal', 0, current_file)
+                elif kind == 'segment':
+                    _, _, segment, progress = event
+                    pending.setdefault(audio_file, []).append(Segment(*segment))
+                    self.buffer.emit('file_progress_signal', progress, current_file)
+                elif kind == 'done':
+                    self.buffer.emit('transcribe_signal', f"\n正在处理: {current_file}\n")
+                    skipped = event[2]
+                    if skipped > 0:
+                        skipped_total += skipped
+                        self.buffer.emit('transcribe_signal', f"VAD已跳过 {skipped:.1f} 秒非语音音频\n")
+                    for segment in pending.pop(audio_file, []):
+                        self.buffer.emit('segment', audio_file, segment)
+                    self._mark(audio_file, JobManifest.DONE)
+                    self.buffer.emit('file_complete_signal', audio_file)
+                    self.buffer.emit('file_progress_signal', 100, current_file)
+                    finished_files += 1
+                    self.buffer.emit('progress_signal', int(finished_files / total_files * 100))
+                elif kind == 'error':
+                    pending.pop(audio_file, None)
+                    self._mark(audio_file, JobManifest.FAILED, error=event[2])
+                    self.buffer.emit('transcribe_signal', f"\n处理 {current_file} 时发生错误: {event[2]}\n")
+                    success = False
+                elif kind == 'fatal':
+                    self.buffer.emit('transcribe_signal', f"发生错误: {event[2]}\n")
+                    success = False
+            
+            if not self.cancel.is_set():
+                if skipped_total > 0:
+                    self.buffer.emit('transcribe_signal', f"\nVAD共跳过 {skipped_total:.1f} 秒非语音音频\n")
+                self.buffer.emit('progress_signal', 100)
+                self.buffer.emit('complete_signal', success)
+        except Exception as e:
+            self.buffer.emit('transcribe_signal', f"发生错误: {str(e)}\n")
+            self.buffer.emit('complete_signal', False)
         finally:
-            self.running = False
+            if self.transcriber:
+                self.transcriber.join()
+
+    def _mark(self, audio_file, status, error=None):
+        if self.manifest:
+            output = output_path_for(audio_file, self.output_dir) if status == JobManifest.DONE else None
+            self.manifest.mark(audio_file, status, self.fingerprint, output=output, error=error)
 
     def stop(self):
         """优雅停止线程"""
-        self.stop_requested = True
-        self.running = False
\ No newline at end of file
+        self.cancel.cancel()
+        if self.transcriber:
+            self.transcriber.stop()
+
+class LiveTranscribeWorker(QThread):
+    transcribe_signal = pyqtSignal(str)
+    segments_signal = pyqtSignal(list)  # 批量的最终分段 [(音源名称, Segment)]
+    partial_signal = pyqtSignal(str)    # 尚未断句的临时结果，只保留最新一条
+    complete_signal = pyqtSignal(bool)
+
+    def __init__(self, model_size, device, compute_type, parent=None, model_path=None, language='zh',
+                 audio_file=None, input_device=None, vad=None):
+        super().__init__(parent)
+        self.buffer = SignalBuffer(self)
+        # 未指定文件时从麦克风读取，指定文件时按播放速度模拟实时输入
+        self.source = FileSource(audio_file) if audio_file else MicrophoneSource(input_device)
+        self.language = language
+        self.vad = vad
+        self.engine = TranscriptionEngine(model_size, device, compute_type, model_path=model_path)
+
+    def run(self):
+        try:
+            model_desc = self.engine.describe()
+            if model_desc:
+                self.buffer.emit('transcribe_signal', model_desc + "\n")
+            transcriber = LiveTranscriber(self.engine.load(), self.language, vad=self.vad)
+            self.buffer.emit('transcribe_signal', f"模型加载完毕，正在收听{self.source.name}...\n")
+            
+            for event in transcriber.run(self.source):
+                if event.kind == 'final':
+                    self.buffer.emit('segment', self.source.name, event_to_segment(event))
+                    # 临时结果只保留最新值，断句后清空，避免旧的临时结果覆盖在最终分段之后
+                    self.buffer.emit('partial_signal', '')
+                else:
+                    self.buffer.emit('partial_signal', event.text)
+            
+            self.buffer.emit('complete_signal', True)
+        except Exception as e:
+            self.buffer.emit('transcribe_signal', f"发生错误: {str(e)}\n")
+            self.buffer.emit('complete_signal', False)
+        finally:
+            self.engine.release()
+
+    def stop(self):
+        """停止收音，窗口内剩余的语音仍会输出为最终分段"""
+        self.source.close()
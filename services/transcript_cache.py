@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import threading
+from services.manifest import cached_file_digest
+from services.segments import TranscriptInfo, segment_from_data
+
+class TranscriptCache:
+    """按 (音频内容哈希, 模型, 解码参数) 缓存转写结果的磁盘缓存
+
+    每条结果保存为一个 JSON 文件，命中时更新修改时间，总大小超出上限时按最久未使用的顺序删除。
+    """
+
+    def __init__(self, cache_dir='./cache/transcripts', max_mb=512):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = None
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def configure(self, cache_dir=None, max_mb=None):
+        with self.lock:
+            if cache_dir:
+                self.cache_dir = cache_dir
+            if max_mb is not None:
+                self.max_bytes = int(max_mb * 1024 * 1024)
+            self._total_bytes = None
+
+    def audio_digest(self, audio_path):
+        return cached_file_digest(audio_path)
+
+    def make_key(self, audio_digest, model_id, options):
+        data = json.dumps({'audio': audio_digest, 'model': model_id, 'options': options}, sort_keys=True)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def contains(self, key):
+        """是否已有该条结果，不计入命中统计，也不更新最近使用时间"""
+        return os.path.isfile(self._path(key))
+
+    def get(self, key):
+        """返回 (TranscriptInfo, [Segment])，未命中返回 None"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            os.utime(path)  # 更新最近使用时间
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        info = TranscriptInfo(**data['info'])
+        segments = [segment_from_data(segment) for segment in data['segments']]
+        return info, segments
+
+    def put(self, key, info, segments):
+        path = self._path(key)
+        data = {
+            'info': info._asdict(),
+            'segments': [segment._asdict() for segment in segments]
+        }
+        # 多个线程或进程同时写入同一条结果时各自使用临时文件，最后原子替换
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            size = os.path.getsize(temp_path)
+            # 覆盖已有结果时只累计大小的差值
+            replaced = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        with self.lock:
+            if self._total_bytes is not None:
+                self._total_bytes += size - replaced
+        self._evict()
+
+    def _scan(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        with self.lock:
+            if self._total_bytes is not None and self._total_bytes <= self.max_bytes:
+                return
+            entries = self._scan()
+            total = sum(size for _, size, _ in entries)
+            # 按最近使用时间从旧到新删除
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            self._total_bytes = total
+
+    def stats(self):
+        with self.lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._scan())
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'size_mb': round((self._total_bytes or 0) / (1024 * 1024), 1),
+                'max_mb': round(self.max_bytes / (1024 * 1024), 1)
+            }
+
+# 进程级共享转写缓存
+transcript_cache = TranscriptCache()
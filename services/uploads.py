@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import zipfile
+from flask import Request
+from werkzeug.utils import secure_filename
+
+class UploadRequest(Request):
+    """上传文件在解析 multipart 时直接分块写入独立的临时目录，不经过内存缓冲"""
+
+    # 由 APIServer 设置，None 时使用系统临时目录
+    upload_root = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        path = new_upload_path(filename, self.upload_root)
+        if not hasattr(self, 'upload_paths'):
+            self.upload_paths = []
+        self.upload_paths.append(path)
+        return open(path, 'w+b')
+
+    def cleanup_uploads(self):
+        """删除本次请求中未被任务接管的上传文件"""
+        for path in getattr(self, 'upload_paths', []):
+            remove_upload(path)
+        self.upload_paths = []
+
+def new_upload_path(filename=None, upload_root=None):
+    """为一个上传文件创建独立的临时目录，返回文件路径"""
+    upload_dir = tempfile.mkdtemp(prefix='whisper_upload_', dir=upload_root)
+    return os.path.join(upload_dir, secure_filename(filename or '') or 'audio')
+
+def extract_archive(path, upload_root=None, extensions=None, max_files=None, max_bytes=None):
+    """把 zip 中的文件逐个解压到独立临时目录，返回 [(压缩包内路径, 磁盘路径)]
+
+    只解压扩展名在 extensions 中的文件；文件数或解压后总大小超出限制、压缩包损坏时抛出 ValueError，
+    已解压的文件随之删除。
+    """
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        raise ValueError('压缩包格式错误，仅支持 zip')
+    with archive:
+        members = [member for member in archive.infolist() if not member.is_dir()
+                   and (not extensions or member.filename.lower().endswith(extensions))]
+        if max_files and len(members) > max_files:
+            raise ValueError(f"压缩包中的文件数超过上限 {max_files}")
+        if max_bytes and sum(member.file_size for member in members) > max_bytes:
+            raise ValueError('压缩包解压后超过大小限制')
+        extracted = []
+        try:
+            for member in members:
+                # 只保留文件名，压缩包内的目录结构不影响磁盘路径
+                target = new_upload_path(os.path.basename(member.filename), upload_root)
+                extracted.append((member.filename, target))
+                with archive.open(member) as source, open(target, 'wb') as f:
+                    shutil.copyfileobj(source, f, 1024 * 1024)
+        except (zipfile.BadZipFile, OSError) as e:
+            for _, target in extracted:
+                remove_upload(target)
+            raise ValueError(f"压缩包解压失败: {str(e)}")
+    return extracted
+
+def take_upload(request, file):
+    """接管上传文件，返回其磁盘路径；之后由调用方负责调用 remove_upload 删除"""
+    path = file.stream.name
+    file.stream.close()
+    if path in getattr(request, 'upload_paths', []):
+        request.upload_paths.remove(path)
+    return path
+
+def remove_upload(path):
+    if path:
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
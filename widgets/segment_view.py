@@ -0,0 +1,63 @@
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+from qfluentwidgets import ListView
+from services.exporters import format_line
+
+class SegmentListModel(QAbstractListModel):
+    """转写结果列表模型，每行为一条状态文本或指向 SegmentStore 中的一个分段
+
+    只保存行索引，显示文本在绘制可见行时才生成，界面开销与结果总长度无关。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        row = self.rows[index.row()]
+        if isinstance(row, str):
+            return row
+        store, segment_index = row
+        return format_line(store[segment_index])
+
+    def append_rows(self, rows):
+        if not rows:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.rows = []
+        self.endResetModel()
+
+class SegmentListView(ListView):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.result_model = SegmentListModel(self)
+        self.setModel(self.result_model)
+        # 所有行等高，滚动与布局只计算可见区域
+        self.setUniformItemSizes(True)
+        self.setWordWrap(False)
+        self.setTextElideMode(Qt.ElideRight)
+        self.setSelectionMode(ListView.NoSelection)
+
+    def append_text(self, text):
+        self.append_rows([line for line in text.split('\n') if line.strip()])
+
+    def append_rows(self, rows):
+        # 仅在已滚动到底部时自动跟随最新结果
+        scroll_bar = self.verticalScrollBar()
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum() - 2
+        self.result_model.append_rows(rows)
+        if at_bottom:
+            self.scrollToBottom()
+
+    def clear(self):
+        self.result_model.clear()
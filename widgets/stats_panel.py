@@ -0,0 +1,80 @@
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QGridLayout, QVBoxLayout
+from qfluentwidgets import BodyLabel, CardWidget, StrongBodyLabel, SubtitleLabel
+from services.metrics import metrics
+
+def _histogram(snapshot, name, *labels):
+    return snapshot.get((name, labels)) or {'count': 0, 'sum': 0.0, 'avg': 0.0}
+
+def _hit_rate(snapshot, cache):
+    hits = snapshot.get(('whisper_cache_hits_total', (cache,)), 0)
+    misses = snapshot.get(('whisper_cache_misses_total', (cache,)), 0)
+    total = hits + misses
+    return f"{hits / total:.0%} ({hits}/{total})" if total else "-"
+
+def format_stats(snapshot):
+    """把指标快照整理为 [(名称, 显示文本)]"""
+    load = [value for (name, _), value in snapshot.items() if name == 'whisper_model_load_seconds']
+    load_count = sum(item['count'] for item in load)
+    load_avg = sum(item['sum'] for item in load) / load_count if load_count else 0.0
+    decode = _histogram(snapshot, 'whisper_audio_decode_seconds')
+    segment = _histogram(snapshot, 'whisper_segment_decode_seconds')
+    transcription = _histogram(snapshot, 'whisper_transcription_seconds')
+    rtf = _histogram(snapshot, 'whisper_realtime_factor')
+    queue_wait = _histogram(snapshot, 'whisper_queue_wait_seconds')
+    audio_seconds = snapshot.get(('whisper_audio_seconds_total', ()), 0.0)
+    rss = snapshot.get(('process_resident_memory_bytes', ()))
+
+    rows = [
+        ('模型加载', f"{load_count} 次，平均 {load_avg:.2f} 秒"),
+        ('音频解码', f"{decode['count']} 次，平均 {decode['avg']:.2f} 秒"),
+        ('每段解码', f"{segment['count']} 段，平均 {segment['avg']:.2f} 秒"),
+        ('完整转写', f"{transcription['count']} 个，共 {audio_seconds / 60:.1f} 分钟音频"),
+        ('实时率(RTF)', f"{rtf['avg']:.3f}" if rtf['count'] else "-"),
+        ('正在转写', str(snapshot.get(('whisper_active_transcriptions', ()), 0))),
+        ('转写缓存命中', _hit_rate(snapshot, 'transcript')),
+        ('音频缓存命中', _hit_rate(snapshot, 'audio')),
+        ('已加载模型', f"{snapshot.get(('whisper_models_loaded', ()), 0)} 个，"
+                      f"约 {snapshot.get(('whisper_models_memory_mb', ()), 0):.0f} MB"),
+        ('进程内存', f"{rss / (1024 * 1024):.0f} MB" if rss is not None else "-"),
+    ]
+    if ('whisper_api_inference_slots', ()) in snapshot:
+        rows.append(('API推理', f"运行 {snapshot[('whisper_api_inference_running', ())]} / "
+                                f"{snapshot[('whisper_api_inference_slots', ())]}，"
+                                f"排队 {snapshot[('whisper_api_inference_queued', ())]}"))
+        rows.append(('API排队等待', f"平均 {queue_wait['avg']:.2f} 秒"))
+    return rows
+
+class StatsPanel(CardWidget):
+    """性能统计面板，显示期间每秒刷新一次"""
+
+    def __init__(self, parent=None, interval=1000):
+        super().__init__(parent)
+        self.layout = QVBoxLayout(self)
+        self.layout.addWidget(SubtitleLabel('性能统计', self))
+        self.grid = QGridLayout()
+        self.grid.setHorizontalSpacing(24)
+        self.layout.addLayout(self.grid)
+        self.layout.addStretch(1)
+        self.labels = {}
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.refresh)
+
+    def refresh(self):
+        for row, (name, text) in enumerate(format_stats(metrics.snapshot())):
+            if name not in self.labels:
+                self.grid.addWidget(StrongBodyLabel(name, self), row, 0)
+                self.labels[name] = BodyLabel(self)
+                self.grid.addWidget(self.labels[name], row, 1)
+            self.labels[name].setText(text)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()